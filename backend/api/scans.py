@@ -1,6 +1,10 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import datetime
+import base64
+import copy
+import gzip
+import hashlib
 import subprocess
 import threading
 import os
@@ -9,7 +13,31 @@ import json
 import ipaddress
 import socket
 import uuid
-import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from api.auth import mock_users
+from models.scan import SCAN_SORT_COLUMNS, VULNERABILITY_FIELDS, Scan
+from services.artifacts import list_artifacts, open_artifact
+from services.events import scan_events
+from services.executor import scan_executor
+from services.nmap_progress import NMAP_STATS_INTERVAL, parse_progress_line
+from services.portcheck import PORTCHECK_CONCURRENCY, PORTCHECK_TIMEOUT, PORTCHECK_MAX_TIMEOUT, expand_probes, iter_port_checks
+from services.postprocess import postprocess_pool
+from services.range_scan import RANGE_SHARD_WORKERS, split_network, shard_command, merge_nmap_xml
+from services.resolver import resolver
+from services.results import (
+    process_nmap_results as build_nmap_result, process_web_tool_output, build_web_scan_result,
+    find_changed_ports, process_incremental_results
+)
+from services.scan_cache import scan_cache, scan_fingerprint
+from services.scan_control import ScanCancelled, scan_control
+from services.scheduler import scan_scheduler
+from services.summary_cache import summary_cache
+
+try:
+    import brotli
+except ImportError:  # Без пакета brotli ответы сжимаются только gzip
+    brotli = None
 
 scan_bp = Blueprint('scan', __name__)
 
@@ -20,15 +48,206 @@ os.makedirs(SCAN_RESULTS_DIR, exist_ok=True)
 # Хранение информации об активных сканированиях
 active_scans = {}  # id -> status
 
+# Прогресс выполняющихся сканирований
+scan_progress = {}  # id -> progress
+scan_progress_lock = threading.Lock()
+
 # Базовые настройки для сканирования
 DEFAULT_NMAP_ARGS = "-Pn -A"
 
+# Интервал keep-alive для SSE и максимальное ожидание long-poll (секунды)
+EVENT_HEARTBEAT_INTERVAL = 15
+EVENT_POLL_MAX_TIMEOUT = 60
+
+# Размер страницы списка сканирований по умолчанию и максимальный
+SCAN_LIST_LIMIT = int(os.environ.get('SCAN_LIST_LIMIT', 50))
+SCAN_LIST_MAX_LIMIT = int(os.environ.get('SCAN_LIST_MAX_LIMIT', 500))
+
+# Число дней в графике security score и период, за который считаются изменения на дашборде
+DASHBOARD_TREND_DAYS = int(os.environ.get('DASHBOARD_TREND_DAYS', 6))
+DASHBOARD_CHANGE_DAYS = int(os.environ.get('DASHBOARD_CHANGE_DAYS', 30))
+
+# Размер страницы списка уязвимостей по умолчанию и максимальный
+VULN_LIST_LIMIT = int(os.environ.get('VULN_LIST_LIMIT', 100))
+VULN_LIST_MAX_LIMIT = int(os.environ.get('VULN_LIST_MAX_LIMIT', 1000))
+
+# Размер страницы результатов полнотекстового поиска по умолчанию и максимальный
+SEARCH_LIMIT = int(os.environ.get('SEARCH_LIMIT', 50))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', 200))
+
+# Ответы меньше этого размера не сжимаются; уровень сжатия gzip
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+RESPONSE_GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 6))
+
+# Максимальное число уязвимостей в одном запросе массового обновления статуса
+VULN_BULK_MAX = int(os.environ.get('VULN_BULK_MAX', 5000))
+
+# Максимальное число доменов в одном запросе dns-info
+DNS_BATCH_MAX = int(os.environ.get('DNS_BATCH_MAX', 500))
+
+# Максимальное число инструментов, одновременно работающих в одном веб-сканировании
+WEB_TOOL_WORKERS = int(os.environ.get('WEB_TOOL_WORKERS', 4))
+
 class ScanStatus:
     QUEUED = "queued"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
     SCHEDULED = "scheduled"
+    CANCELLED = "cancelled"
+
+
+def set_scan_status(scan_id, status):
+    """Обновляет статус сканирования (вызывается и пулом сканирований)"""
+    if active_scans.get(scan_id) != status:
+        active_scans[scan_id] = status
+        Scan.set_status(scan_id, status)
+        summary_cache.invalidate(scan_id)
+        scan_events.publish("status", {"id": scan_id, "status": status})
+    
+    # Завершенное сканирование можно переиспользовать, неудачное или отмененное - нет
+    if status in (ScanStatus.COMPLETED, ScanStatus.FAILED, ScanStatus.CANCELLED):
+        scan_cache.finish(scan_id, status == ScanStatus.COMPLETED)
+
+
+def notify_results_changed(scan_id, **data):
+    """Сообщает подписчикам, что результаты сканирования записаны или изменены"""
+    summary_cache.invalidate(scan_id)
+    scan_events.publish("results", dict(data, id=scan_id))
+
+
+def response_encoding():
+    """Сжатие ответа, которое принимает клиент: br, gzip или None"""
+    encodings = (["br"] if brotli else []) + ["gzip"]
+    quality, encoding = max((request.accept_encodings[e], e) for e in encodings)
+    return encoding if quality > 0 else None
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body)
+    return gzip.compress(body, RESPONSE_GZIP_LEVEL)
+
+
+def not_modified_response(tag, last_modified):
+    """
+    Ответ 304, если у клиента актуальная версия документа, иначе None
+    
+    If-None-Match сравнивается со всеми вариантами ETag (со сжатием и без),
+    If-Modified-Since учитывается, только если ETag не передан. В ответе
+    возвращается тот вариант ETag, который совпал, чтобы не подменить
+    клиенту валидатор сжатого ответа. На проверку по дате ETag не
+    отправляется: вариант зависит от размера тела, которое не загружается.
+    """
+    tag_variant = None
+    if request.if_none_match:
+        variants = [tag] + [f"{tag}-{encoding}" for encoding in ("gzip", "br")]
+        # При совпадении нескольких вариантов (If-None-Match: *) берем вариант
+        # для сжатия, которое клиент принимает
+        encoding = response_encoding()
+        variants.sort(key=lambda variant: variant != f"{tag}-{encoding}")
+        tag_variant = next((v for v in variants if request.if_none_match.contains(v)), None)
+        if tag_variant is None:
+            return None
+    elif not (request.if_modified_since and last_modified and last_modified <= request.if_modified_since):
+        return None
+    
+    response = current_app.response_class(status=304)
+    if tag_variant:
+        response.set_etag(tag_variant)
+    response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def versioned_json_response(body, tag, last_modified, encoded=None):
+    """
+    JSON-ответ с ETag, Last-Modified и сжатием, если клиент его принимает
+    
+    encoded(encoding) может вернуть уже сжатое тело из кэша.
+    У сжатого варианта свой строгий ETag с суффиксом кодировки.
+    """
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    encoding = response_encoding() if len(body) >= RESPONSE_COMPRESS_MIN_BYTES else None
+    if encoding:
+        response.set_data(encoded(encoding) if encoded else compress_body(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        tag = f"{tag}-{encoding}"
+    
+    response.set_etag(tag)
+    response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def cached_scan_response(scan_id, view, loader):
+    """
+    JSON-ответ с данными сканирования из кэша сериализованных документов
+    
+    Документ строится loader(scan_id) и кэшируется вместе с версией записи
+    сканирования, сжатые варианты кэшируются так же. ETag получается из
+    версии, поэтому на If-None-Match с актуальной версией отвечаем 304, не
+    загружая документ. Возвращает None, если сканирования нет или loader
+    вернул None.
+    """
+    revision = Scan.get_revision(scan_id)
+    if revision is None:
+        return None
+    version, last_modified = revision
+    tag = f"scan-{scan_id}-{view}-{version}"
+    
+    response = not_modified_response(tag, last_modified)
+    if response is not None:
+        return response
+    
+    body = summary_cache.get(scan_id, view, version)
+    if body is None:
+        document = loader(scan_id)
+        if document is None:
+            return None
+        body = current_app.json.response(document).get_data()
+        summary_cache.put(scan_id, view, version, body)
+    
+    def encoded(encoding):
+        data = summary_cache.get(scan_id, f"{view}.{encoding}", version)
+        if data is None:
+            data = compress_body(body, encoding)
+            summary_cache.put(scan_id, f"{view}.{encoding}", version, data)
+        return data
+    
+    return versioned_json_response(body, tag, last_modified, encoded)
+
+
+def reused_scan_response(scan_id):
+    """Ответ на запрос, присоединенный к идентичному сканированию"""
+    status = active_scans.get(scan_id, ScanStatus.COMPLETED)
+    in_progress = status in (ScanStatus.QUEUED, ScanStatus.RUNNING)
+    return {
+        "id": scan_id,
+        "status": status,
+        "reused": True,
+        "message": "Identical scan is already in progress" if in_progress
+                   else "Reused results of a recent identical scan"
+    }
+
+
+def current_user_id():
+    """ID пользователя из JWT-токена запроса"""
+    return mock_users.get(get_jwt_identity(), {}).get("id", 0)
+
+
+def new_scan_id(kind, data, status=ScanStatus.QUEUED):
+    """Создает запись сканирования в БД и возвращает ее ID (None, если запись не сохранилась)"""
+    scan = Scan(
+        user_id=data.get('userId', 0),
+        target=data.get('target'),
+        scan_type=f"nmap_{data.get('scanType', 'basic')}" if kind == "nmap" else "web",
+        status=status,
+        target_type=data.get('targetType', 'hostname') if kind == "nmap" else None
+    )
+    return scan.id if scan.save() else None
 
 
 def validate_target(target, target_type):
@@ -56,6 +275,31 @@ def validate_target(target, target_type):
     return False, "Invalid target type"
 
 
+def web_target_url(target):
+    """URL цели веб-сканирования: без схемы подставляется http://"""
+    if not target.startswith(('http://', 'https://')):
+        target = 'http://' + target
+    return target
+
+
+def validate_web_target(url):
+    """Проверка URL веб-сканирования: хост - IP-адрес или доменное имя, порт корректный"""
+    try:
+        parsed = urlparse(url)
+        host = parsed.hostname
+        parsed.port
+    except ValueError:
+        return False, "Invalid URL"
+    if not host:
+        return False, "Invalid URL"
+    if validate_target(host, "ip")[0]:
+        return True, ""
+    label = r'[a-z0-9]([a-z0-9\-]{0,61}[a-z0-9])?'
+    if not re.match(rf'^{label}(\.{label})*$', host):
+        return False, "Invalid URL host"
+    return True, ""
+
+
 def get_scan_command(scan_id, target, scan_type, port_range, scan_speed, service_detection, os_detection, script_scan):
     """Формирует команду для сканирования на основе параметров"""
     # Базовая директория для результатов
@@ -110,6 +354,9 @@ def get_scan_command(scan_id, target, scan_type, port_range, scan_speed, service
     if script_scan and "--script" not in " ".join(cmd):
         cmd.append("--script=default,vuln")
     
+    # Периодическая статистика для отслеживания прогресса
+    cmd.extend(["--stats-every", NMAP_STATS_INTERVAL])
+    
     # Output formats
     xml_output = os.path.join(result_dir, "scan.xml")
     cmd.extend(["-oX", xml_output])
@@ -120,277 +367,73 @@ def get_scan_command(scan_id, target, scan_type, port_range, scan_speed, service
     return cmd, result_dir
 
 
-def parse_nmap_xml(xml_file):
-    """Парсит XML-файл результатов nmap в структуру данных"""
-    try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        
-        # Базовая информация о сканировании
-        scan_info = {
-            "start_time": root.get("start", ""),
-            "args": root.get("args", ""),
-            "hosts": []
-        }
-        
-        # Информация о хостах
-        for host in root.findall(".//host"):
-            host_info = {
-                "state": host.find(".//status").get("state", ""),
-                "addresses": [],
-                "hostnames": [],
-                "ports": [],
-                "os": []
-            }
-            
-            # IP-адреса
-            for addr in host.findall(".//address"):
-                host_info["addresses"].append({
-                    "addr": addr.get("addr", ""),
-                    "addrtype": addr.get("addrtype", "")
-                })
-            
-            # Доменные имена
-            for hostname in host.findall(".//hostname"):
-                host_info["hostnames"].append({
-                    "name": hostname.get("name", ""),
-                    "type": hostname.get("type", "")
-                })
-            
-            # Порты и сервисы
-            for port in host.findall(".//port"):
-                port_info = {
-                    "protocol": port.get("protocol", ""),
-                    "portid": port.get("portid", ""),
-                    "state": port.find(".//state").get("state", ""),
-                    "service": {}
-                }
-                
-                # Информация о сервисе
-                service = port.find(".//service")
-                if service is not None:
-                    port_info["service"] = {
-                        "name": service.get("name", ""),
-                        "product": service.get("product", ""),
-                        "version": service.get("version", ""),
-                        "extrainfo": service.get("extrainfo", "")
-                    }
-                
-                # Скрипты (если есть)
-                scripts = port.findall(".//script")
-                if scripts:
-                    port_info["scripts"] = []
-                    for script in scripts:
-                        script_info = {
-                            "id": script.get("id", ""),
-                            "output": script.get("output", "")
-                        }
-                        port_info["scripts"].append(script_info)
-                
-                host_info["ports"].append(port_info)
-            
-            # Информация об ОС
-            os_matches = host.findall(".//osmatch")
-            for os_match in os_matches:
-                os_info = {
-                    "name": os_match.get("name", ""),
-                    "accuracy": os_match.get("accuracy", "")
-                }
-                host_info["os"].append(os_info)
-            
-            scan_info["hosts"].append(host_info)
-        
-        return scan_info
-    except Exception as e:
-        print(f"Error parsing nmap XML: {e}")
-        return {"error": str(e)}
+def process_nmap_results(scan_id, result_dir, status=ScanStatus.COMPLETED):
+    """Обрабатывает результаты nmap в пуле процессов и возвращает краткую сводку"""
+    summary = postprocess_pool.run(build_nmap_result, scan_id, result_dir, status)
+    if summary.get("status") != "failed":
+        notify_results_changed(scan_id)
+    return summary
 
 
-def process_nmap_results(scan_id, result_dir):
-    """Обрабатывает результаты nmap и преобразует их в формат для фронтенда"""
-    xml_file = os.path.join(result_dir, "scan.xml")
-    
-    if not os.path.exists(xml_file):
-        return {
-            "id": scan_id,
-            "status": "failed",
-            "error": "Scan results not found"
-        }
+def execute_nmap(scan_id, cmd, result_dir, progress=None, on_progress=None):
+    """
+    Запускает nmap и читает его вывод построчно
     
-    try:
-        # Парсим XML результаты nmap
-        nmap_data = parse_nmap_xml(xml_file)
-        
-        # Получаем информацию о хосте (берем первый хост из списка)
-        host_data = nmap_data["hosts"][0] if nmap_data.get("hosts") else {}
-        
-        # Получаем IP и hostname
-        ip = next((addr["addr"] for addr in host_data.get("addresses", []) 
-                   if addr["addrtype"] == "ipv4"), "")
-        hostname = next((h["name"] for h in host_data.get("hostnames", [])
-                        if h["name"]), "")
-        
-        # Определяем ОС
-        operating_system = "Unknown"
-        if host_data.get("os"):
-            os_matches = sorted(host_data["os"], key=lambda x: int(x.get("accuracy", 0)), reverse=True)
-            if os_matches:
-                operating_system = os_matches[0].get("name", "Unknown")
-        
-        # Получаем информацию об открытых портах
-        open_ports = []
-        vulnerabilities = []
-        vuln_id = 1
-        
-        high_count = 0
-        medium_count = 0
-        low_count = 0
-        
-        # Идентификаторы скриптов с высоким риском
-        high_risk_scripts = ["ssl-heartbleed", "ms17-010", "smb-vuln-", "ftp-vsftpd-backdoor",
-                            "ssl-poodle", "ssl-ccs-injection", "http-shellshock"]
-        
-        # Идентификаторы скриптов со средним риском
-        medium_risk_scripts = ["ssl-dh-params", "ssl-cert-expiry", "http-csrf", "http-dombased-xss",
-                              "http-passwd", "http-enum", "ftp-anon"]
+    stdout записывается в stdout.log по мере поступления, stderr пишется
+    сразу в stderr.log, поэтому память не растет на длинных сканированиях.
+    Строки статистики обновляют словарь progress. Возвращает
+    (код возврата, последние строки stderr). Если сканирование отменено
+    или превысило срок, вызывает ScanCancelled.
+    """
+    stderr_path = os.path.join(result_dir, "stderr.log")
+    with open(os.path.join(result_dir, "stdout.log"), "w") as stdout_log, \
+         open(stderr_path, "w") as stderr_log:
+        process = scan_control.spawn(
+            "nmap", scan_id, cmd, 
+            stdout=subprocess.PIPE, 
+            stderr=stderr_log,
+            text=True,
+            bufsize=1
+        )
         
-        for port in host_data.get("ports", []):
-            if port.get("state") == "open":
-                service = port.get("service", {})
-                port_info = {
-                    "port": int(port.get("portid", 0)),
-                    "service": service.get("name", "unknown"),
-                    "version": f"{service.get('product', '')} {service.get('version', '')}".strip()
-                }
-                open_ports.append(port_info)
+        try:
+            for line in process.stdout:
+                stdout_log.write(line)
+                stdout_log.flush()
                 
-                # Проверяем на уязвимости с помощью скриптов
-                if "scripts" in port:
-                    for script in port["scripts"]:
-                        script_id = script.get("id", "")
-                        
-                        # Определяем серьезность уязвимости по имени скрипта
-                        severity = "low"
-                        for high_pattern in high_risk_scripts:
-                            if high_pattern in script_id:
-                                severity = "high"
-                                high_count += 1
-                                break
-                        
-                        if severity != "high":
-                            for medium_pattern in medium_risk_scripts:
-                                if medium_pattern in script_id:
-                                    severity = "medium"
-                                    medium_count += 1
-                                    break
-                        
-                        if severity == "low":
-                            low_count += 1
-                        
-                        # Формируем описание уязвимости
-                        output = script.get("output", "").strip()
-                        
-                        # Краткое описание
-                        description = output.split('\n')[0] if output else script_id
-                        
-                        # Категория уязвимости
-                        category = "web" if "http" in script_id else \
-                                  "encryption" if "ssl" in script_id or "tls" in script_id else \
-                                  "authentication" if "auth" in script_id or "passwd" in script_id else \
-                                  "database" if "mysql" in script_id or "mssql" in script_id or "oracle" in script_id else \
-                                  "network"
-                        
-                        # Рекомендации по исправлению
-                        remediation = "Update the service to the latest version and apply security patches."
-                        if "ssl" in script_id or "tls" in script_id:
-                            remediation = "Configure the server to use only strong encryption protocols and cipher suites."
-                        elif "http" in script_id:
-                            remediation = "Update the web application and implement proper input validation and security headers."
-                        
-                        vulnerability = {
-                            "id": f"vuln-{scan_id}-{vuln_id}",
-                            "name": script_id.replace("-", " ").title(),
-                            "description": description,
-                            "severity": severity,
-                            "details": output,
-                            "category": category,
-                            "remediation": remediation,
-                            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                            "status": "open"
-                        }
-                        
-                        vulnerabilities.append(vulnerability)
-                        vuln_id += 1
-        
-        # Форматируем результаты для фронтенда
-        scan_result = {
-            "id": scan_id,
-            "target": hostname or ip,
-            "date": datetime.datetime.now().isoformat() + "Z",
-            "status": "completed",
-            "duration": 120,  # примерная длительность
-            "findings": {
-                "high": high_count,
-                "medium": medium_count,
-                "low": low_count,
-                "total": high_count + medium_count + low_count,
-                "resolved": 0
-            },
-            "vulnerabilities": vulnerabilities,
-            "openPorts": open_ports,
-            "hostInfo": {
-                "ip": ip,
-                "hostname": hostname,
-                "operatingSystem": operating_system,
-                "uptime": "Unknown",  # nmap не всегда может определить uptime
-                "lastBoot": "Unknown"  # также не всегда можно определить
-            }
-        }
-        
-        # Сохраняем результаты в JSON файл
-        with open(os.path.join(result_dir, "processed_results.json"), "w") as f:
-            json.dump(scan_result, f, indent=2)
-        
-        return scan_result
+                if progress is not None:
+                    with scan_progress_lock:
+                        if parse_progress_line(line, progress) and on_progress:
+                            on_progress()
+            
+            process.stdout.close()
+            returncode = process.wait()
+        finally:
+            scan_control.release("nmap", scan_id, process)
     
-    except Exception as e:
-        print(f"Error processing nmap results: {e}")
-        return {
-            "id": scan_id,
-            "status": "failed",
-            "error": str(e)
-        }
+    scan_control.check("nmap", scan_id)
+    
+    # Для сообщения об ошибке достаточно хвоста stderr
+    with open(stderr_path, "rb") as f:
+        f.seek(max(0, os.path.getsize(stderr_path) - 4096))
+        stderr_tail = f.read().decode("utf-8", errors="replace")
+    
+    return returncode, stderr_tail
 
 
 def run_scan(scan_id, cmd, result_dir):
-    """Выполняет сканирование в отдельном потоке"""
+    """Выполняет сканирование (статус RUNNING выставляет пул сканирований)"""
     try:
-        # Обновляем статус сканирования
-        active_scans[scan_id] = ScanStatus.RUNNING
-        
         # Запускаем процесс сканирования
         print(f"Running scan {scan_id} with command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Ждем завершения сканирования
-        stdout, stderr = process.communicate()
-        
-        # Сохраняем stdout и stderr
-        with open(os.path.join(result_dir, "stdout.log"), "w") as f:
-            f.write(stdout)
-        
-        with open(os.path.join(result_dir, "stderr.log"), "w") as f:
-            f.write(stderr)
+        progress = {"percent": 0.0}
+        scan_progress[scan_id] = progress
+        returncode, stderr = execute_nmap(scan_id, cmd, result_dir, progress)
         
         # Проверяем успешность выполнения
-        if process.returncode != 0:
-            active_scans[scan_id] = ScanStatus.FAILED
-            print(f"Scan {scan_id} failed with code {process.returncode}")
+        if returncode != 0:
+            set_scan_status(scan_id, ScanStatus.FAILED)
+            print(f"Scan {scan_id} failed with code {returncode}")
             print(f"Error: {stderr}")
             return
         
@@ -398,144 +441,416 @@ def run_scan(scan_id, cmd, result_dir):
         scan_result = process_nmap_results(scan_id, result_dir)
         
         # Сохраняем результат и обновляем статус
-        active_scans[scan_id] = ScanStatus.COMPLETED
+        with scan_progress_lock:
+            progress["percent"] = 100.0
+            progress.pop("remaining", None)
+        set_scan_status(scan_id, ScanStatus.COMPLETED)
         
         # В реальном приложении здесь можно было бы сохранить результаты в базу данных
         # Также можно отправить уведомление пользователю о завершении сканирования
         print(f"Scan {scan_id} completed successfully")
         
+    except ScanCancelled as e:
+        finish_cancelled_scan(scan_id, result_dir, e.reason)
     except Exception as e:
-        active_scans[scan_id] = ScanStatus.FAILED
+        set_scan_status(scan_id, ScanStatus.FAILED)
         print(f"Error during scan {scan_id}: {e}")
 
 
-def run_nikto_scan(target, output_file):
-    """Запускает сканирование Nikto для веб-уязвимостей"""
+def finish_cancelled_scan(scan_id, result_dir, reason):
+    """Сохраняет частичные результаты прерванного сканирования и выставляет статус CANCELLED"""
+    print(f"Scan {scan_id} stopped: {reason}")
     try:
-        cmd = ["nikto", "-h", target, "-o", output_file, "-Format", "json"]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        stdout, stderr = process.communicate()
+        if os.path.exists(os.path.join(result_dir, "scan.xml")):
+            process_nmap_results(scan_id, result_dir, ScanStatus.CANCELLED)
+    except Exception as e:
+        print(f"Error saving partial results of scan {scan_id}: {e}")
+    
+    if scan_id in scan_progress:
+        with scan_progress_lock:
+            scan_progress[scan_id]["cancelled"] = reason
+            scan_progress[scan_id].pop("remaining", None)
+    set_scan_status(scan_id, ScanStatus.CANCELLED)
+
+
+def update_range_percent(progress):
+    """Пересчитывает общий процент диапазона по процентам шардов (под scan_progress_lock)"""
+    shards = progress["shards"].values()
+    progress["percent"] = round(sum(shard["percent"] for shard in shards) / len(shards), 1)
+
+
+def run_shard(scan_id, cmd, result_dir, shard_index, shard):
+    """Сканирует один шард диапазона и обновляет его прогресс"""
+    shard_dir = os.path.join(result_dir, "shards", str(shard_index))
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_cmd = shard_command(cmd, shard, os.path.join(shard_dir, "scan.xml"))
+    
+    progress = scan_progress[scan_id]
+    shard_progress = progress["shards"][shard]
+    with scan_progress_lock:
+        shard_progress["status"] = ScanStatus.RUNNING
+    try:
+        returncode, stderr = execute_nmap(
+            scan_id, shard_cmd, shard_dir, shard_progress,
+            on_progress=lambda: update_range_percent(progress)
+        )
+        if returncode != 0:
+            print(f"Shard {shard} of scan {scan_id} failed with code {returncode}: {stderr}")
+        status = ScanStatus.COMPLETED if returncode == 0 else ScanStatus.FAILED
+    except ScanCancelled:
+        status = ScanStatus.CANCELLED
+    except Exception as e:
+        print(f"Error scanning shard {shard} of scan {scan_id}: {e}")
+        status = ScanStatus.FAILED
+    
+    with scan_progress_lock:
+        shard_progress["status"] = status
+        shard_progress["percent"] = 100.0
+        shard_progress.pop("remaining", None)
+        progress["completedShards"] += 1
+        update_range_percent(progress)
+    return status
+
+
+def run_sharded_scan(scan_id, cmd, result_dir, shards):
+    """Выполняет сканирование диапазона параллельными шардами и объединяет их результаты"""
+    shard_files = [
+        os.path.join(result_dir, "shards", str(i), "scan.xml") for i in range(len(shards))
+    ]
+    try:
+        print(f"Running range scan {scan_id} in {len(shards)} shards: {' '.join(cmd)}")
+        scan_progress[scan_id] = {
+            "totalShards": len(shards),
+            "completedShards": 0,
+            "percent": 0.0,
+            "shards": {shard: {"status": ScanStatus.QUEUED, "percent": 0.0} for shard in shards}
+        }
         
-        if process.returncode != 0:
-            print(f"Nikto scan failed: {stderr}")
-            return None
+        with ThreadPoolExecutor(max_workers=min(len(shards), RANGE_SHARD_WORKERS)) as pool:
+            statuses = list(pool.map(
+                lambda item: run_shard(scan_id, cmd, result_dir, item[0], item[1]),
+                enumerate(shards)
+            ))
+        scan_control.check("nmap", scan_id)
+        
+        if ScanStatus.COMPLETED not in statuses:
+            set_scan_status(scan_id, ScanStatus.FAILED)
+            print(f"Range scan {scan_id} failed: no shard completed")
+            return
+        
+        # Объединяем scan.xml всех шардов в один результат
+        merge_nmap_xml(shard_files, os.path.join(result_dir, "scan.xml"))
         
-        # Читаем и парсим результаты
-        with open(output_file, "r") as f:
-            results = json.load(f)
+        process_nmap_results(scan_id, result_dir)
+        set_scan_status(scan_id, ScanStatus.COMPLETED)
+        print(f"Range scan {scan_id} completed successfully")
         
-        return results
+    except ScanCancelled as e:
+        # Хосты, которые шарды успели просканировать, попадают в частичный результат
+        merge_nmap_xml(shard_files, os.path.join(result_dir, "scan.xml"))
+        finish_cancelled_scan(scan_id, result_dir, e.reason)
     except Exception as e:
-        print(f"Error running Nikto scan: {e}")
-        return None
+        set_scan_status(scan_id, ScanStatus.FAILED)
+        print(f"Error during range scan {scan_id}: {e}")
 
 
-# API endpoints
+def discovery_command(cmd, xml_output):
+    """Команда легкого прохода: те же порты и скорость, но без скриптов, ОС и полной проверки версий"""
+    discovery_cmd = [
+        arg for arg in cmd
+        if arg not in ("-sV", "-O") and not arg.startswith("--script")
+    ]
+    discovery_cmd[1:1] = ["-sV", "--version-intensity", "0"]
+    discovery_cmd[discovery_cmd.index("-oX") + 1] = xml_output
+    return discovery_cmd
 
-@scan_bp.route('/all', methods=['GET'])
-@jwt_required()
-def get_all_scans():
-    """
-    Возвращает список всех сканирований
-    
-    Временно использует mock_scans, в реальном приложении будет получать данные из БД
-    """
-    # Для демонстрации используем заготовленные данные и добавляем статусы активных сканирований
-    scan_list = []
-    
-    # Добавляем mock данные
-    for scan in mock_scans:
-        # Проверяем, не обновлен ли статус в active_scans
-        if scan["id"] in active_scans:
-            scan_copy = scan.copy()
-            scan_copy["status"] = active_scans[scan["id"]]
-            scan_list.append(scan_copy)
-        else:
-            scan_list.append(scan)
-    
-    # Добавляем активные сканирования, которых нет в mock данных
-    for scan_id, status in active_scans.items():
-        if not any(s["id"] == scan_id for s in scan_list):
-            # Получаем данные сканирования из результатов
-            result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-            result_file = os.path.join(result_dir, "processed_results.json")
-            
-            if os.path.exists(result_file):
-                with open(result_file, "r") as f:
-                    scan_data = json.load(f)
-                scan_data["status"] = status
-                scan_list.append(scan_data)
-            else:
-                # Если результаты еще не обработаны, добавляем базовую информацию
-                scan_list.append({
-                    "id": scan_id,
-                    "status": status,
-                    "date": datetime.datetime.now().isoformat() + "Z"
-                })
-    
-    return jsonify(scan_list)
 
+def restrict_ports(cmd, ports):
+    """Команда целевого прохода только по указанным портам"""
+    targeted_cmd = [
+        arg for arg in cmd
+        if arg not in ("-F", "-p-") and not arg.startswith(("--top-ports", "-p "))
+    ]
+    output_index = targeted_cmd.index("-oX")
+    targeted_cmd[output_index:output_index] = ["-p", ",".join(str(port) for port in sorted(ports))]
+    return targeted_cmd
 
-@scan_bp.route('/<int:scan_id>', methods=['GET'])
-@jwt_required()
-def get_scan_by_id(scan_id):
+
+def run_incremental_scan(scan_id, cmd, result_dir, previous_scan_id):
     """
-    Возвращает детали сканирования по ID
+    Дифференциальное пересканирование на основе предыдущего результата
     
-    Сначала проверяет наличие результатов в файловой системе,
-    затем в mock данных
+    Сначала быстро определяются открытые порты, затем определение версий
+    и скрипты NSE запускаются только для новых или изменившихся портов
     """
-    # Проверяем, есть ли результаты в файловой системе
-    result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-    result_file = os.path.join(result_dir, "processed_results.json")
-    
-    if os.path.exists(result_file):
-        with open(result_file, "r") as f:
-            scan_data = json.load(f)
+    try:
+        print(f"Running incremental scan {scan_id} based on scan {previous_scan_id}")
+        progress = {"percent": 0.0, "stage": "discovery"}
+        scan_progress[scan_id] = progress
+        
+        # Легкий проход для поиска открытых портов
+        discovery_dir = os.path.join(result_dir, "discovery")
+        os.makedirs(discovery_dir, exist_ok=True)
+        discovery_xml = os.path.join(discovery_dir, "scan.xml")
+        returncode, stderr = execute_nmap(scan_id, discovery_command(cmd, discovery_xml), discovery_dir, progress)
+        if returncode != 0:
+            set_scan_status(scan_id, ScanStatus.FAILED)
+            print(f"Discovery pass of scan {scan_id} failed with code {returncode}: {stderr}")
+            return
         
-        # Обновляем статус из active_scans если есть
-        if scan_id in active_scans:
-            scan_data["status"] = active_scans[scan_id]
+        changed, unchanged = postprocess_pool.run(find_changed_ports, discovery_xml, previous_scan_id)
         
-        return jsonify(scan_data)
+        # Полное сканирование только новых и изменившихся портов
+        if changed:
+            with scan_progress_lock:
+                progress.update({"percent": 0.0, "stage": "targeted", "ports": changed})
+            returncode, stderr = execute_nmap(scan_id, restrict_ports(cmd, changed), result_dir, progress)
+            if returncode != 0:
+                set_scan_status(scan_id, ScanStatus.FAILED)
+                print(f"Targeted pass of scan {scan_id} failed with code {returncode}: {stderr}")
+                return
+        
+        summary = postprocess_pool.run(
+            process_incremental_results, scan_id, result_dir, previous_scan_id, discovery_xml, unchanged
+        )
+        if summary.get("status") == "failed":
+            set_scan_status(scan_id, ScanStatus.FAILED)
+            return
+        notify_results_changed(scan_id)
+        
+        with scan_progress_lock:
+            progress["percent"] = 100.0
+            progress.pop("remaining", None)
+        set_scan_status(scan_id, ScanStatus.COMPLETED)
+        print(f"Incremental scan {scan_id} completed: {len(changed)} ports rescanned, {len(unchanged)} carried forward")
+        
+    except ScanCancelled as e:
+        finish_cancelled_scan(scan_id, result_dir, e.reason)
+    except Exception as e:
+        set_scan_status(scan_id, ScanStatus.FAILED)
+        print(f"Error during incremental scan {scan_id}: {e}")
+
+
+def run_tool(scan_id, cmd):
+    """Запускает инструмент веб-сканирования с возможностью отмены, возвращает (код, stdout, stderr)"""
+    process = scan_control.spawn(
+        "web", scan_id, cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        scan_control.release("web", scan_id, process)
     
-    # Если нет результатов на диске, ищем в mock данных
-    scan = next((s for s in mock_scans if s["id"] == scan_id), None)
-    if scan:
-        # Возвращаем копию, чтобы не менять оригинал
-        scan_copy = scan.copy()
+    scan_control.check("web", scan_id)
+    return process.returncode, stdout, stderr
+
+
+def run_nikto_scan(scan_id, target, output_file):
+    """Запускает сканирование Nikto для веб-уязвимостей, возвращает True при успехе"""
+    try:
+        cmd = ["nikto", "-h", target, "-o", output_file, "-Format", "json"]
+        returncode, stdout, stderr = run_tool(scan_id, cmd)
         
-        # Обновляем статус если есть в active_scans
-        if scan_id in active_scans:
-            scan_copy["status"] = active_scans[scan_id]
+        if returncode != 0:
+            print(f"Nikto scan failed: {stderr}")
+            return False
         
-        return jsonify(scan_copy)
+        return True
+    except ScanCancelled:
+        raise
+    except Exception as e:
+        print(f"Error running Nikto scan: {e}")
+        return False
+
+
+def process_web_output(tool, output_file, result_dir, *args):
+    """Разбирает вывод инструмента в пуле процессов, возвращает число найденных уязвимостей"""
+    vulnerabilities_file = os.path.join(result_dir, f"{tool}_vulnerabilities.json")
+    return postprocess_pool.run(process_web_tool_output, tool, output_file, vulnerabilities_file, *args)
+
+
+def nikto_stage(scan_id, target, result_dir):
+    """Этап nikto: запуск сканера и разбор JSON-отчета"""
+    nikto_output = os.path.join(result_dir, "nikto_results.json")
+    if not run_nikto_scan(scan_id, target, nikto_output):
+        return 0
     
-    # Если сканирование запущено, но результаты еще не доступны
-    if scan_id in active_scans:
-        return jsonify({
-            "id": scan_id,
-            "status": active_scans[scan_id],
-            "message": "Scan is in progress or scheduled"
-        })
+    return process_web_output("nikto", nikto_output, result_dir)
+
+
+def directory_stage(scan_id, target, tool, result_dir):
+    """Этап dirb/gobuster: поиск чувствительных директорий"""
+    dirb_output = os.path.join(result_dir, f"{tool}_results.txt")
     
-    return jsonify({"error": "Scan not found"}), 404
+    # Команда для сканирования директорий
+    if tool == "gobuster":
+        cmd = ["gobuster", "dir", "-u", target, "-w", "/usr/share/wordlists/dirb/common.txt", "-o", dirb_output]
+    else:
+        cmd = ["dirb", target, "/usr/share/wordlists/dirb/common.txt", "-o", dirb_output]
+    
+    run_tool(scan_id, cmd)
+    
+    # Если результатов нет, этап ничего не нашел
+    if not os.path.exists(dirb_output) or os.path.getsize(dirb_output) == 0:
+        return 0
+    
+    return process_web_output(tool, dirb_output, result_dir)
 
 
-@scan_bp.route('/new', methods=['POST'])
-@jwt_required()
-def create_scan():
-    """
-    Создает новое сканирование
+def sslscan_stage(scan_id, target, result_dir):
+    """Этап sslscan: проверка протоколов, шифров и сертификата"""
+    sslscan_output = os.path.join(result_dir, "sslscan_results.xml")
+    
+    # Извлекаем домен из URL
+    domain = target.split("//")[1].split("/")[0]
+    
+    cmd = ["sslscan", "--xml=" + sslscan_output, domain]
+    
+    run_tool(scan_id, cmd)
     
-    Принимает JSON с параметрами сканирования и запускает процесс
-    в отдельном потоке
+    # Если результатов нет, этап ничего не нашел
+    if not os.path.exists(sslscan_output) or os.path.getsize(sslscan_output) == 0:
+        return 0
+    
+    return process_web_output("sslscan", sslscan_output, result_dir, domain)
+
+
+def wpscan_stage(scan_id, target, result_dir):
+    """Этап wpscan: уязвимости ядра, плагинов и тем WordPress"""
+    wpscan_output = os.path.join(result_dir, "wpscan_results.json")
+    
+    cmd = ["wpscan", "--url", target, "--format", "json", "--output", wpscan_output]
+    
+    run_tool(scan_id, cmd)
+    
+    # Если результатов нет, этап ничего не нашел
+    if not os.path.exists(wpscan_output) or os.path.getsize(wpscan_output) == 0:
+        return 0
+    
+    return process_web_output("wpscan", wpscan_output, result_dir)
+
+
+def sqlmap_stage(scan_id, target, result_dir):
+    """Этап sqlmap: пока только отметка о запуске"""
+    # SQLMap может работать только с формами или параметрами
+    # В реальном приложении здесь был бы код для поиска форм на сайте,
+    # а затем проверки их на SQL инъекции
+    return 0
+
+
+def get_web_scan_stages(scan_id, target, tools):
+    """Формирует упорядоченный список этапов веб-сканирования: (имя, функция, аргументы)"""
+    stages = []
+    
+    # Nikto - веб-сканер
+    if "nikto" in tools:
+        stages.append(("nikto", nikto_stage, (scan_id, target)))
+    
+    # Dirb/Gobuster - сканер директорий (предпочитаем gobuster, если доступен)
+    if "dirb" in tools or "gobuster" in tools:
+        tool = "gobuster" if "gobuster" in tools else "dirb"
+        stages.append((tool, directory_stage, (scan_id, target, tool)))
+    
+    # SSLScan - проверка SSL/TLS
+    if "sslscan" in tools and target.startswith("https://"):
+        stages.append(("sslscan", sslscan_stage, (scan_id, target)))
+    
+    # WPScan - для WordPress сайтов
+    if "wpscan" in tools:
+        stages.append(("wpscan", wpscan_stage, (scan_id, target)))
+    
+    # SQLMap - для поиска SQL инъекций
+    if "sqlmap" in tools:
+        stages.append(("sqlmap", sqlmap_stage, (scan_id, target)))
+    
+    return stages
+
+
+def run_web_stage(name, func, args, result_dir):
+    """Выполняет один этап; его уязвимости сохраняются в отдельный файл <name>_vulnerabilities.json"""
+    # Удаляем список от предыдущего запуска, чтобы неудачный этап не подмешал старые данные
+    vulnerabilities_file = os.path.join(result_dir, f"{name}_vulnerabilities.json")
+    if os.path.exists(vulnerabilities_file):
+        os.remove(vulnerabilities_file)
+    
+    try:
+        return func(*args, result_dir)
+    except ScanCancelled as e:
+        print(f"Stage {name} stopped: {e.reason}")
+        return 0
+    except Exception as e:
+        print(f"Error running {name}: {e}")
+        return 0
+
+
+def run_web_scan(scan_id, target, tools, result_dir, ip=""):
+    """Выполняет веб-сканирование: инструменты работают параллельно, затем результаты объединяются"""
+    try:
+        start_time = datetime.datetime.now().isoformat() + "Z"
+        
+        # Инструменты независимы друг от друга, поэтому запускаем их параллельно
+        stages = get_web_scan_stages(scan_id, target, tools)
+        if stages:
+            with ThreadPoolExecutor(max_workers=min(len(stages), WEB_TOOL_WORKERS)) as pool:
+                futures = [
+                    pool.submit(run_web_stage, name, func, args, result_dir)
+                    for name, func, args in stages
+                ]
+                for future in futures:
+                    future.result()
+        
+        # Прерванное сканирование сохраняет уязвимости завершившихся этапов
+        reason = scan_control.cancelled("web", scan_id)
+        status = ScanStatus.CANCELLED if reason else ScanStatus.COMPLETED
+        
+        # Объединение, нумерация уязвимостей и запись результата тоже выполняются в пуле процессов
+        stage_names = [name for name, _, _ in stages]
+        postprocess_pool.run(
+            build_web_scan_result, scan_id, target, tools, start_time, stage_names, result_dir, ip, status
+        )
+        notify_results_changed(scan_id)
+        
+        # Обновляем статус сканирования
+        set_scan_status(scan_id, status)
+        if reason:
+            print(f"Web scan {scan_id} stopped: {reason}")
+        else:
+            print(f"Web scan {scan_id} completed successfully")
+        
+    except Exception as e:
+        set_scan_status(scan_id, ScanStatus.FAILED)
+        print(f"Error during web scan {scan_id}: {e}")
+        
+        # Сохраняем информацию об ошибке
+        with open(os.path.join(result_dir, "error.log"), "w") as f:
+            f.write(str(e))
+
+
+def run_nmap_job(scan_id, payload):
+    """Обработчик задач nmap для пула сканирований"""
+    if payload.get("previous_scan_id"):
+        run_incremental_scan(scan_id, payload["cmd"], payload["result_dir"], payload["previous_scan_id"])
+    elif payload.get("shards"):
+        run_sharded_scan(scan_id, payload["cmd"], payload["result_dir"], payload["shards"])
+    else:
+        run_scan(scan_id, payload["cmd"], payload["result_dir"])
+
+
+def run_web_job(scan_id, payload):
+    """Обработчик задач веб-сканирования для пула сканирований"""
+    run_web_scan(scan_id, payload["target"], payload["tools"], payload["result_dir"], payload.get("ip", ""))
+
+
+def start_nmap_scan(data, scan_id=None):
     """
-    data = request.get_json()
+    Проверяет параметры и ставит сканирование nmap в очередь пула
     
+    Возвращает (ответ, HTTP-код). scan_id передает планировщик, если
+    идентификатор был зарезервирован при планировании.
+    """
     # Проверка необходимых параметров
     if not data.get('target'):
-        return jsonify({"error": "Target is required"}), 400
+        return {"error": "Target is required"}, 400
     
     # Получаем параметры сканирования
     target = data.get('target')
@@ -556,13 +871,14 @@ def create_scan():
     # Валидация цели
     valid, error_msg = validate_target(target, target_type)
     if not valid:
-        return jsonify({"error": error_msg}), 400
+        return {"error": error_msg}, 400
     
-    # Проверяем, запланировано ли сканирование
-    schedule = data.get('schedule')
-    
-    # Создаем уникальный ID для сканирования
-    scan_id = len(mock_scans) + len(active_scans) + 1
+    # Создаем запись сканирования в БД
+    created = scan_id is None
+    if created:
+        scan_id = new_scan_id("nmap", data)
+        if scan_id is None:
+            return {"error": "Failed to create scan"}, 500
     
     # Формируем команду для сканирования
     cmd, result_dir = get_scan_command(
@@ -570,127 +886,580 @@ def create_scan():
         service_detection, os_detection, script_scan
     )
     
-    # Если сканирование запланировано
-    if schedule:
-        active_scans[scan_id] = ScanStatus.SCHEDULED
-        
-        # В реальном приложении здесь бы был код для запланированного запуска
-        # Например, с использованием celery.beat или APScheduler
-        
-        return jsonify({
-            "id": scan_id, 
-            "status": ScanStatus.SCHEDULED, 
-            "message": "Scan scheduled successfully",
-            "scheduledTime": f"{schedule.get('date')} {schedule.get('time')}"
-        })
+    # Отпечаток сканирования: нормализованная цель и аргументы nmap
+    fingerprint = scan_fingerprint("nmap", target, cmd)
     
-    # Запускаем сканирование в отдельном потоке
-    active_scans[scan_id] = ScanStatus.QUEUED
-    thread = threading.Thread(target=run_scan, args=(scan_id, cmd, result_dir))
-    thread.start()
+    # Идентичное сканирование уже выполняется или недавно завершилось - используем его;
+    # с reuse: false сканирование все равно регистрируется, чтобы к нему могли присоединиться
+    existing_id, reused = scan_cache.claim(fingerprint, scan_id, reuse=data.get('reuse', True))
+    if reused:
+        try:
+            os.rmdir(result_dir)
+        except OSError:
+            pass
+        if created:
+            Scan.delete(scan_id)
+        return reused_scan_response(existing_id), 200
     
-    return jsonify({
+    # Адрес цели для hostInfo.ip, если nmap не сообщит его сам (хост недоступен)
+    ip = resolver.first_ip(target) if target_type != "range" else ""
+    
+    # Сохраняем параметры запроса: по отпечатку находятся предыдущие сканирования той же цели
+    Scan.set_request(scan_id, target, target_type, fingerprint, ip)
+    
+    payload = {"cmd": cmd, "result_dir": result_dir}
+    
+    # Дифференциальное пересканирование по последнему результату той же цели
+    if options.get('incremental') and target_type != "range":
+        previous_scan_id = Scan.find_previous(fingerprint, exclude_id=scan_id)
+        if previous_scan_id:
+            payload["previous_scan_id"] = previous_scan_id
+    
+    # Большие диапазоны делим на подсети и сканируем параллельно
+    if target_type == "range" and options.get('sharding', True):
+        shards = split_network(target)
+        if len(shards) > 1:
+            payload["shards"] = shards
+    
+    # Ставим сканирование в очередь пула, статус QUEUED выставит пул
+    scan_executor.submit(scan_id, "nmap", payload, priority=data.get("priority", "normal"))
+    
+    return {
         "id": scan_id, 
         "status": ScanStatus.QUEUED, 
         "message": "Scan started successfully"
-    })
+    }, 200
 
 
-@scan_bp.route('/status/<int:scan_id>', methods=['GET'])
-@jwt_required()
-def get_scan_status(scan_id):
-    """Возвращает текущий статус сканирования"""
-    if scan_id in active_scans:
-        return jsonify({"id": scan_id, "status": active_scans[scan_id]})
+def start_web_scan(data, scan_id=None):
+    """Ставит веб-сканирование в очередь пула, возвращает (ответ, HTTP-код)"""
+    # Проверка необходимых параметров
+    if not data.get('target'):
+        return {"error": "Target is required"}, 400
     
-    # Проверяем, есть ли результаты в файловой системе
+    # Получаем параметры сканирования
+    target = data.get('target')
+    tools = data.get('tools', ["nikto"])  # По умолчанию используем nikto
+    
+    # Валидация цели (для веб-сканирования это должен быть URL)
+    target = web_target_url(target)
+    valid, error_msg = validate_web_target(target)
+    if not valid:
+        return {"error": error_msg}, 400
+    
+    # Создаем запись сканирования в БД
+    created = scan_id is None
+    if created:
+        scan_id = new_scan_id("web", data)
+        if scan_id is None:
+            return {"error": "Failed to create scan"}, 500
+    
+    # Идентичное сканирование уже выполняется или недавно завершилось - используем его
+    fingerprint = scan_fingerprint("web", target, tools=tools)
+    existing_id, reused = scan_cache.claim(fingerprint, scan_id, reuse=data.get('reuse', True))
+    if reused:
+        if created:
+            Scan.delete(scan_id)
+        return reused_scan_response(existing_id), 200
+    
+    # Создаем директорию для результатов
     result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-    result_file = os.path.join(result_dir, "processed_results.json")
+    os.makedirs(result_dir, exist_ok=True)
+    
+    # Адрес хоста из URL для hostInfo.ip
+    ip = resolver.first_ip(urlparse(target).hostname or "")
+    Scan.set_request(scan_id, target, fingerprint=fingerprint, ip=ip)
+    
+    # Ставим сканирование в очередь пула
+    scan_executor.submit(
+        scan_id, "web",
+        {"target": target, "tools": tools, "result_dir": result_dir, "ip": ip},
+        priority=data.get("priority", "normal")
+    )
+    
+    return {
+        "id": scan_id,
+        "status": ScanStatus.QUEUED,
+        "message": "Web scan started successfully"
+    }, 200
+
+
+def schedule_scan(kind, data, schedule):
+    """
+    Сохраняет сканирование в планировщике
+    
+    schedule содержит date и time первого запуска и/или cron для
+    повторяющихся сканирований, а также необязательный jitter в секундах.
+    Идентификатор первого запуска резервируется сразу.
+    Возвращает (ответ, HTTP-код).
+    """
+    run_at = None
+    if schedule.get('date') and schedule.get('time'):
+        try:
+            run_at = datetime.datetime.fromisoformat(f"{schedule['date']}T{schedule['time']}")
+        except ValueError:
+            return {"error": "Invalid schedule date or time"}, 400
+    
+    scan_id = new_scan_id(kind, data, ScanStatus.SCHEDULED)
+    if scan_id is None:
+        return {"error": "Failed to create scan"}, 500
+    request_data = {key: value for key, value in data.items() if key != 'schedule'}
+    
+    # Статус выставляется до сохранения: просроченное расписание планировщик запускает сразу
+    set_scan_status(scan_id, ScanStatus.SCHEDULED)
+    try:
+        entry = scan_scheduler.add(
+            kind, request_data,
+            run_at=run_at,
+            cron=schedule.get('cron'),
+            scan_id=scan_id,
+            jitter=schedule.get('jitter')
+        )
+    except ValueError as e:
+        active_scans.pop(scan_id, None)
+        Scan.delete(scan_id)
+        return {"error": str(e)}, 400
+    
+    return {
+        "id": scan_id, 
+        "status": ScanStatus.SCHEDULED, 
+        "message": "Scan scheduled successfully",
+        "scheduleId": entry["id"],
+        "scheduledTime": entry["nextRun"],
+        "cron": entry["cron"]
+    }, 200
+
+
+def scheduled_launcher(start):
+    """Запуск сканирования планировщиком: низкий приоритет и без переиспользования результатов"""
+    def launch(scan_id, data):
+        data = dict(data, priority=data.get("priority", "low"), reuse=data.get("reuse", False))
+        response, code = start(data, scan_id)
+        if code != 200:
+            if scan_id is not None:
+                set_scan_status(scan_id, ScanStatus.FAILED)
+            raise ValueError(response.get("error"))
+        
+        # Зарезервированный идентификатор не понадобился: присоединились к идентичному сканированию
+        if scan_id is not None and response["id"] != scan_id:
+            active_scans.pop(scan_id, None)
+            Scan.delete(scan_id)
+        return response["id"]
+    return launch
+
+
+def mark_scan_scheduled(scan_id):
+    """Восстанавливает статус зарезервированного запуска после перезапуска"""
+    set_scan_status(scan_id, ScanStatus.SCHEDULED)
+
+
+scan_scheduler.register("nmap", scheduled_launcher(start_nmap_scan), on_scheduled=mark_scan_scheduled)
+scan_scheduler.register("web", scheduled_launcher(start_web_scan), on_scheduled=mark_scan_scheduled)
+
+
+scan_executor.register("nmap", run_nmap_job, on_status=set_scan_status)
+scan_executor.register("web", run_web_job, on_status=set_scan_status)
+
+
+@scan_bp.record_once
+def start_scan_executor(state):
+    """Запускает пул сканирований и планировщик при регистрации blueprint"""
+    scan_executor.start()
+    scan_scheduler.start()
+
+
+# API endpoints
+
+def encode_cursor(key):
+    """Курсор следующей страницы: сортировка и ключ последней строки"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor, size=4):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        key = None
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def is_sqlite_int(value):
+    """Целое (не bool), которое помещается в INTEGER SQLite"""
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+def parse_date_arg(value, end=False):
+    """Граница диапазона дат в формате поля date; дата без времени в to включает весь день"""
+    moment = datetime.datetime.fromisoformat(value.rstrip("Z"))
+    if end and len(value) == 10:
+        moment += datetime.timedelta(days=1)
+    return moment.isoformat()
+
+
+def split_arg(args, name):
+    return [item for value in args.getlist(name) for item in value.split(",") if item]
+
+
+@scan_bp.route('/all', methods=['GET'])
+@jwt_required()
+def get_all_scans():
+    """
+    Возвращает страницу списка сканирований (сводки без уязвимостей и портов)
+    
+    Параметры: status и type (через запятую), target (подстрока), from и to
+    (даты ISO), sort (date, id, target, status, type, findings, high), order
+    (asc/desc), limit и cursor из nextCursor предыдущей страницы.
+    """
+    args = request.args
+    sort = args.get('sort', 'date')
+    order = args.get('order', 'desc')
+    if sort not in SCAN_SORT_COLUMNS or order not in ('asc', 'desc'):
+        return jsonify({"error": f"sort must be one of {', '.join(SCAN_SORT_COLUMNS)}, order asc or desc"}), 400
+    
+    try:
+        limit = min(max(1, int(args.get('limit', SCAN_LIST_LIMIT))), SCAN_LIST_MAX_LIMIT)
+        date_from = parse_date_arg(args['from']) if args.get('from') else None
+        date_to = parse_date_arg(args['to'], end=True) if args.get('to') else None
+        after = None
+        if args.get('cursor'):
+            cursor_sort, cursor_order, value, last_id = decode_cursor(args['cursor'])
+            if (cursor_sort, cursor_order) != (sort, order):
+                raise ValueError("Cursor belongs to a different sort order")
+            # Значения курсора передаются в запрос, поэтому проверяем их типы
+            if not (value is None or isinstance(value, (str, float)) or is_sqlite_int(value)) \
+                    or not is_sqlite_int(last_id):
+                raise ValueError("Invalid cursor")
+            after = (value, last_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    scans, last = Scan.list_summaries(
+        statuses=split_arg(args, 'status'),
+        types=split_arg(args, 'type'),
+        target=args.get('target'),
+        date_from=date_from,
+        date_to=date_to,
+        sort=sort,
+        descending=order == 'desc',
+        limit=limit,
+        after=after
+    )
+    return jsonify({
+        "scans": scans,
+        "nextCursor": encode_cursor([sort, order, *last]) if last else None
+    })
+
+
+@scan_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_findings():
+    """
+    Полнотекстовый поиск по уязвимостям и сервисам открытых портов всех сканирований
+    
+    Параметры: q (слова ищутся вместе, слово с * на конце - как префикс),
+    type (vulnerability, port через запятую), limit и cursor из nextCursor
+    предыдущей страницы. Результаты отсортированы по релевантности.
+    """
+    args = request.args
+    text = args.get('q', '')
+    kinds = split_arg(args, 'type')
+    if any(kind not in ('vulnerability', 'port') for kind in kinds):
+        return jsonify({"error": "type must be vulnerability or port"}), 400
+    
+    try:
+        limit = min(max(1, int(args.get('limit', SEARCH_LIMIT))), SEARCH_MAX_LIMIT)
+        offset = 0
+        if args.get('cursor'):
+            cursor_text, offset = decode_cursor(args['cursor'], size=2)
+            if not is_sqlite_int(offset) or offset < 0:
+                raise ValueError("Invalid cursor")
+            if cursor_text != text:
+                raise ValueError("Cursor belongs to a different query")
+        results, more = Scan.search(text, kinds=kinds, limit=limit, offset=offset)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "results": results,
+        "nextCursor": encode_cursor([text, offset + limit]) if more else None
+    })
+
+
+@scan_bp.route('/<int:scan_id>', methods=['GET'])
+@jwt_required()
+def get_scan_by_id(scan_id):
+    """Возвращает детали сканирования по ID"""
+    response = cached_scan_response(scan_id, "details", Scan.get_details)
+    if response is None:
+        return jsonify({"error": "Scan not found"}), 404
+    
+    return response
+
+
+@scan_bp.route('/<int:scan_id>/hosts', methods=['GET'])
+@jwt_required()
+def get_scan_hosts(scan_id):
+    """Возвращает сводку по хостам сканирования (адрес, ОС, число портов и уязвимостей)"""
+    response = cached_scan_response(scan_id, "hosts", lambda i: Scan.get_hosts(i) or None)
+    if response is None:
+        return jsonify({"error": "Host results not found"}), 404
+    
+    return response
+
+
+@scan_bp.route('/<int:scan_id>/hosts/<string:host>', methods=['GET'])
+@jwt_required()
+def get_scan_host(scan_id, host):
+    """Возвращает порты и уязвимости одного хоста, не загружая результаты остальных"""
+    host_data = Scan.get_host(scan_id, host)
+    if host_data is None:
+        return jsonify({"error": "Host not found"}), 404
+    
+    return jsonify(host_data)
+
+
+@scan_bp.route('/<int:scan_id>/artifacts', methods=['GET'])
+@jwt_required()
+def get_scan_artifacts(scan_id):
+    """Возвращает список сырых выводов инструментов (читается только заголовок архива)"""
+    if Scan.get_version(scan_id) is None:
+        return jsonify({"error": "Scan not found"}), 404
+    
+    return jsonify(list_artifacts(os.path.join(SCAN_RESULTS_DIR, str(scan_id))))
+
+
+@scan_bp.route('/<int:scan_id>/artifacts/<path:name>', methods=['GET'])
+@jwt_required()
+def get_scan_artifact(scan_id, name):
+    """Отдает один сырой вывод инструмента, распаковывая его по мере передачи"""
+    try:
+        artifact = open_artifact(os.path.join(SCAN_RESULTS_DIR, str(scan_id)), name)
+    except FileNotFoundError:
+        return jsonify({"error": "Artifact not found"}), 404
+    
+    def generate():
+        with artifact:
+            while chunk := artifact.read(64 * 1024):
+                yield chunk
     
-    if os.path.exists(result_file):
-        return jsonify({"id": scan_id, "status": ScanStatus.COMPLETED})
+    mimetype = "application/xml" if name.endswith(".xml") else "application/json" if name.endswith(".json") else "text/plain"
+    return Response(generate(), mimetype=mimetype)
+
+
+@scan_bp.route('/new', methods=['POST'])
+@jwt_required()
+def create_scan():
+    """
+    Создает новое сканирование
+    
+    Принимает JSON с параметрами сканирования и ставит его в очередь
+    или в планировщик, если указан schedule
+    """
+    data = request.get_json()
+    data['userId'] = current_user_id()
+    
+    # Проверяем, запланировано ли сканирование
+    schedule = data.get('schedule')
+    if schedule:
+        if not data.get('target'):
+            return jsonify({"error": "Target is required"}), 400
+        valid, error_msg = validate_target(data['target'], data.get('targetType', 'hostname'))
+        if not valid:
+            return jsonify({"error": error_msg}), 400
+        response, code = schedule_scan("nmap", data, schedule)
+        return jsonify(response), code
+    
+    response, code = start_nmap_scan(data)
+    return jsonify(response), code
+
+
+@scan_bp.route('/schedules', methods=['GET'])
+@jwt_required()
+def get_schedules():
+    """Возвращает запланированные сканирования"""
+    return jsonify(scan_scheduler.list())
+
+
+@scan_bp.route('/schedules/<int:schedule_id>', methods=['DELETE'])
+@jwt_required()
+def delete_schedule(schedule_id):
+    """Удаляет запланированное сканирование"""
+    entry = next((s for s in scan_scheduler.list() if s["id"] == schedule_id), None)
+    if entry is None or not scan_scheduler.remove(schedule_id):
+        return jsonify({"error": "Schedule not found"}), 404
+    
+    # Зарезервированный запуск больше не состоится
+    if entry["scanId"] is not None and active_scans.get(entry["scanId"]) == ScanStatus.SCHEDULED:
+        active_scans.pop(entry["scanId"], None)
+        Scan.delete(entry["scanId"])
+    
+    return jsonify({"id": schedule_id, "message": "Schedule removed"})
+
+
+@scan_bp.route('/status/<int:scan_id>', methods=['GET'])
+@jwt_required()
+def get_scan_status(scan_id):
+    """Возвращает текущий статус сканирования"""
+    if scan_id in active_scans:
+        status = {"id": scan_id, "status": active_scans[scan_id]}
+        if scan_id in scan_progress:
+            with scan_progress_lock:
+                status["progress"] = copy.deepcopy(scan_progress[scan_id])
+        return jsonify(status)
     
-    # Проверяем в mock данных
-    scan = next((s for s in mock_scans if s["id"] == scan_id), None)
+    scan = Scan.get_summary(scan_id)
     if scan:
         return jsonify({"id": scan_id, "status": scan["status"]})
     
     return jsonify({"error": "Scan not found"}), 404
 
 
+@scan_bp.route('/cancel/<int:scan_id>', methods=['POST'])
+@jwt_required()
+def cancel_scan(scan_id):
+    """
+    Отменяет сканирование
+    
+    Ожидающее в очереди сканирование удаляется из нее, у выполняющегося
+    завершается все дерево процессов инструментов; частичные результаты
+    сохраняются, статус станет CANCELLED
+    """
+    status = active_scans.get(scan_id)
+    if status is None:
+        return jsonify({"error": "Scan not found"}), 404
+    if status == ScanStatus.SCHEDULED:
+        return jsonify({"error": "Scan is scheduled, remove its schedule instead"}), 409
+    if status not in (ScanStatus.QUEUED, ScanStatus.RUNNING):
+        return jsonify({"error": f"Scan is already {status}"}), 409
+    
+    for kind in ("nmap", "web"):
+        if scan_executor.cancel(kind, scan_id):
+            set_scan_status(scan_id, ScanStatus.CANCELLED)
+            return jsonify({"id": scan_id, "status": ScanStatus.CANCELLED, "message": "Scan cancelled"})
+        if scan_control.cancel(kind, scan_id):
+            return jsonify({
+                "id": scan_id,
+                "status": active_scans.get(scan_id),
+                "message": "Scan is being stopped"
+            }), 202
+    
+    return jsonify({"error": "Scan is not in progress"}), 409
+
+
+def get_last_event_id():
+    """Идентификатор последнего полученного клиентом события"""
+    return int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+
+
+@scan_bp.route('/events', methods=['GET'])
+@jwt_required()
+def stream_scan_events():
+    """
+    Поток Server-Sent Events об изменениях статусов и результатов сканирований
+    
+    Клиент получает событие только когда что-то изменилось, между
+    событиями отправляются лишь комментарии keep-alive
+    """
+    try:
+        since = get_last_event_id()
+    except ValueError:
+        return jsonify({"error": "Invalid event id"}), 400
+    
+    def generate():
+        last_id = since
+        while True:
+            events = scan_events.wait(last_id, EVENT_HEARTBEAT_INTERVAL)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@scan_bp.route('/events/poll', methods=['GET'])
+@jwt_required()
+def poll_scan_events():
+    """Long-poll: ждет новых событий после since и возвращает их списком"""
+    try:
+        since = get_last_event_id()
+        timeout = min(float(request.args.get('timeout', 25)), EVENT_POLL_MAX_TIMEOUT)
+    except ValueError:
+        return jsonify({"error": "Invalid since or timeout"}), 400
+    
+    events = scan_events.wait(since, max(0, timeout))
+    return jsonify({
+        "events": events,
+        "lastEventId": events[-1]["id"] if events else scan_events.last_id
+    })
+
+
+def security_score(high, medium, low):
+    """Оценка безопасности по числу уязвимостей завершенных сканирований"""
+    return max(0, 100 - (high * 15 + medium * 5 + low))
+
+
 @scan_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard_data():
     """Возвращает данные для дашборда"""
-    # Получаем все сканирования (включая активные)
-    scan_list = []
-    
-    # Добавляем mock данные
-    for scan in mock_scans:
-        # Проверяем, не обновлен ли статус в active_scans
-        if scan["id"] in active_scans:
-            scan_copy = scan.copy()
-            scan_copy["status"] = active_scans[scan["id"]]
-            scan_list.append(scan_copy)
-        else:
-            scan_list.append(scan)
-    
-    # Добавляем активные сканирования, которых нет в mock данных
-    for scan_id, status in active_scans.items():
-        if not any(s["id"] == scan_id for s in scan_list):
-            result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-            result_file = os.path.join(result_dir, "processed_results.json")
-            
-            if os.path.exists(result_file):
-                with open(result_file, "r") as f:
-                    scan_data = json.load(f)
-                scan_data["status"] = status
-                scan_list.append(scan_data)
-            else:
-                scan_list.append({
-                    "id": scan_id,
-                    "status": status,
-                    "date": datetime.datetime.now().isoformat() + "Z"
-                })
-    
-    # Фильтруем завершенные сканирования
-    completed_scans = [s for s in scan_list if s["status"] == ScanStatus.COMPLETED]
-    running_scans = [s for s in scan_list if s["status"] == ScanStatus.RUNNING]
-    scheduled_scans = [s for s in scan_list if s["status"] == ScanStatus.SCHEDULED]
-    
-    # Подсчитываем общее количество уязвимостей
-    total_high = sum(s.get("findings", {}).get("high", 0) for s in completed_scans)
-    total_medium = sum(s.get("findings", {}).get("medium", 0) for s in completed_scans)
-    total_low = sum(s.get("findings", {}).get("low", 0) for s in completed_scans)
+    # Данные меняются вместе с версией счетчиков, а изменения за период - со сменой дня
+    # Счетчики поддерживаются триггерами БД, история хранится по дням;
+    # версия читается один раз и идет и в проверку If-None-Match, и в ETag.
+    # Расписания считаются по планировщику: повторяющееся остается в счетчике
+    # и после первого запуска, поэтому их число тоже входит в ETag
+    today = datetime.date.today().isoformat()
+    stats = Scan.dashboard_stats(DASHBOARD_TREND_DAYS, DASHBOARD_CHANGE_DAYS)
+    scheduled = scan_scheduler.count()
+    tag = f"dashboard-{stats['version']}-{scheduled}-{today}"
+    response = not_modified_response(tag, stats["updated_at"])
+    if response is not None:
+        return response
+    
+    # Общее количество уязвимостей завершенных сканирований
+    total_high = stats["high"]
+    total_medium = stats["medium"]
+    total_low = stats["low"]
     total_findings = total_high + total_medium + total_low
     
     # Рассчитываем security score
-    security_score = 100
-    if total_findings > 0:
-        security_score = max(0, 100 - (total_high * 15 + total_medium * 5 + total_low))
+    security_score_now = security_score(total_high, total_medium, total_low)
+    
+    # График по дням; последняя точка - текущее значение
+    trend = [security_score(day["high"], day["medium"], day["low"]) for day in stats["trend"]]
+    if not stats["trend"] or stats["trend"][-1]["day"] != today:
+        trend = (trend + [security_score_now])[-DASHBOARD_TREND_DAYS:]
     
-    # Сортируем сканирования по дате (новые в начале)
-    recent_scans = sorted(
-        (s for s in scan_list if s["status"] == ScanStatus.COMPLETED),
-        key=lambda x: x["date"],
-        reverse=True
-    )[:3]
+    # Изменения относительно последнего дня не позже DASHBOARD_CHANGE_DAYS назад
+    baseline = stats["baseline"]
+    score_change = security_score_now - security_score(baseline["high"], baseline["medium"], baseline["low"]) if baseline else 0
+    scan_count_change = stats["scans"] - baseline["scans"] if baseline else 0
+    
+    # Последние завершенные сканирования (новые в начале)
+    recent_scans = stats["recentScans"]
     
     # Формируем данные для дашборда
     dashboard_data = {
-        "securityScore": security_score,
-        "securityScoreChange": 5,  # В реальном приложении это был бы расчет на основе истории
-        "securityStatus": "Good" if security_score > 70 else "Fair" if security_score > 50 else "Poor",
-        "scanCount": len(scan_list),
-        "scanCountChange": 3,  # В реальном приложении это был бы расчет на основе истории
+        "securityScore": security_score_now,
+        "securityScoreChange": score_change,
+        "securityStatus": "Good" if security_score_now > 70 else "Fair" if security_score_now > 50 else "Poor",
+        "scanCount": stats["scans"],
+        "scanCountChange": scan_count_change,
         "vulnerabilities": {
             "high": total_high,
             "medium": total_medium,
             "low": total_low,
             "total": total_findings,
-            "resolved": 7  # В реальном приложении это было бы число исправленных уязвимостей
+            "resolved": stats["resolved"]
         },
-        "securityTrend": [65, 68, 72, 70, 73, security_score],  # Историю можно сохранять в БД
+        "securityTrend": trend,
         "recentScans": recent_scans,
         "criticalAlerts": [
             {
@@ -698,7 +1467,7 @@ def get_dashboard_data():
                 "title": "High Severity Vulnerabilities Detected" if total_high > 0 else "Security Scan Completed",
                 "severity": "high" if total_high > 0 else "medium",
                 "time": "1 hour ago",
-                "target": "multiple hosts" if len(completed_scans) > 1 else (completed_scans[0]["target"] if completed_scans else ""),
+                "target": "multiple hosts" if stats["completed"] > 1 else (recent_scans[0]["target"] if recent_scans else ""),
                 "status": "active"
             },
             {
@@ -708,19 +1477,20 @@ def get_dashboard_data():
                 "time": "5 hours ago",
                 "target": "web-server.example.com",
                 "status": "active"
-            } if any("SSL Certificate" in s.get("name", "") for s in 
-                    [v for scan in completed_scans 
-                     for v in scan.get("vulnerabilities", [])]) else None
+            } if stats["sslAlert"] else None
         ],
-        "securedAssets": len(set(s["target"] for s in scan_list)),
-        "monitoredEndpoints": len(set(s["target"] for s in scan_list)) + 8,  # Дополнительно мониторимые точки
-        "scheduleScans": len(scheduled_scans)
+        "securedAssets": stats["targets"],
+        "monitoredEndpoints": stats["targets"] + 8,  # Дополнительно мониторимые точки
+        "scheduleScans": scheduled
     }
     
     # Удаляем None из списка criticalAlerts
     dashboard_data["criticalAlerts"] = [alert for alert in dashboard_data["criticalAlerts"] if alert is not None]
     
-    return jsonify(dashboard_data)
+    return versioned_json_response(
+        current_app.json.response(dashboard_data).get_data(),
+        tag, stats["updated_at"]
+    )
 
 
 @scan_bp.route('/tools', methods=['GET'])
@@ -749,390 +1519,20 @@ def get_available_tools():
 def create_web_scan():
     """Создает новое сканирование для веб-приложений с использованием специализированных инструментов"""
     data = request.get_json()
+    data['userId'] = current_user_id()
     
-    # Проверка необходимых параметров
-    if not data.get('target'):
-        return jsonify({"error": "Target is required"}), 400
-    
-    # Получаем параметры сканирования
-    target = data.get('target')
-    tools = data.get('tools', ["nikto"])  # По умолчанию используем nikto
-    
-    # Валидация цели (для веб-сканирования это должен быть URL)
-    if not target.startswith(('http://', 'https://')):
-        target = 'http://' + target
-    
-    # Создаем уникальный ID для сканирования
-    scan_id = len(mock_scans) + len(active_scans) + 1
-    
-    # Создаем директорию для результатов
-    result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-    os.makedirs(result_dir, exist_ok=True)
-    
-    # Устанавливаем статус "в очереди"
-    active_scans[scan_id] = ScanStatus.QUEUED
-    
-    # Функция для выполнения сканирования в отдельном потоке
-    def run_web_scan():
-        try:
-            active_scans[scan_id] = ScanStatus.RUNNING
-            
-            results = {
-                "target": target,
-                "scan_id": scan_id,
-                "tools_results": {},
-                "vulnerabilities": [],
-                "status": ScanStatus.RUNNING,
-                "start_time": datetime.datetime.now().isoformat() + "Z"
-            }
-            
-            # Запускаем указанные инструменты
-            vuln_id = 1
-            
-            # Nikto - веб-сканер
-            if "nikto" in tools:
-                nikto_output = os.path.join(result_dir, "nikto_results.json")
-                nikto_results = run_nikto_scan(target, nikto_output)
-                
-                if nikto_results:
-                    results["tools_results"]["nikto"] = nikto_results
-                    
-                    # Обрабатываем результаты nikto
-                    for item in nikto_results.get("vulnerabilities", []):
-                        severity = "low"  # По умолчанию
-                        
-                        # Определяем серьезность уязвимости
-                        if "XSS" in item.get("title", "") or "SQL Injection" in item.get("title", "") or \
-                           "Remote Command Execution" in item.get("title", ""):
-                            severity = "high"
-                        elif "Information Disclosure" in item.get("title", "") or \
-                             "Default Credentials" in item.get("title", ""):
-                            severity = "medium"
-                        
-                        vulnerability = {
-                            "id": f"vuln-{scan_id}-{vuln_id}",
-                            "name": item.get("title", "Unknown"),
-                            "description": item.get("message", ""),
-                            "severity": severity,
-                            "details": f"{item.get('message', '')} (OSVDB: {item.get('osvdbid', 'N/A')})",
-                            "category": "web",
-                            "remediation": "Please refer to the OSVDB entry for remediation information.",
-                            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                            "status": "open"
-                        }
-                        
-                        results["vulnerabilities"].append(vulnerability)
-                        vuln_id += 1
-            
-            # Dirb/Gobuster - сканер директорий
-            if "dirb" in tools or "gobuster" in tools:
-                # Предпочитаем gobuster, если доступен
-                tool = "gobuster" if "gobuster" in tools else "dirb"
-                dirb_output = os.path.join(result_dir, f"{tool}_results.txt")
-                
-                # Команда для сканирования директорий
-                if tool == "gobuster":
-                    cmd = ["gobuster", "dir", "-u", target, "-w", "/usr/share/wordlists/dirb/common.txt", "-o", dirb_output]
-                else:
-                    cmd = ["dirb", target, "/usr/share/wordlists/dirb/common.txt", "-o", dirb_output]
-                
-                try:
-                    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                    stdout, stderr = process.communicate()
-                    
-                    # Если есть результаты, обрабатываем их
-                    if os.path.exists(dirb_output) and os.path.getsize(dirb_output) > 0:
-                        results["tools_results"][tool] = {"output_file": dirb_output}
-                        
-                        # На основе найденных директорий создаем уязвимости низкой серьезности
-                        with open(dirb_output, "r") as f:
-                            content = f.read()
-                        
-                        # Ищем интересные пути
-                        interesting_paths = []
-                        for line in content.splitlines():
-                            if "admin" in line or "login" in line or "config" in line or \
-                               "backup" in line or "wp-" in line or ".git" in line:
-                                interesting_paths.append(line)
-                        
-                        # Если найдены интересные пути, создаем уязвимость
-                        if interesting_paths:
-                            vulnerability = {
-                                "id": f"vuln-{scan_id}-{vuln_id}",
-                                "name": "Sensitive Directories Exposed",
-                                "description": "Potentially sensitive directories were discovered on the web server.",
-                                "severity": "medium",
-                                "details": "The following sensitive directories were found: " + 
-                                           ", ".join(interesting_paths[:5]) + 
-                                           (f" and {len(interesting_paths) - 5} more." if len(interesting_paths) > 5 else ""),
-                                "category": "web",
-                                "remediation": "Restrict access to sensitive directories or remove them if not needed.",
-                                "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                "status": "open"
-                            }
-                            
-                            results["vulnerabilities"].append(vulnerability)
-                            vuln_id += 1
-                
-                except Exception as e:
-                    print(f"Error running {tool}: {e}")
-            
-            # SSLScan - проверка SSL/TLS
-            if "sslscan" in tools and target.startswith("https://"):
-                sslscan_output = os.path.join(result_dir, "sslscan_results.xml")
-                
-                # Извлекаем домен из URL
-                domain = target.split("//")[1].split("/")[0]
-                
-                cmd = ["sslscan", "--xml=" + sslscan_output, domain]
-                
-                try:
-                    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                    stdout, stderr = process.communicate()
-                    
-                    # Если есть результаты, обрабатываем их
-                    if os.path.exists(sslscan_output) and os.path.getsize(sslscan_output) > 0:
-                        try:
-                            tree = ET.parse(sslscan_output)
-                            root = tree.getroot()
-                            
-                            results["tools_results"]["sslscan"] = {"output_file": sslscan_output}
-                            
-                            # Проверяем поддержку устаревших протоколов
-                            ssl_protocols = root.findall(".//protocol")
-                            for protocol in ssl_protocols:
-                                if protocol.get("type") in ["ssl2", "ssl3", "tls1", "tls1_1"] and protocol.get("enabled") == "1":
-                                    vulnerability = {
-                                        "id": f"vuln-{scan_id}-{vuln_id}",
-                                        "name": f"Deprecated SSL/TLS Protocol: {protocol.get('type')}",
-                                        "description": f"The server supports deprecated SSL/TLS protocol: {protocol.get('type')}",
-                                        "severity": "medium",
-                                        "details": f"The server at {domain} supports {protocol.get('type').upper()}, " +
-                                                   "which is considered insecure and has known vulnerabilities.",
-                                        "category": "encryption",
-                                        "remediation": "Disable older SSL/TLS protocols and only enable TLS 1.2 and TLS 1.3.",
-                                        "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                        "status": "open"
-                                    }
-                                    
-                                    results["vulnerabilities"].append(vulnerability)
-                                    vuln_id += 1
-                            
-                            # Проверяем слабые шифры
-                            weak_ciphers = []
-                            ciphers = root.findall(".//cipher")
-                            for cipher in ciphers:
-                                if "NULL" in cipher.get("cipher", "") or \
-                                   "RC4" in cipher.get("cipher", "") or \
-                                   "DES" in cipher.get("cipher", "") or \
-                                   "EXPORT" in cipher.get("cipher", ""):
-                                    weak_ciphers.append(cipher.get("cipher", ""))
-                            
-                            if weak_ciphers:
-                                vulnerability = {
-                                    "id": f"vuln-{scan_id}-{vuln_id}",
-                                    "name": "Weak SSL/TLS Cipher Suites",
-                                    "description": "The server supports weak cipher suites",
-                                    "severity": "medium",
-                                    "details": f"The server at {domain} supports the following weak cipher suites: " +
-                                               ", ".join(weak_ciphers),
-                                    "category": "encryption",
-                                    "remediation": "Disable weak cipher suites and only enable strong ciphers with forward secrecy.",
-                                    "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                    "status": "open"
-                                }
-                                
-                                results["vulnerabilities"].append(vulnerability)
-                                vuln_id += 1
-                            
-                            # Проверяем срок действия сертификата
-                            certificate = root.find(".//certificate")
-                            if certificate:
-                                expires = certificate.find(".//expires")
-                                if expires is not None:
-                                    expires_text = expires.text
-                                    expires_date = datetime.datetime.strptime(expires_text, "%b %d %H:%M:%S %Y GMT")
-                                    now = datetime.datetime.now()
-                                    days_left = (expires_date - now).days
-                                    
-                                    if days_left < 30:
-                                        vulnerability = {
-                                            "id": f"vuln-{scan_id}-{vuln_id}",
-                                            "name": "SSL Certificate Expiring Soon",
-                                            "description": f"The SSL certificate will expire in {days_left} days",
-                                            "severity": "medium" if days_left < 15 else "low",
-                                            "details": f"The SSL certificate for {domain} will expire on {expires_text}.",
-                                            "category": "encryption",
-                                            "remediation": "Renew the SSL certificate before it expires.",
-                                            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                            "status": "open"
-                                        }
-                                        
-                                        results["vulnerabilities"].append(vulnerability)
-                                        vuln_id += 1
-                        
-                        except Exception as e:
-                            print(f"Error parsing sslscan results: {e}")
-                
-                except Exception as e:
-                    print(f"Error running sslscan: {e}")
-            
-            # WPScan - для WordPress сайтов
-            if "wpscan" in tools:
-                wpscan_output = os.path.join(result_dir, "wpscan_results.json")
-                
-                cmd = ["wpscan", "--url", target, "--format", "json", "--output", wpscan_output]
-                
-                try:
-                    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                    stdout, stderr = process.communicate()
-                    
-                    # Если есть результаты, обрабатываем их
-                    if os.path.exists(wpscan_output) and os.path.getsize(wpscan_output) > 0:
-                        with open(wpscan_output, "r") as f:
-                            wpscan_data = json.load(f)
-                        
-                        results["tools_results"]["wpscan"] = wpscan_data
-                        
-                        # Обрабатываем найденные плагины
-                        if "plugins" in wpscan_data:
-                            for plugin_name, plugin_data in wpscan_data["plugins"].items():
-                                if "vulnerabilities" in plugin_data and plugin_data["vulnerabilities"]:
-                                    for vuln in plugin_data["vulnerabilities"]:
-                                        vulnerability = {
-                                            "id": f"vuln-{scan_id}-{vuln_id}",
-                                            "name": f"WordPress Plugin Vulnerability: {plugin_name}",
-                                            "description": vuln.get("title", ""),
-                                            "severity": "high",  # Большинство уязвимостей плагинов критичны
-                                            "details": f"The WordPress plugin {plugin_name} " +
-                                                       f"(version {plugin_data.get('version', {}).get('number', 'unknown')}) " +
-                                                       f"has a vulnerability: {vuln.get('title', '')}\n\n" +
-                                                       f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
-                                            "category": "web",
-                                            "remediation": "Update the plugin to the latest version or replace it with a secure alternative.",
-                                            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                            "status": "open"
-                                        }
-                                        
-                                        results["vulnerabilities"].append(vulnerability)
-                                        vuln_id += 1
-                        
-                        # Обрабатываем найденные темы
-                        if "themes" in wpscan_data:
-                            for theme_name, theme_data in wpscan_data["themes"].items():
-                                if "vulnerabilities" in theme_data and theme_data["vulnerabilities"]:
-                                    for vuln in theme_data["vulnerabilities"]:
-                                        vulnerability = {
-                                            "id": f"vuln-{scan_id}-{vuln_id}",
-                                            "name": f"WordPress Theme Vulnerability: {theme_name}",
-                                            "description": vuln.get("title", ""),
-                                            "severity": "high",
-                                            "details": f"The WordPress theme {theme_name} " +
-                                                       f"(version {theme_data.get('version', {}).get('number', 'unknown')}) " +
-                                                       f"has a vulnerability: {vuln.get('title', '')}\n\n" +
-                                                       f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
-                                            "category": "web",
-                                            "remediation": "Update the theme to the latest version or replace it with a secure alternative.",
-                                            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                            "status": "open"
-                                        }
-                                        
-                                        results["vulnerabilities"].append(vulnerability)
-                                        vuln_id += 1
-                        
-                        # Обрабатываем версию WordPress
-                        if "wordpress" in wpscan_data and "version" in wpscan_data["wordpress"]:
-                            wp_version = wpscan_data["wordpress"]["version"]
-                            if "vulnerabilities" in wp_version and wp_version["vulnerabilities"]:
-                                for vuln in wp_version["vulnerabilities"]:
-                                    vulnerability = {
-                                        "id": f"vuln-{scan_id}-{vuln_id}",
-                                        "name": f"WordPress Core Vulnerability",
-                                        "description": vuln.get("title", ""),
-                                        "severity": "high",
-                                        "details": f"The WordPress installation (version {wp_version.get('number', 'unknown')}) " +
-                                                   f"has a vulnerability: {vuln.get('title', '')}\n\n" +
-                                                   f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
-                                        "category": "web",
-                                        "remediation": "Update WordPress to the latest version.",
-                                        "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
-                                        "status": "open"
-                                    }
-                                    
-                                    results["vulnerabilities"].append(vulnerability)
-                                    vuln_id += 1
-                
-                except Exception as e:
-                    print(f"Error running wpscan: {e}")
-            
-            # SQLMap - для поиска SQL инъекций
-            if "sqlmap" in tools:
-                # SQLMap может работать только с формами или параметрами
-                # Для демонстрации просто отметим, что инструмент был запущен
-                results["tools_results"]["sqlmap"] = {
-                    "note": "SQLMap requires specific URLs with parameters or forms to test."
-                }
-                
-                # В реальном приложении здесь был бы код для поиска форм на сайте,
-                # а затем проверки их на SQL инъекции
-            
-            # Обновляем результаты сканирования
-            # Считаем количество уязвимостей по уровням серьезности
-            high_count = sum(1 for v in results["vulnerabilities"] if v["severity"] == "high")
-            medium_count = sum(1 for v in results["vulnerabilities"] if v["severity"] == "medium")
-            low_count = sum(1 for v in results["vulnerabilities"] if v["severity"] == "low")
-            
-            # Формируем итоговый результат в формате, совместимом с фронтендом
-            scan_result = {
-                "id": scan_id,
-                "target": target,
-                "date": results["start_time"],
-                "status": ScanStatus.COMPLETED,
-                "duration": 180,  # Примерно 3 минуты
-                "findings": {
-                    "high": high_count,
-                    "medium": medium_count,
-                    "low": low_count,
-                    "total": high_count + medium_count + low_count,
-                    "resolved": 0
-                },
-                "vulnerabilities": results["vulnerabilities"],
-                "openPorts": [],  # Для веб-сканирования это не так важно
-                "hostInfo": {
-                    "hostname": target,
-                    "ip": "",  # Можно добавить с помощью socket.gethostbyname
-                    "operatingSystem": "Unknown"
-                },
-                "scanOptions": {
-                    "tools": tools
-                }
-            }
-            
-            # Сохраняем результаты в JSON файл
-            with open(os.path.join(result_dir, "processed_results.json"), "w") as f:
-                json.dump(scan_result, f, indent=2)
-            
-            # Обновляем статус сканирования
-            active_scans[scan_id] = ScanStatus.COMPLETED
-            print(f"Web scan {scan_id} completed successfully")
-            
-        except Exception as e:
-            active_scans[scan_id] = ScanStatus.FAILED
-            print(f"Error during web scan {scan_id}: {e}")
-            
-            # Сохраняем информацию об ошибке
-            with open(os.path.join(result_dir, "error.log"), "w") as f:
-                f.write(str(e))
-    
-    # Запускаем сканирование в отдельном потоке
-    thread = threading.Thread(target=run_web_scan)
-    thread.start()
-    
-    return jsonify({
-        "id": scan_id,
-        "status": ScanStatus.QUEUED,
-        "message": "Web scan started successfully"
-    })
+    schedule = data.get('schedule')
+    if schedule:
+        if not data.get('target'):
+            return jsonify({"error": "Target is required"}), 400
+        valid, error_msg = validate_web_target(web_target_url(data['target']))
+        if not valid:
+            return jsonify({"error": error_msg}), 400
+        response, code = schedule_scan("web", data, schedule)
+        return jsonify(response), code
+    
+    response, code = start_web_scan(data)
+    return jsonify(response), code
 
 
 @scan_bp.route('/check-port/<string:host>/<int:port>', methods=['GET'])
@@ -1160,50 +1560,127 @@ def check_port(host, port):
         })
 
 
+@scan_bp.route('/check-ports', methods=['POST'])
+@jwt_required()
+def check_ports():
+    """
+    Проверяет много пар хост/порт одновременно
+    
+    Принимает targets (список {host, port}) и/или hosts и ports (все
+    комбинации), а также необязательные concurrency и timeout. Результаты
+    отдаются потоком NDJSON по мере готовности, последней строкой - итог.
+    """
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be an object"}), 400
+    try:
+        probes = expand_probes(data)
+        concurrency = min(int(data.get('concurrency', PORTCHECK_CONCURRENCY)), PORTCHECK_CONCURRENCY)
+        timeout = min(float(data.get('timeout', PORTCHECK_TIMEOUT)), PORTCHECK_MAX_TIMEOUT)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        open_count = 0
+        for result in iter_port_checks(probes, max(1, concurrency), max(0.1, timeout)):
+            open_count += result["open"]
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": len(probes), "open": open_count}) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @scan_bp.route('/dns-info/<string:domain>', methods=['GET'])
 @jwt_required()
 def get_dns_info(domain):
-    """Получает DNS информацию о домене"""
-    try:
-        # Получаем IP адреса
-        ip_addresses = socket.gethostbyname_ex(domain)[2]
-        
-        # В реальном приложении можно было бы использовать dnspython для
-        # получения дополнительной информации (MX, NS, CNAME, и т.д.)
-        
-        return jsonify({
-            "domain": domain,
-            "ip_addresses": ip_addresses,
-            "status": "success"
-        })
-    except Exception as e:
-        return jsonify({
-            "domain": domain,
-            "error": str(e),
-            "status": "error"
-        })
+    """Получает DNS информацию о домене (через кэширующий резолвер)"""
+    return jsonify(resolver.resolve(domain))
+
+
+@scan_bp.route('/dns-info', methods=['POST'])
+@jwt_required()
+def get_dns_info_batch():
+    """Разрешает список доменов параллельно, результаты в порядке запроса"""
+    data = request.get_json() or {}
+    domains = data.get('domains')
+    if not isinstance(domains, list) or not all(isinstance(d, str) for d in domains):
+        return jsonify({"error": "domains must be a list of names"}), 400
+    if len(domains) > DNS_BATCH_MAX:
+        return jsonify({"error": f"At most {DNS_BATCH_MAX} domains are allowed"}), 400
+    
+    return jsonify({"results": resolver.resolve_many(domains)})
+
+
+# Параметры, с которыми список уязвимостей фильтруется и отдается постранично
+VULN_QUERY_ARGS = ('severity', 'category', 'status', 'q', 'fields', 'exclude', 'limit', 'cursor')
 
 
 @scan_bp.route('/vulnerabilities/<int:scan_id>', methods=['GET'])
 @jwt_required()
 def get_vulnerabilities(scan_id):
-    """Возвращает список уязвимостей для сканирования"""
-    # Проверяем, есть ли результаты в файловой системе
-    result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-    result_file = os.path.join(result_dir, "processed_results.json")
-    
-    if os.path.exists(result_file):
-        with open(result_file, "r") as f:
-            scan_data = json.load(f)
-        
-        return jsonify(scan_data.get("vulnerabilities", []))
+    """
+    Возвращает список уязвимостей для сканирования
     
-    # Если нет результатов на диске, ищем в mock данных
-    scan = next((s for s in mock_scans if s["id"] == scan_id), None)
-    if scan:
-        return jsonify(scan.get("vulnerabilities", []))
+    Без параметров отдается весь список. Параметры severity, category и status
+    (через запятую), q (подстрока в названии, описании, деталях или хосте),
+    fields или exclude (поля ответа, например exclude=details), limit и cursor
+    из nextCursor предыдущей страницы возвращают страницу
+    {"vulnerabilities", "nextCursor"}.
+    """
+    args = request.args
+    if not any(name in args for name in VULN_QUERY_ARGS):
+        response = cached_scan_response(scan_id, "vulnerabilities", Scan.get_vulnerabilities)
+        if response is None:
+            return jsonify({"error": "Scan not found"}), 404
+        return response
+    
+    fields = split_arg(args, 'fields') or list(VULNERABILITY_FIELDS)
+    excluded = split_arg(args, 'exclude')
+    unknown = [field for field in fields + excluded if field not in VULNERABILITY_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    fields = [field for field in fields if field not in excluded]
     
-    return jsonify({"error": "Scan not found"}), 404
+    try:
+        limit = min(max(1, int(args.get('limit', VULN_LIST_LIMIT))), VULN_LIST_MAX_LIMIT)
+        after = None
+        if args.get('cursor'):
+            cursor_scan_id, after = decode_cursor(args['cursor'], size=2)
+            if cursor_scan_id != scan_id or not isinstance(after, int):
+                raise ValueError("Cursor belongs to a different scan")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    revision = Scan.get_revision(scan_id)
+    if revision is None:
+        return jsonify({"error": "Scan not found"}), 404
+    
+    # Страница меняется вместе с версией сканирования и параметрами запроса
+    version, last_modified = revision
+    query = hashlib.sha1(request.query_string).hexdigest()[:16]
+    tag = f"scan-{scan_id}-vulnerabilities-{version}-{query}"
+    response = not_modified_response(tag, last_modified)
+    if response is not None:
+        return response
+    
+    vulnerabilities, last = Scan.list_vulnerabilities(
+        scan_id,
+        severities=split_arg(args, 'severity'),
+        categories=split_arg(args, 'category'),
+        statuses=split_arg(args, 'status'),
+        text=args.get('q'),
+        fields=fields,
+        limit=limit,
+        after=after
+    )
+    body = current_app.json.response({
+        "vulnerabilities": vulnerabilities,
+        "nextCursor": encode_cursor([scan_id, last]) if last else None
+    }).get_data()
+    return versioned_json_response(body, tag, last_modified)
 
 
 @scan_bp.route('/vulnerability/<int:scan_id>/<string:vuln_id>/status', methods=['PUT'])
@@ -1216,60 +1693,45 @@ def update_vulnerability_status(scan_id, vuln_id):
     if new_status not in ['open', 'resolved']:
         return jsonify({"error": "Invalid status. Must be 'open' or 'resolved'"}), 400
     
-    # Проверяем, есть ли результаты в файловой системе
-    result_dir = os.path.join(SCAN_RESULTS_DIR, str(scan_id))
-    result_file = os.path.join(result_dir, "processed_results.json")
+    # Обновляется одна строка уязвимости и счетчик resolved ее сканирования
+    if Scan.set_vulnerability_status(scan_id, vuln_id, new_status):
+        notify_results_changed(scan_id, vulnerability=vuln_id)
+        return jsonify({
+            "id": vuln_id,
+            "status": new_status,
+            "message": f"Vulnerability status updated to {new_status}"
+        })
     
-    if os.path.exists(result_file):
-        with open(result_file, "r") as f:
-            scan_data = json.load(f)
-        
-        # Ищем уязвимость по ID
-        for vuln in scan_data.get("vulnerabilities", []):
-            if vuln["id"] == vuln_id:
-                vuln["status"] = new_status
-                
-                # Обновляем счетчики в findings
-                findings = scan_data.get("findings", {})
-                if new_status == "resolved":
-                    findings["resolved"] = findings.get("resolved", 0) + 1
-                else:
-                    findings["resolved"] = max(0, findings.get("resolved", 0) - 1)
-                
-                # Сохраняем обновленные данные
-                with open(result_file, "w") as f:
-                    json.dump(scan_data, f, indent=2)
-                
-                return jsonify({
-                    "id": vuln_id,
-                    "status": new_status,
-                    "message": f"Vulnerability status updated to {new_status}"
-                })
-        
-        return jsonify({"error": "Vulnerability not found"}), 404
+    if Scan.get_summary(scan_id) is None:
+        return jsonify({"error": "Scan not found"}), 404
+    return jsonify({"error": "Vulnerability not found"}), 404
+
+
+@scan_bp.route('/vulnerability/<int:scan_id>/status', methods=['PUT'])
+@jwt_required()
+def update_vulnerabilities_status(scan_id):
+    """Обновляет статус нескольких уязвимостей сканирования в одной транзакции"""
+    data = request.get_json(silent=True) or {}
+    new_status = data.get('status')
+    vuln_ids = data.get('ids')
     
-    # Если нет результатов на диске, ищем в mock данных
-    scan = next((s for s in mock_scans if s["id"] == scan_id), None)
-    if scan:
-        # Ищем уязвимость по ID
-        for vuln in scan.get("vulnerabilities", []):
-            if vuln["id"] == vuln_id:
-                vuln["status"] = new_status
-                
-                # Обновляем счетчики в findings
-                findings = scan.get("findings", {})
-                if new_status == "resolved":
-                    findings["resolved"] = findings.get("resolved", 0) + 1
-                else:
-                    findings["resolved"] = max(0, findings.get("resolved", 0) - 1)
-                
-                return jsonify({
-                    "id": vuln_id,
-                    "status": new_status,
-                    "message": f"Vulnerability status updated to {new_status}"
-                })
-        
-        return jsonify({"error": "Vulnerability not found"}), 404
+    if new_status not in ['open', 'resolved']:
+        return jsonify({"error": "Invalid status. Must be 'open' or 'resolved'"}), 400
+    if not isinstance(vuln_ids, list) or not vuln_ids or not all(isinstance(v, str) for v in vuln_ids):
+        return jsonify({"error": "ids must be a non-empty list of vulnerability IDs"}), 400
+    if len(vuln_ids) > VULN_BULK_MAX:
+        return jsonify({"error": f"Too many vulnerabilities, maximum is {VULN_BULK_MAX}"}), 400
     
-    return jsonify({"error": "Scan not found"}), 404
-            
\ No newline at end of file
+    if Scan.get_summary(scan_id) is None:
+        return jsonify({"error": "Scan not found"}), 404
+    
+    updated, not_found = Scan.set_vulnerability_statuses(scan_id, vuln_ids, new_status)
+    if updated:
+        notify_results_changed(scan_id, vulnerabilities=updated)
+    
+    return jsonify({
+        "status": new_status,
+        "updated": updated,
+        "notFound": not_found,
+        "message": f"{len(updated)} vulnerabilities updated to {new_status}"
+    })
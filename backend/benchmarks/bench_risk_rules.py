@@ -0,0 +1,98 @@
+"""
+Micro-benchmark of the risk classification of NSE script results
+
+Compares the former per-script substring loops with the compiled rule
+engine, for repeated script ids (the usual case) and for unique texts
+that miss the classification cache. Fails when the engine is slower than
+the loops in either case.
+
+    python benchmarks/bench_risk_rules.py [number of results]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.risk_rules import classify, get_engine
+
+SCRIPT_IDS = [
+    "ssl-heartbleed", "ms17-010", "smb-vuln-cve-2017-7494", "ftp-vsftpd-backdoor", "ssl-poodle",
+    "ssl-ccs-injection", "http-shellshock", "ssl-dh-params", "ssl-cert-expiry", "http-csrf",
+    "http-dombased-xss", "http-passwd", "http-enum", "ftp-anon", "ssh-hostkey", "http-title",
+    "mysql-info", "ms-sql-info", "oracle-tns-version", "smb-os-discovery", "tls-nextprotoneg",
+    "rdp-ntlm-info", "http-server-header", "ssh-auth-methods", "vulners", "banner"
+]
+
+HIGH_RISK_SCRIPTS = ["ssl-heartbleed", "ms17-010", "smb-vuln-", "ftp-vsftpd-backdoor",
+                     "ssl-poodle", "ssl-ccs-injection", "http-shellshock"]
+MEDIUM_RISK_SCRIPTS = ["ssl-dh-params", "ssl-cert-expiry", "http-csrf", "http-dombased-xss",
+                       "http-passwd", "http-enum", "ftp-anon"]
+
+
+def legacy_classify(script_id):
+    """Classification as it was done inline in parse_nmap_result"""
+    severity = "low"
+    for pattern in HIGH_RISK_SCRIPTS:
+        if pattern in script_id:
+            severity = "high"
+            break
+    if severity != "high":
+        for pattern in MEDIUM_RISK_SCRIPTS:
+            if pattern in script_id:
+                severity = "medium"
+                break
+
+    category = "web" if "http" in script_id else \
+               "encryption" if "ssl" in script_id or "tls" in script_id else \
+               "authentication" if "auth" in script_id or "passwd" in script_id else \
+               "database" if "mysql" in script_id or "mssql" in script_id or "oracle" in script_id else \
+               "network"
+
+    remediation = "Update the service to the latest version and apply security patches."
+    if "ssl" in script_id or "tls" in script_id:
+        remediation = "Configure the server to use only strong encryption protocols and cipher suites."
+    elif "http" in script_id:
+        remediation = "Update the web application and implement proper input validation and security headers."
+
+    return {"severity": severity, "category": category, "remediation": remediation}
+
+
+def measure(name, func, texts, repeat=5):
+    """Best of repeat runs over texts, in seconds"""
+    elapsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        run = time.perf_counter() - start
+        elapsed = run if elapsed is None else min(elapsed, run)
+    print(f"{name:<32} {elapsed * 1000:9.1f} ms  {len(texts) / elapsed:12,.0f} results/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    random.seed(1)
+    repeated = [random.choice(SCRIPT_IDS) for _ in range(count)]
+    unique = [f"{random.choice(SCRIPT_IDS)}-{i}" for i in range(count)]
+
+    # The engine must agree with the former logic before its speed matters
+    for script_id in SCRIPT_IDS + unique[:1000]:
+        assert classify("nmap", script_id) == legacy_classify(script_id), script_id
+
+    engine = get_engine()
+    print(f"{count:,} NSE results")
+    legacy_repeated = measure("legacy loops, repeated ids", legacy_classify, repeated)
+    cached = measure("engine + cache, repeated ids", lambda text: classify("nmap", text), repeated)
+    legacy_unique = measure("legacy loops, unique ids", legacy_classify, unique)
+    uncached = measure("engine, unique ids", lambda text: engine.classify("nmap", text), unique)
+
+    # Neither the cache nor the compiled rules may be slower than the former loops
+    assert cached <= legacy_repeated, "cached classification is slower than the legacy loops"
+    assert uncached <= legacy_unique, "uncached classification is slower than the legacy loops"
+
+
+if __name__ == "__main__":
+    main()
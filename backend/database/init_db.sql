@@ -14,9 +14,29 @@ CREATE TABLE scans (
     scan_type TEXT NOT NULL,
     status TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    target_type TEXT,
+    fingerprint TEXT,
+    ip TEXT NOT NULL DEFAULT '',
+    date TEXT,
+    duration INTEGER,
+    high_count INTEGER NOT NULL DEFAULT 0,
+    medium_count INTEGER NOT NULL DEFAULT 0,
+    low_count INTEGER NOT NULL DEFAULT 0,
+    total_count INTEGER NOT NULL DEFAULT 0,
+    resolved_count INTEGER NOT NULL DEFAULT 0,
+    host_info TEXT,
+    extra TEXT,
+    updated_at TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 0,
+    ssl_alerts INTEGER NOT NULL DEFAULT 0,
     FOREIGN KEY (user_id) REFERENCES users (id)
 );
 
+CREATE INDEX idx_scans_date ON scans (date);
+CREATE INDEX idx_scans_status ON scans (status, date);
+CREATE INDEX idx_scans_type ON scans (scan_type, date);
+CREATE INDEX idx_scans_fingerprint ON scans (fingerprint, status);
+
 CREATE TABLE scan_results (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     scan_id INTEGER NOT NULL,
@@ -24,3 +44,239 @@ CREATE TABLE scan_results (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (scan_id) REFERENCES scans (id)
 );
+
+CREATE TABLE scan_hosts (
+    scan_id INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    ip TEXT,
+    hostname TEXT,
+    state TEXT,
+    operating_system TEXT,
+    uptime TEXT,
+    last_boot TEXT,
+    PRIMARY KEY (scan_id, host),
+    FOREIGN KEY (scan_id) REFERENCES scans (id)
+);
+
+CREATE TABLE open_ports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id INTEGER NOT NULL,
+    host TEXT NOT NULL DEFAULT '',
+    port INTEGER NOT NULL,
+    service TEXT,
+    version TEXT,
+    FOREIGN KEY (scan_id) REFERENCES scans (id)
+);
+
+CREATE INDEX idx_open_ports_scan_host ON open_ports (scan_id, host);
+
+CREATE TABLE findings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id INTEGER NOT NULL,
+    vuln_id TEXT NOT NULL,
+    host TEXT NOT NULL DEFAULT '',
+    port INTEGER,
+    name TEXT NOT NULL,
+    description TEXT,
+    severity TEXT NOT NULL,
+    category TEXT,
+    details TEXT,
+    remediation TEXT,
+    date_discovered TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    UNIQUE (scan_id, vuln_id),
+    FOREIGN KEY (scan_id) REFERENCES scans (id)
+);
+
+CREATE INDEX idx_findings_scan ON findings (scan_id);
+CREATE INDEX idx_findings_scan_host ON findings (scan_id, host);
+CREATE INDEX idx_findings_scan_severity ON findings (scan_id, severity);
+CREATE INDEX idx_findings_scan_status ON findings (scan_id, status);
+
+CREATE VIRTUAL TABLE findings_fts USING fts5(
+    name, description, details, content='findings', content_rowid='id'
+);
+
+CREATE VIRTUAL TABLE open_ports_fts USING fts5(
+    service, version, content='open_ports', content_rowid='id'
+);
+
+CREATE TRIGGER findings_fts_insert AFTER INSERT ON findings
+BEGIN
+    INSERT INTO findings_fts (rowid, name, description, details)
+    VALUES (NEW.id, NEW.name, NEW.description, NEW.details);
+END;
+
+CREATE TRIGGER findings_fts_delete AFTER DELETE ON findings
+BEGIN
+    INSERT INTO findings_fts (findings_fts, rowid, name, description, details)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.details);
+END;
+
+CREATE TRIGGER findings_fts_update AFTER UPDATE OF name, description, details ON findings
+BEGIN
+    INSERT INTO findings_fts (findings_fts, rowid, name, description, details)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.details);
+    INSERT INTO findings_fts (rowid, name, description, details)
+    VALUES (NEW.id, NEW.name, NEW.description, NEW.details);
+END;
+
+CREATE TRIGGER open_ports_fts_insert AFTER INSERT ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (rowid, service, version) VALUES (NEW.id, NEW.service, NEW.version);
+END;
+
+CREATE TRIGGER open_ports_fts_delete AFTER DELETE ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (open_ports_fts, rowid, service, version)
+    VALUES ('delete', OLD.id, OLD.service, OLD.version);
+END;
+
+CREATE TRIGGER open_ports_fts_update AFTER UPDATE OF service, version ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (open_ports_fts, rowid, service, version)
+    VALUES ('delete', OLD.id, OLD.service, OLD.version);
+    INSERT INTO open_ports_fts (rowid, service, version) VALUES (NEW.id, NEW.service, NEW.version);
+END;
+
+INSERT INTO findings_fts (findings_fts) VALUES ('rebuild');
+
+INSERT INTO open_ports_fts (open_ports_fts) VALUES ('rebuild');
+
+INSERT INTO findings_fts (findings_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)');
+
+INSERT INTO open_ports_fts (open_ports_fts, rank) VALUES ('rank', 'bm25(4.0, 2.0)');
+
+CREATE TABLE dashboard_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    scans INTEGER NOT NULL DEFAULT 0,
+    targets INTEGER NOT NULL DEFAULT 0,
+    scheduled INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    ssl_alerts INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE scan_targets (
+    target TEXT PRIMARY KEY,
+    scans INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE security_trend (
+    day TEXT PRIMARY KEY,
+    scans INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    resolved INTEGER NOT NULL
+);
+
+CREATE TRIGGER scans_stats_insert AFTER INSERT ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scans = scans + 1,
+        scheduled = scheduled + (NEW.status = 'scheduled'),
+        completed = completed + (NEW.status = 'completed'),
+        high = high + (NEW.status = 'completed') * NEW.high_count,
+        medium = medium + (NEW.status = 'completed') * NEW.medium_count,
+        low = low + (NEW.status = 'completed') * NEW.low_count,
+        resolved = resolved + (NEW.status = 'completed') * NEW.resolved_count,
+        ssl_alerts = ssl_alerts + (NEW.status = 'completed') * NEW.ssl_alerts
+    WHERE id = 1;
+    INSERT OR IGNORE INTO scan_targets (target) VALUES (NEW.target);
+    UPDATE scan_targets SET scans = scans + 1 WHERE target = NEW.target;
+END;
+
+CREATE TRIGGER scans_stats_update
+AFTER UPDATE OF status, high_count, medium_count, low_count, resolved_count, ssl_alerts ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scheduled = scheduled - (OLD.status = 'scheduled') + (NEW.status = 'scheduled'),
+        completed = completed - (OLD.status = 'completed') + (NEW.status = 'completed'),
+        high = high - (OLD.status = 'completed') * OLD.high_count + (NEW.status = 'completed') * NEW.high_count,
+        medium = medium - (OLD.status = 'completed') * OLD.medium_count + (NEW.status = 'completed') * NEW.medium_count,
+        low = low - (OLD.status = 'completed') * OLD.low_count + (NEW.status = 'completed') * NEW.low_count,
+        resolved = resolved - (OLD.status = 'completed') * OLD.resolved_count
+            + (NEW.status = 'completed') * NEW.resolved_count,
+        ssl_alerts = ssl_alerts - (OLD.status = 'completed') * OLD.ssl_alerts
+            + (NEW.status = 'completed') * NEW.ssl_alerts
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER scans_targets_update AFTER UPDATE OF target ON scans
+WHEN OLD.target IS NOT NEW.target
+BEGIN
+    UPDATE scan_targets SET scans = scans - 1 WHERE target = OLD.target;
+    DELETE FROM scan_targets WHERE target = OLD.target AND scans <= 0;
+    INSERT OR IGNORE INTO scan_targets (target) VALUES (NEW.target);
+    UPDATE scan_targets SET scans = scans + 1 WHERE target = NEW.target;
+END;
+
+CREATE TRIGGER scans_stats_delete AFTER DELETE ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scans = scans - 1,
+        scheduled = scheduled - (OLD.status = 'scheduled'),
+        completed = completed - (OLD.status = 'completed'),
+        high = high - (OLD.status = 'completed') * OLD.high_count,
+        medium = medium - (OLD.status = 'completed') * OLD.medium_count,
+        low = low - (OLD.status = 'completed') * OLD.low_count,
+        resolved = resolved - (OLD.status = 'completed') * OLD.resolved_count,
+        ssl_alerts = ssl_alerts - (OLD.status = 'completed') * OLD.ssl_alerts
+    WHERE id = 1;
+    UPDATE scan_targets SET scans = scans - 1 WHERE target = OLD.target;
+    DELETE FROM scan_targets WHERE target = OLD.target AND scans <= 0;
+END;
+
+CREATE TRIGGER scan_targets_insert AFTER INSERT ON scan_targets
+BEGIN
+    UPDATE dashboard_stats SET targets = targets + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER scan_targets_delete AFTER DELETE ON scan_targets
+BEGIN
+    UPDATE dashboard_stats SET targets = targets - 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER dashboard_stats_trend AFTER UPDATE ON dashboard_stats
+BEGIN
+    INSERT INTO security_trend (day, scans, high, medium, low, resolved)
+    VALUES (date('now', 'localtime'), NEW.scans, NEW.high, NEW.medium, NEW.low, NEW.resolved)
+    ON CONFLICT (day) DO UPDATE SET
+        scans = excluded.scans, high = excluded.high, medium = excluded.medium,
+        low = excluded.low, resolved = excluded.resolved;
+    UPDATE dashboard_stats SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+INSERT INTO dashboard_stats (id) VALUES (1);
+
+CREATE TABLE scan_queue (
+    scan_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (kind, scan_id)
+);
+
+CREATE TABLE scheduled_scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    request TEXT NOT NULL,
+    cron TEXT,
+    jitter INTEGER NOT NULL DEFAULT 0,
+    next_run REAL NOT NULL,
+    fire_at REAL NOT NULL,
+    scan_id INTEGER,
+    last_run REAL,
+    last_scan_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_scheduled_scans_fire_at ON scheduled_scans (fire_at);
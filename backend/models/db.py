@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../database/infosec.db')
+
+# How long a connection waits for a lock held by another connection (milliseconds)
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+# Prepared statements kept per connection, reused for identical SQL text
+SQLITE_STATEMENT_CACHE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+
+
+class ConnectionManager:
+    """Per-thread SQLite connections shared by the models
+
+    Each thread keeps one open connection, so its prepared statement cache
+    stays warm across calls. Connections are opened in autocommit mode with
+    WAL, synchronous=NORMAL and a busy timeout; writes that belong together
+    are grouped with transaction(). A process started by fork opens its own
+    connections instead of reusing the parent's.
+    """
+
+    def __init__(self, db_path=DB_PATH, busy_timeout=SQLITE_BUSY_TIMEOUT,
+                 statement_cache=SQLITE_STATEMENT_CACHE):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.statement_cache = statement_cache
+        self._setup = []
+        self._local = threading.local()
+
+    def on_connect(self, setup):
+        """Register setup(conn), called once for every connection before its first use
+
+        Connections that are already open run it on their next use.
+        """
+        self._setup.append(setup)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.statement_cache
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        return conn
+
+    def connection(self):
+        """Connection of the calling thread, opened on first use"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = self._open()
+            local.pid = os.getpid()
+            local.depth = 0
+            local.setup_done = 0
+        while local.setup_done < len(self._setup):
+            self._setup[local.setup_done](local.conn)
+            local.setup_done += 1
+        return local.conn
+
+    @contextmanager
+    def transaction(self):
+        """Commit the block atomically; nested blocks join the outer transaction"""
+        conn = self.connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        local.depth = 1
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            local.depth = 0
+
+    def close(self):
+        """Close the connection of the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.__dict__.clear()
+
+
+# Shared connection manager of the models
+db = ConnectionManager()
@@ -1,123 +1,606 @@
-import sqlite3
 import json
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from models.db import db
+
+# Columns added to the original scans table: request parameters and the result summary
+SCAN_COLUMNS = (
+    ('target_type', 'TEXT'),
+    ('fingerprint', 'TEXT'),
+    ('ip', "TEXT NOT NULL DEFAULT ''"),
+    ('date', 'TEXT'),
+    ('duration', 'INTEGER'),
+    ('high_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('medium_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('low_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('total_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('resolved_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('host_info', 'TEXT'),
+    ('extra', 'TEXT'),
+    ('updated_at', 'TIMESTAMP'),
+    ('version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('ssl_alerts', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+SCAN_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scan_hosts (
+    scan_id INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    ip TEXT,
+    hostname TEXT,
+    state TEXT,
+    operating_system TEXT,
+    uptime TEXT,
+    last_boot TEXT,
+    PRIMARY KEY (scan_id, host)
+);
+
+CREATE TABLE IF NOT EXISTS open_ports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id INTEGER NOT NULL,
+    host TEXT NOT NULL DEFAULT '',
+    port INTEGER NOT NULL,
+    service TEXT,
+    version TEXT
+);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id INTEGER NOT NULL,
+    vuln_id TEXT NOT NULL,
+    host TEXT NOT NULL DEFAULT '',
+    port INTEGER,
+    name TEXT NOT NULL,
+    description TEXT,
+    severity TEXT NOT NULL,
+    category TEXT,
+    details TEXT,
+    remediation TEXT,
+    date_discovered TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    UNIQUE (scan_id, vuln_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scans_date ON scans (date);
+CREATE INDEX IF NOT EXISTS idx_scans_status ON scans (status, date);
+CREATE INDEX IF NOT EXISTS idx_scans_type ON scans (scan_type, date);
+CREATE INDEX IF NOT EXISTS idx_scans_fingerprint ON scans (fingerprint, status);
+CREATE INDEX IF NOT EXISTS idx_open_ports_scan_host ON open_ports (scan_id, host);
+CREATE INDEX IF NOT EXISTS idx_findings_scan ON findings (scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_scan_host ON findings (scan_id, host);
+CREATE INDEX IF NOT EXISTS idx_findings_scan_severity ON findings (scan_id, severity);
+CREATE INDEX IF NOT EXISTS idx_findings_scan_status ON findings (scan_id, status);
+'''
+
+# Dashboard counters kept up to date by triggers on scans, and their daily history.
+# Findings, resolved and SSL alerts are counted for completed scans only.
+DASHBOARD_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    scans INTEGER NOT NULL DEFAULT 0,
+    targets INTEGER NOT NULL DEFAULT 0,
+    scheduled INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    ssl_alerts INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scan_targets (
+    target TEXT PRIMARY KEY,
+    scans INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS security_trend (
+    day TEXT PRIMARY KEY,
+    scans INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    resolved INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS scans_stats_insert AFTER INSERT ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scans = scans + 1,
+        scheduled = scheduled + (NEW.status = 'scheduled'),
+        completed = completed + (NEW.status = 'completed'),
+        high = high + (NEW.status = 'completed') * NEW.high_count,
+        medium = medium + (NEW.status = 'completed') * NEW.medium_count,
+        low = low + (NEW.status = 'completed') * NEW.low_count,
+        resolved = resolved + (NEW.status = 'completed') * NEW.resolved_count,
+        ssl_alerts = ssl_alerts + (NEW.status = 'completed') * NEW.ssl_alerts
+    WHERE id = 1;
+    INSERT OR IGNORE INTO scan_targets (target) VALUES (NEW.target);
+    UPDATE scan_targets SET scans = scans + 1 WHERE target = NEW.target;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scans_stats_update
+AFTER UPDATE OF status, high_count, medium_count, low_count, resolved_count, ssl_alerts ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scheduled = scheduled - (OLD.status = 'scheduled') + (NEW.status = 'scheduled'),
+        completed = completed - (OLD.status = 'completed') + (NEW.status = 'completed'),
+        high = high - (OLD.status = 'completed') * OLD.high_count + (NEW.status = 'completed') * NEW.high_count,
+        medium = medium - (OLD.status = 'completed') * OLD.medium_count + (NEW.status = 'completed') * NEW.medium_count,
+        low = low - (OLD.status = 'completed') * OLD.low_count + (NEW.status = 'completed') * NEW.low_count,
+        resolved = resolved - (OLD.status = 'completed') * OLD.resolved_count
+            + (NEW.status = 'completed') * NEW.resolved_count,
+        ssl_alerts = ssl_alerts - (OLD.status = 'completed') * OLD.ssl_alerts
+            + (NEW.status = 'completed') * NEW.ssl_alerts
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scans_targets_update AFTER UPDATE OF target ON scans
+WHEN OLD.target IS NOT NEW.target
+BEGIN
+    UPDATE scan_targets SET scans = scans - 1 WHERE target = OLD.target;
+    DELETE FROM scan_targets WHERE target = OLD.target AND scans <= 0;
+    INSERT OR IGNORE INTO scan_targets (target) VALUES (NEW.target);
+    UPDATE scan_targets SET scans = scans + 1 WHERE target = NEW.target;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scans_stats_delete AFTER DELETE ON scans
+BEGIN
+    UPDATE dashboard_stats SET
+        scans = scans - 1,
+        scheduled = scheduled - (OLD.status = 'scheduled'),
+        completed = completed - (OLD.status = 'completed'),
+        high = high - (OLD.status = 'completed') * OLD.high_count,
+        medium = medium - (OLD.status = 'completed') * OLD.medium_count,
+        low = low - (OLD.status = 'completed') * OLD.low_count,
+        resolved = resolved - (OLD.status = 'completed') * OLD.resolved_count,
+        ssl_alerts = ssl_alerts - (OLD.status = 'completed') * OLD.ssl_alerts
+    WHERE id = 1;
+    UPDATE scan_targets SET scans = scans - 1 WHERE target = OLD.target;
+    DELETE FROM scan_targets WHERE target = OLD.target AND scans <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scan_targets_insert AFTER INSERT ON scan_targets
+BEGIN
+    UPDATE dashboard_stats SET targets = targets + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scan_targets_delete AFTER DELETE ON scan_targets
+BEGIN
+    UPDATE dashboard_stats SET targets = targets - 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS dashboard_stats_trend AFTER UPDATE ON dashboard_stats
+BEGIN
+    INSERT INTO security_trend (day, scans, high, medium, low, resolved)
+    VALUES (date('now', 'localtime'), NEW.scans, NEW.high, NEW.medium, NEW.low, NEW.resolved)
+    ON CONFLICT (day) DO UPDATE SET
+        scans = excluded.scans, high = excluded.high, medium = excluded.medium,
+        low = excluded.low, resolved = excluded.resolved;
+    UPDATE dashboard_stats SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+'''
+
+# Counters of the existing scans, used once when the dashboard tables are created
+DASHBOARD_BACKFILL = '''
+INSERT INTO dashboard_stats (id, scans, scheduled, completed, high, medium, low, resolved, ssl_alerts)
+SELECT 1, COUNT(*),
+    COALESCE(SUM(status = 'scheduled'), 0),
+    COALESCE(SUM(status = 'completed'), 0),
+    COALESCE(SUM((status = 'completed') * high_count), 0),
+    COALESCE(SUM((status = 'completed') * medium_count), 0),
+    COALESCE(SUM((status = 'completed') * low_count), 0),
+    COALESCE(SUM((status = 'completed') * resolved_count), 0),
+    COALESCE(SUM((status = 'completed') * ssl_alerts), 0)
+FROM scans;
+
+INSERT INTO scan_targets (target, scans) SELECT target, COUNT(*) FROM scans GROUP BY target;
+'''
+
+# Full-text indexes of findings and open port services, kept in sync by triggers
+SEARCH_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5(
+    name, description, details, content='findings', content_rowid='id'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS open_ports_fts USING fts5(
+    service, version, content='open_ports', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS findings_fts_insert AFTER INSERT ON findings
+BEGIN
+    INSERT INTO findings_fts (rowid, name, description, details)
+    VALUES (NEW.id, NEW.name, NEW.description, NEW.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS findings_fts_delete AFTER DELETE ON findings
+BEGIN
+    INSERT INTO findings_fts (findings_fts, rowid, name, description, details)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS findings_fts_update AFTER UPDATE OF name, description, details ON findings
+BEGIN
+    INSERT INTO findings_fts (findings_fts, rowid, name, description, details)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.details);
+    INSERT INTO findings_fts (rowid, name, description, details)
+    VALUES (NEW.id, NEW.name, NEW.description, NEW.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS open_ports_fts_insert AFTER INSERT ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (rowid, service, version) VALUES (NEW.id, NEW.service, NEW.version);
+END;
+
+CREATE TRIGGER IF NOT EXISTS open_ports_fts_delete AFTER DELETE ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (open_ports_fts, rowid, service, version)
+    VALUES ('delete', OLD.id, OLD.service, OLD.version);
+END;
+
+CREATE TRIGGER IF NOT EXISTS open_ports_fts_update AFTER UPDATE OF service, version ON open_ports
+BEGIN
+    INSERT INTO open_ports_fts (open_ports_fts, rowid, service, version)
+    VALUES ('delete', OLD.id, OLD.service, OLD.version);
+    INSERT INTO open_ports_fts (rowid, service, version) VALUES (NEW.id, NEW.service, NEW.version);
+END;
+'''
+
+# Index of the existing rows and the column weights of the ranking (names weigh most)
+SEARCH_BACKFILL = '''
+INSERT INTO findings_fts (findings_fts) VALUES ('rebuild');
+
+INSERT INTO open_ports_fts (open_ports_fts) VALUES ('rebuild');
+
+INSERT INTO findings_fts (findings_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)');
+
+INSERT INTO open_ports_fts (open_ports_fts, rank) VALUES ('rank', 'bm25(4.0, 2.0)');
+'''
+
+# Tables derived from the scan data: (table, schema, statements run when the table is created)
+DERIVED_SCHEMAS = (
+    ('dashboard_stats', DASHBOARD_SCHEMA, DASHBOARD_BACKFILL),
+    ('findings_fts', SEARCH_SCHEMA, SEARCH_BACKFILL),
+)
+
+# Findings updated per statement by set_vulnerability_statuses (bound parameters per IN list)
+VULN_UPDATE_CHUNK = 500
+
+# Findings that raise the SSL certificate alert of the dashboard
+SSL_ALERT_PATTERN = '%SSL Certificate%'
+
+# Result keys that have their own columns or tables, the rest is kept in scans.extra
+RESULT_KEYS = ('id', 'target', 'type', 'date', 'status', 'duration', 'findings',
+               'vulnerabilities', 'openPorts', 'hostInfo', 'hosts')
+
+# Sort keys of the scan list and their columns
+SCAN_SORT_COLUMNS = {
+    'date': 'date',
+    'id': 'id',
+    'target': 'target',
+    'status': 'status',
+    'type': 'scan_type',
+    'findings': 'total_count',
+    'high': 'high_count',
+}
+
+# Vulnerability fields of the API and their columns, in output order
+VULNERABILITY_FIELDS = {
+    'id': 'vuln_id',
+    'host': 'host',
+    'port': 'port',
+    'name': 'name',
+    'description': 'description',
+    'severity': 'severity',
+    'details': 'details',
+    'category': 'category',
+    'remediation': 'remediation',
+    'dateDiscovered': 'date_discovered',
+    'status': 'status',
+}
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema(conn):
+    """Add the result tables and columns once per process"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(scans)')}
+        for name, definition in SCAN_COLUMNS:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE scans ADD COLUMN {name} {definition}')
+        conn.executescript(SCAN_SCHEMA)
+        # Scans created before the date column existed are listed by their creation time
+        conn.execute("UPDATE scans SET date = replace(created_at, ' ', 'T') || 'Z' WHERE date IS NULL")
+        if 'ssl_alerts' not in existing:
+            conn.execute(
+                'UPDATE scans SET ssl_alerts = (SELECT COUNT(*) FROM findings f '
+                'WHERE f.scan_id = scans.id AND f.name LIKE ?)', (SSL_ALERT_PATTERN,)
+            )
+        
+        # Derived tables and their triggers are created together with their initial contents
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for table, schema, backfill in DERIVED_SCHEMAS:
+                created = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone() is None
+                statements = schema.split(';\n\n')
+                if created:
+                    # The dashboard triggers count the targets while scan_targets is filled
+                    statements += backfill.split(';\n\n')
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        _schema_ready = True
+
+
+db.on_connect(_ensure_schema)
+
+
+def _timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) as an aware datetime"""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+
+def _findings(row):
+    return {
+        "high": row['high_count'],
+        "medium": row['medium_count'],
+        "low": row['low_count'],
+        "total": row['total_count'],
+        "resolved": row['resolved_count']
+    }
+
+
+def _summary(row):
+    """List view of a scan: no hosts, ports or vulnerabilities"""
+    return {
+        "id": row['id'],
+        "target": row['target'],
+        "type": row['scan_type'],
+        "date": row['date'],
+        "status": row['status'],
+        "duration": row['duration'],
+        "findings": _findings(row)
+    }
+
+
+def _vulnerability(row, fields=VULNERABILITY_FIELDS):
+    """API view of a finding; host and port are left out when the finding has none"""
+    vulnerability = {}
+    for field in fields:
+        value = row[VULNERABILITY_FIELDS[field]]
+        if field == 'host' and not value or field == 'port' and value is None:
+            continue
+        vulnerability[field] = value
+    return vulnerability
+
+
+def _like_pattern(text):
+    """LIKE pattern matching text anywhere, for use with ESCAPE '\\'"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts_query(text):
+    """FTS5 query matching all words of text; a word ending in * matches as a prefix
+    
+    Every word is quoted, so CVE IDs, versions and paths are searched as
+    phrases of their tokens instead of being parsed as query syntax.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _open_port(row):
+    port = {"port": row['port'], "service": row['service'], "version": row['version']}
+    if row['host']:
+        port = dict(host=row['host'], **port)
+    return port
+
+
+def _host(row):
+    return {
+        "ip": row['ip'],
+        "hostname": row['hostname'],
+        "state": row['state'],
+        "operatingSystem": row['operating_system'],
+        "uptime": row['uptime'],
+        "lastBoot": row['last_boot'],
+        "host": row['host'],
+        "findings": {
+            "high": row['high_count'],
+            "medium": row['medium_count'],
+            "low": row['low_count'],
+            "total": row['total_count'],
+            "resolved": row['resolved_count']
+        },
+        "openPorts": row['open_ports']
+    }
+
+
+# Ranked matches of both full-text indexes with the scan they belong to
+SEARCH_QUERY = '''
+SELECT r.*, s.target, s.date FROM (
+    SELECT 'vulnerability' AS kind, f.scan_id, f.vuln_id, f.host, f.port, f.name, f.severity, f.status,
+        NULL AS service, NULL AS version,
+        snippet(findings_fts, -1, '[', ']', '...', 16) AS snippet, findings_fts.rank AS rank
+    FROM findings_fts JOIN findings f ON f.id = findings_fts.rowid
+    WHERE findings_fts MATCH ? AND ?
+    UNION ALL
+    SELECT 'port', p.scan_id, NULL, p.host, p.port, NULL, NULL, NULL, p.service, p.version,
+        snippet(open_ports_fts, -1, '[', ']', '...', 16), open_ports_fts.rank
+    FROM open_ports_fts JOIN open_ports p ON p.id = open_ports_fts.rowid
+    WHERE open_ports_fts MATCH ? AND ?
+) r
+JOIN scans s ON s.id = r.scan_id
+ORDER BY r.rank, r.scan_id DESC
+LIMIT ? OFFSET ?
+'''
+
+# Search result fields of each kind, after the common ones
+SEARCH_FIELDS = {
+    'vulnerability': (('id', 'vuln_id'), ('host', 'host'), ('port', 'port'), ('name', 'name'),
+                      ('severity', 'severity'), ('status', 'status')),
+    'port': (('host', 'host'), ('port', 'port'), ('service', 'service'), ('version', 'version')),
+}
+
+
+def _search_result(row):
+    result = {
+        "type": row['kind'],
+        "scanId": row['scan_id'],
+        "target": row['target'],
+        "date": row['date'],
+    }
+    for field, column in SEARCH_FIELDS[row['kind']]:
+        if row[column] not in (None, ''):
+            result[field] = row[column]
+    result.update(snippet=row['snippet'], score=round(-row['rank'], 4))
+    return result
+
+
+# Hosts of a scan with their counters, computed from the indexed findings and open_ports
+HOSTS_QUERY = '''
+SELECT h.*,
+    (SELECT COUNT(*) FROM open_ports p WHERE p.scan_id = h.scan_id AND p.host = h.host) AS open_ports,
+    COUNT(f.id) AS total_count,
+    COALESCE(SUM(f.severity = 'high'), 0) AS high_count,
+    COALESCE(SUM(f.severity = 'medium'), 0) AS medium_count,
+    COALESCE(SUM(f.severity = 'low'), 0) AS low_count,
+    COALESCE(SUM(f.status = 'resolved'), 0) AS resolved_count
+FROM scan_hosts h
+LEFT JOIN findings f ON f.scan_id = h.scan_id AND f.host = h.host
+WHERE h.scan_id = ? {condition}
+GROUP BY h.host
+ORDER BY h.rowid
+'''
+
 
 class Scan:
-    def __init__(self, id=None, user_id=None, target=None, scan_type=None, status="pending"):
+    def __init__(self, id=None, user_id=None, target=None, scan_type=None, status="pending",
+                 target_type=None, fingerprint=None, ip=""):
         self.id = id
         self.user_id = user_id
         self.target = target
         self.scan_type = scan_type
         self.status = status
+        self.target_type = target_type
+        self.fingerprint = fingerprint
+        self.ip = ip
         self.created_at = datetime.now()
     
     @staticmethod
     def get_db_connection():
-        conn = sqlite3.connect('database/infosec.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+        return db.connection()
     
     def save(self):
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                'INSERT INTO scans (user_id, target, scan_type, status) VALUES (?, ?, ?, ?)',
-                (self.user_id, self.target, self.scan_type, self.status)
-            )
-            conn.commit()
+            with db.transaction() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO scans (user_id, target, scan_type, status, target_type, fingerprint, ip, date) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (self.user_id, self.target, self.scan_type, self.status,
+                     self.target_type, self.fingerprint, self.ip, self.created_at.isoformat() + "Z")
+                )
             self.id = cursor.lastrowid
             return True
         except Exception as e:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
     
     def update_status(self, status):
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                'UPDATE scans SET status = ? WHERE id = ?',
-                (status, self.id)
-            )
-            conn.commit()
+            with db.transaction() as conn:
+                conn.execute(
+                    'UPDATE scans SET status = ?, updated_at = CURRENT_TIMESTAMP, version = version + 1 WHERE id = ?',
+                    (status, self.id)
+                )
             self.status = status
             return True
         except:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
     
     def save_result(self, result_data):
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                'INSERT INTO scan_results (scan_id, result_data) VALUES (?, ?)',
-                (self.id, json.dumps(result_data) if isinstance(result_data, dict) else result_data)
-            )
-            conn.commit()
+            with db.transaction() as conn:
+                conn.execute(
+                    'INSERT INTO scan_results (scan_id, result_data) VALUES (?, ?)',
+                    (self.id, json.dumps(result_data) if isinstance(result_data, dict) else result_data)
+                )
             return True
         except:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
+    
+    def finish(self, status, result_data):
+        """Save the result and the final status in one transaction"""
+        try:
+            with db.transaction():
+                if not self.save_result(result_data) or not self.update_status(status):
+                    raise RuntimeError(f"Failed to save result of scan {self.id}")
+            return True
+        except Exception:
+            return False
+    
+    @classmethod
+    def _from_row(cls, row):
+        scan = cls()
+        scan.id = row['id']
+        scan.user_id = row['user_id']
+        scan.target = row['target']
+        scan.scan_type = row['scan_type']
+        scan.status = row['status']
+        scan.target_type = row['target_type']
+        scan.fingerprint = row['fingerprint']
+        scan.ip = row['ip']
+        return scan
     
     @classmethod
     def find_by_id(cls, scan_id):
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM scans WHERE id = ?', (scan_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = db.connection().execute('SELECT * FROM scans WHERE id = ?', (scan_id,)).fetchone()
         
         if row:
-            scan = cls()
-            scan.id = row['id']
-            scan.user_id = row['user_id']
-            scan.target = row['target']
-            scan.scan_type = row['scan_type']
-            scan.status = row['status']
-            return scan
+            return cls._from_row(row)
         return None
     
     @classmethod
     def find_by_user_id(cls, user_id):
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM scans WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        rows = db.connection().execute(
+            'SELECT * FROM scans WHERE user_id = ? ORDER BY created_at DESC', (user_id,)
+        ).fetchall()
         
-        scans = []
-        for row in rows:
-            scan = cls()
-            scan.id = row['id']
-            scan.user_id = row['user_id']
-            scan.target = row['target']
-            scan.scan_type = row['scan_type']
-            scan.status = row['status']
-            scans.append(scan)
-        
-        return scans
+        return [cls._from_row(row) for row in rows]
+    
+    @classmethod
+    def find_previous(cls, fingerprint, exclude_id=None):
+        """Latest completed scan with the same fingerprint (target and arguments)"""
+        row = db.connection().execute(
+            "SELECT id FROM scans WHERE fingerprint = ? AND status = 'completed' AND id != ? "
+            "ORDER BY id DESC LIMIT 1",
+            (fingerprint, exclude_id or 0)
+        ).fetchone()
+        return row['id'] if row else None
     
     @classmethod
     def get_result(cls, scan_id):
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT result_data FROM scan_results WHERE scan_id = ?', (scan_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = db.connection().execute(
+            'SELECT result_data FROM scan_results WHERE scan_id = ?', (scan_id,)
+        ).fetchone()
         
         if row:
             try:
@@ -125,3 +608,305 @@ class Scan:
             except:
                 return row['result_data']
         return None
+    
+    @classmethod
+    def set_status(cls, scan_id, status):
+        with db.transaction() as conn:
+            conn.execute(
+                'UPDATE scans SET status = ?, updated_at = CURRENT_TIMESTAMP, version = version + 1 WHERE id = ?',
+                (status, scan_id)
+            )
+    
+    @classmethod
+    def set_request(cls, scan_id, target, target_type=None, fingerprint=None, ip=""):
+        """Store the normalized target and fingerprint once the scan command is known"""
+        with db.transaction() as conn:
+            conn.execute(
+                'UPDATE scans SET target = ?, target_type = ?, fingerprint = ?, ip = ?, version = version + 1 WHERE id = ?',
+                (target, target_type, fingerprint, ip, scan_id)
+            )
+    
+    @classmethod
+    def delete(cls, scan_id):
+        with db.transaction() as conn:
+            for table in ('findings', 'open_ports', 'scan_hosts', 'scan_results'):
+                conn.execute(f'DELETE FROM {table} WHERE scan_id = ?', (scan_id,))
+            conn.execute('DELETE FROM scans WHERE id = ?', (scan_id,))
+    
+    @classmethod
+    def store_result(cls, scan_result):
+        """Replace the processed result of a scan: summary columns, hosts, open ports and findings"""
+        scan_id = scan_result["id"]
+        findings = scan_result["findings"]
+        extra = {key: value for key, value in scan_result.items() if key not in RESULT_KEYS}
+        ssl_alerts = sum(1 for v in scan_result.get("vulnerabilities", []) if "SSL Certificate" in v["name"])
+        
+        with db.transaction() as conn:
+            conn.execute(
+                'UPDATE scans SET target = ?, status = ?, date = ?, duration = ?, '
+                'high_count = ?, medium_count = ?, low_count = ?, total_count = ?, resolved_count = ?, '
+                'ssl_alerts = ?, host_info = ?, extra = ?, updated_at = CURRENT_TIMESTAMP, version = version + 1 '
+                'WHERE id = ?',
+                (scan_result["target"], scan_result["status"], scan_result.get("date"),
+                 scan_result.get("duration"), findings["high"], findings["medium"], findings["low"],
+                 findings["total"], findings.get("resolved", 0), ssl_alerts,
+                 json.dumps(scan_result.get("hostInfo", {})), json.dumps(extra), scan_id)
+            )
+            for table in ('findings', 'open_ports', 'scan_hosts'):
+                conn.execute(f'DELETE FROM {table} WHERE scan_id = ?', (scan_id,))
+            
+            conn.executemany(
+                'INSERT OR REPLACE INTO scan_hosts '
+                '(scan_id, host, ip, hostname, state, operating_system, uptime, last_boot) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(scan_id, h["host"], h.get("ip", ""), h.get("hostname", ""), h.get("state", ""),
+                  h.get("operatingSystem", "Unknown"), h.get("uptime", "Unknown"), h.get("lastBoot", "Unknown"))
+                 for h in scan_result.get("hosts", [])]
+            )
+            conn.executemany(
+                'INSERT INTO open_ports (scan_id, host, port, service, version) VALUES (?, ?, ?, ?, ?)',
+                [(scan_id, p.get("host", ""), p["port"], p.get("service"), p.get("version"))
+                 for p in scan_result.get("openPorts", [])]
+            )
+            conn.executemany(
+                'INSERT INTO findings (scan_id, vuln_id, host, port, name, description, severity, '
+                'category, details, remediation, date_discovered, status) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(scan_id, v["id"], v.get("host", ""), v.get("port"), v["name"], v.get("description"),
+                  v["severity"], v.get("category"), v.get("details"), v.get("remediation"),
+                  v.get("dateDiscovered"), v.get("status", "open"))
+                 for v in scan_result.get("vulnerabilities", [])]
+            )
+    
+    @classmethod
+    def list_summaries(cls, statuses=None, types=None, target=None, date_from=None, date_to=None,
+                       sort='date', descending=True, limit=50, after=None):
+        """One page of scan summaries
+        
+        Pages are read by keyset: after is the (sort value, id) of the last
+        row of the previous page. Returns (summaries, key of the last row),
+        the key is None on the last page.
+        """
+        column = SCAN_SORT_COLUMNS[sort]
+        conditions, params = [], []
+        if statuses:
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if types:
+            conditions.append(f"scan_type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        if target:
+            conditions.append("target LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(target))
+        if date_from:
+            conditions.append('date >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('date < ?')
+            params.append(date_to)
+        if after is not None:
+            conditions.append(f"({column}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        order = 'DESC' if descending else 'ASC'
+        rows = db.connection().execute(
+            f'SELECT * FROM scans {where} ORDER BY {column} {order}, id {order} LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+        
+        last = (rows[limit - 1][column], rows[limit - 1]['id']) if len(rows) > limit else None
+        return [_summary(row) for row in rows[:limit]], last
+    
+    @classmethod
+    def get_summary(cls, scan_id):
+        row = db.connection().execute('SELECT * FROM scans WHERE id = ?', (scan_id,)).fetchone()
+        return _summary(row) if row else None
+    
+    @classmethod
+    def get_version(cls, scan_id):
+        """Counter increased by every write to the scan, None when the scan does not exist"""
+        row = db.connection().execute('SELECT version FROM scans WHERE id = ?', (scan_id,)).fetchone()
+        return row['version'] if row else None
+    
+    @classmethod
+    def get_revision(cls, scan_id):
+        """(version, time of the last write) of the scan, None when it does not exist"""
+        row = db.connection().execute(
+            'SELECT version, COALESCE(updated_at, created_at) AS modified FROM scans WHERE id = ?', (scan_id,)
+        ).fetchone()
+        return (row['version'], _timestamp(row['modified'])) if row else None
+    
+    @classmethod
+    def get_details(cls, scan_id):
+        """Full scan result in the format the frontend expects, or None"""
+        conn = db.connection()
+        row = conn.execute('SELECT * FROM scans WHERE id = ?', (scan_id,)).fetchone()
+        if row is None:
+            return None
+        
+        scan = _summary(row)
+        scan.update(json.loads(row['extra'] or '{}'))
+        scan["vulnerabilities"] = [
+            _vulnerability(v) for v in
+            conn.execute('SELECT * FROM findings WHERE scan_id = ? ORDER BY id', (scan_id,))
+        ]
+        scan["openPorts"] = [
+            _open_port(p) for p in
+            conn.execute('SELECT * FROM open_ports WHERE scan_id = ? ORDER BY id', (scan_id,))
+        ]
+        scan["hostInfo"] = json.loads(row['host_info'] or '{}')
+        hosts = [_host(h) for h in conn.execute(HOSTS_QUERY.format(condition=''), (scan_id,))]
+        if hosts:
+            scan["hosts"] = hosts
+        return scan
+    
+    @classmethod
+    def get_vulnerabilities(cls, scan_id):
+        rows = db.connection().execute(
+            'SELECT * FROM findings WHERE scan_id = ? ORDER BY id', (scan_id,)
+        ).fetchall()
+        return [_vulnerability(row) for row in rows]
+    
+    @classmethod
+    def list_vulnerabilities(cls, scan_id, severities=None, categories=None, statuses=None, text=None,
+                             fields=None, limit=100, after=None):
+        """One page of the findings of a scan in discovery order
+        
+        text matches the name, description, details or host. Only the
+        columns of the requested fields are read, so leaving out details
+        skips the script output. after is the row ID of the last finding
+        of the previous page. Returns (vulnerabilities, row ID of the last
+        one), the ID is None on the last page.
+        """
+        fields = [field for field in VULNERABILITY_FIELDS if fields is None or field in fields]
+        conditions, params = ['scan_id = ?'], [scan_id]
+        for column, values in (('severity', severities), ('category', categories), ('status', statuses)):
+            if values:
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if text:
+            conditions.append('(' + ' OR '.join(
+                f"{column} LIKE ? ESCAPE '\\'" for column in ('name', 'description', 'details', 'host')
+            ) + ')')
+            params.extend([_like_pattern(text)] * 4)
+        if after is not None:
+            conditions.append('id > ?')
+            params.append(after)
+        
+        columns = ', '.join(['id'] + [VULNERABILITY_FIELDS[field] for field in fields])
+        rows = db.connection().execute(
+            f"SELECT {columns} FROM findings WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        
+        last = rows[limit - 1]['id'] if len(rows) > limit else None
+        return [_vulnerability(row, fields) for row in rows[:limit]], last
+    
+    @classmethod
+    def search(cls, text, kinds=None, limit=50, offset=0):
+        """
+        Ranked full-text search over findings and open port services of all scans
+        
+        kinds limits the results to 'vulnerability' or 'port' matches.
+        Returns (results, whether there are more), or raises ValueError
+        when text has no words.
+        """
+        query = _fts_query(text)
+        if not query:
+            raise ValueError("Search query is empty")
+        rows = db.connection().execute(
+            SEARCH_QUERY,
+            (query, not kinds or 'vulnerability' in kinds, query, not kinds or 'port' in kinds, limit + 1, offset)
+        ).fetchall()
+        return [_search_result(row) for row in rows[:limit]], len(rows) > limit
+    
+    @classmethod
+    def get_hosts(cls, scan_id):
+        rows = db.connection().execute(HOSTS_QUERY.format(condition=''), (scan_id,)).fetchall()
+        return [_host(row) for row in rows]
+    
+    @classmethod
+    def get_host(cls, scan_id, host):
+        """One host with its open ports and vulnerabilities, or None"""
+        conn = db.connection()
+        row = conn.execute(HOSTS_QUERY.format(condition='AND h.host = ?'), (scan_id, host)).fetchone()
+        if row is None:
+            return None
+        return dict(
+            _host(row),
+            openPorts=[_open_port(p) for p in conn.execute(
+                'SELECT * FROM open_ports WHERE scan_id = ? AND host = ? ORDER BY id', (scan_id, host))],
+            vulnerabilities=[_vulnerability(v) for v in conn.execute(
+                'SELECT * FROM findings WHERE scan_id = ? AND host = ? ORDER BY id', (scan_id, host))]
+        )
+    
+    @classmethod
+    def set_vulnerability_status(cls, scan_id, vuln_id, status):
+        """Update one finding and the resolved counter of its scan; False when it does not exist"""
+        _, missing = cls.set_vulnerability_statuses(scan_id, [vuln_id], status)
+        return not missing
+    
+    @classmethod
+    def set_vulnerability_statuses(cls, scan_id, vuln_ids, status):
+        """Set the status of many findings of a scan in one transaction
+        
+        Only findings whose status actually changes are written; the resolved
+        counter of the scan is adjusted by their number. Returns (IDs found,
+        IDs that do not exist in the scan).
+        """
+        vuln_ids = list(dict.fromkeys(vuln_ids))
+        found, changed, delta = set(), 0, 0
+        with db.transaction() as conn:
+            for start in range(0, len(vuln_ids), VULN_UPDATE_CHUNK):
+                chunk = vuln_ids[start:start + VULN_UPDATE_CHUNK]
+                marks = ', '.join('?' * len(chunk))
+                for row in conn.execute(
+                    f'SELECT vuln_id, status FROM findings WHERE scan_id = ? AND vuln_id IN ({marks})',
+                    [scan_id] + chunk
+                ):
+                    found.add(row['vuln_id'])
+                    if row['status'] != status:
+                        changed += 1
+                        # Only findings entering or leaving 'resolved' move the counter
+                        delta += (status == 'resolved') - (row['status'] == 'resolved')
+                conn.execute(
+                    f'UPDATE findings SET status = ? WHERE scan_id = ? AND vuln_id IN ({marks}) AND status != ?',
+                    [status, scan_id] + chunk + [status]
+                )
+            if changed:
+                conn.execute(
+                    'UPDATE scans SET resolved_count = resolved_count + ?, updated_at = CURRENT_TIMESTAMP, '
+                    'version = version + 1 WHERE id = ?',
+                    (delta, scan_id)
+                )
+        return [v for v in vuln_ids if v in found], [v for v in vuln_ids if v not in found]
+    
+    @classmethod
+    def dashboard_stats(cls, trend_days=6, change_days=30):
+        """Materialized dashboard counters, their daily history and the latest completed scans
+        
+        trend holds the last trend_days days with changes, oldest first;
+        baseline is the last day at least change_days ago (or the oldest
+        recorded day), None while there is no history.
+        """
+        conn = db.connection()
+        stats = dict(conn.execute('SELECT * FROM dashboard_stats WHERE id = 1').fetchone())
+        stats["updated_at"] = _timestamp(stats["updated_at"])
+        trend = conn.execute(
+            'SELECT * FROM security_trend ORDER BY day DESC LIMIT ?', (trend_days,)
+        ).fetchall()
+        baseline = conn.execute(
+            "SELECT * FROM security_trend WHERE day <= date('now', 'localtime', ?) ORDER BY day DESC LIMIT 1",
+            (f'-{int(change_days)} days',)
+        ).fetchone() or conn.execute('SELECT * FROM security_trend ORDER BY day LIMIT 1').fetchone()
+        recent = conn.execute(
+            "SELECT * FROM scans WHERE status = 'completed' ORDER BY date DESC LIMIT 3"
+        ).fetchall()
+        return dict(
+            stats,
+            trend=[dict(row) for row in reversed(trend)],
+            baseline=dict(baseline) if baseline else None,
+            recentScans=[_summary(row) for row in recent],
+            sslAlert=stats["ssl_alerts"] > 0
+        )
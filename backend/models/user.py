@@ -1,6 +1,7 @@
 import sqlite3
 import hashlib
 from datetime import datetime
+from models.db import db
 
 class User:
     def __init__(self, id=None, username=None, email=None, password=None, role='user'):
@@ -20,39 +21,26 @@ class User:
     
     @staticmethod
     def get_db_connection():
-        conn = sqlite3.connect('database/infosec.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+        return db.connection()
     
     @classmethod
     def create(cls, username, email, password, role='user'):
         user = cls(username=username, email=email, password=password, role=role)
         
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                'INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
-                (user.username, user.email, user.password_hash, user.role)
-            )
-            conn.commit()
+            with db.transaction() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
+                    (user.username, user.email, user.password_hash, user.role)
+                )
             user.id = cursor.lastrowid
             return user
         except sqlite3.IntegrityError:
-            conn.rollback()
             return None
-        finally:
-            conn.close()
     
     @classmethod
     def find_by_username(cls, username):
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        row = cursor.fetchone()
-        conn.close()
+        row = cls.get_db_connection().execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
         
         if row:
             user = cls()
@@ -66,12 +54,7 @@ class User:
     
     @classmethod
     def find_by_email(cls, email):
-        conn = cls.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        row = cursor.fetchone()
-        conn.close()
+        row = cls.get_db_connection().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
         
         if row:
             user = cls()
@@ -0,0 +1,122 @@
+import os
+import json
+import zipfile
+
+# Name of the container with the raw tool output of a finished scan
+ARTIFACTS_ARCHIVE = 'artifacts.zip'
+
+# Deflate level of the container (1 is fastest, 9 is smallest)
+ARTIFACTS_COMPRESS_LEVEL = int(os.environ.get('ARTIFACTS_COMPRESS_LEVEL', 6))
+
+# Fields of the scan summary kept in the archive comment, least important last
+SUMMARY_FIELDS = ('id', 'status', 'target', 'findings')
+
+# A zip comment is limited to 64 KiB
+MAX_COMMENT_SIZE = 0xFFFF
+
+
+def archive_path(result_dir):
+    return os.path.join(result_dir, ARTIFACTS_ARCHIVE)
+
+
+def _loose_files(result_dir):
+    """Relative paths of the files in result_dir that are not packed yet"""
+    paths = []
+    for root, dirs, files in os.walk(result_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), result_dir)
+            if path != ARTIFACTS_ARCHIVE and not path.endswith('.tmp'):
+                paths.append(path.replace(os.sep, '/'))
+    return paths
+
+
+def _comment(summary):
+    """Archive comment with the summary; fields are dropped from the end until it fits"""
+    fields = [name for name in SUMMARY_FIELDS if name in summary]
+    while True:
+        comment = json.dumps({name: summary[name] for name in fields}, separators=(',', ':')).encode()
+        if len(comment) <= MAX_COMMENT_SIZE or not fields:
+            return comment
+        fields.pop()
+
+
+def pack_artifacts(result_dir, summary):
+    """Move the raw output of a scan into one compressed container
+
+    scan.xml, the logs and the reports of the web tools are deflated into
+    result_dir/artifacts.zip; the short scan summary is stored uncompressed
+    as the archive comment, so read_header() does not decompress anything.
+    The member list is not duplicated there, it is read from the central
+    directory of the archive. Files already
+    in the archive are kept when it is rebuilt. The packed files are removed
+    once the new archive is in place.
+    """
+    loose = _loose_files(result_dir)
+    if not loose:
+        return False
+
+    target = archive_path(result_dir)
+    tmp = target + '.tmp'
+    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED, compresslevel=ARTIFACTS_COMPRESS_LEVEL) as out:
+        if os.path.exists(target):
+            with zipfile.ZipFile(target) as old:
+                for info in old.infolist():
+                    if info.filename not in loose:
+                        with old.open(info) as src, out.open(info, 'w') as dst:
+                            while chunk := src.read(1024 * 1024):
+                                dst.write(chunk)
+        for path in loose:
+            out.write(os.path.join(result_dir, path), path)
+        out.comment = _comment(summary)
+    os.replace(tmp, target)
+
+    for path in loose:
+        os.remove(os.path.join(result_dir, path))
+    for root, dirs, files in os.walk(result_dir, topdown=False):
+        if root != result_dir and not os.listdir(root):
+            os.rmdir(root)
+    return True
+
+
+def read_header(result_dir):
+    """Summary stored with the archive, or None when there is no archive"""
+    try:
+        with zipfile.ZipFile(archive_path(result_dir)) as archive:
+            return json.loads(archive.comment or b'{}')
+    except (OSError, zipfile.BadZipFile, ValueError):
+        return None
+
+
+def list_artifacts(result_dir):
+    """Names and sizes of the raw outputs, packed or not"""
+    artifacts = {}
+    try:
+        with zipfile.ZipFile(archive_path(result_dir)) as archive:
+            for info in archive.infolist():
+                artifacts[info.filename] = {
+                    "name": info.filename, "size": info.file_size, "compressedSize": info.compress_size
+                }
+    except (OSError, zipfile.BadZipFile):
+        pass
+    for path in _loose_files(result_dir):
+        artifacts[path] = {"name": path, "size": os.path.getsize(os.path.join(result_dir, path))}
+    return sorted(artifacts.values(), key=lambda a: a["name"])
+
+
+def open_artifact(result_dir, name):
+    """Binary file object of one raw output; a packed one is decompressed while it is read"""
+    path = os.path.normpath(os.path.join(result_dir, name))
+    if os.path.commonpath([path, os.path.normpath(result_dir)]) != os.path.normpath(result_dir):
+        raise FileNotFoundError(name)
+    if os.path.isfile(path) and os.path.basename(path) != ARTIFACTS_ARCHIVE:
+        return open(path, 'rb')
+
+    archive = zipfile.ZipFile(archive_path(result_dir))
+    try:
+        return archive.open(name.replace(os.sep, '/'))
+    except KeyError:
+        raise FileNotFoundError(name)
+    finally:
+        # The member stays readable after the archive object is closed
+        archive.close()
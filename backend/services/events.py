@@ -0,0 +1,55 @@
+import time
+import threading
+from collections import deque
+
+# Number of recent events kept for clients that reconnect
+EVENT_HISTORY_SIZE = 1000
+
+
+class EventBus:
+    """In-process publish/subscribe channel for scan events
+
+    Every event gets a monotonically increasing id. Subscribers block until
+    an event newer than the id they have already seen is published, so idle
+    clients cost nothing between changes.
+    """
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE):
+        self._events = deque(maxlen=history_size)
+        self._last_id = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_id(self):
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event_type, data):
+        with self._cond:
+            self._last_id += 1
+            self._events.append({
+                "id": self._last_id,
+                "type": event_type,
+                "data": data,
+                "time": time.time()
+            })
+            self._cond.notify_all()
+            return self._last_id
+
+    def wait(self, since, timeout):
+        """Return events with id greater than since, waiting up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # A client from an older process may remember a larger id
+            if since > self._last_id:
+                since = 0
+            while self._last_id <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            return [event for event in self._events if event["id"] > since]
+
+
+# Shared bus for scan status changes and written results
+scan_events = EventBus()
@@ -0,0 +1,222 @@
+import os
+import json
+import heapq
+import sqlite3
+import threading
+import itertools
+from models.db import db
+from services.scan_control import scan_control
+
+# Number of worker threads executing scans
+SCAN_WORKERS = int(os.environ.get('SCAN_WORKERS', 4))
+
+# Maximum number of concurrently running jobs per scan kind
+SCAN_TYPE_LIMITS = {
+    'nmap': int(os.environ.get('SCAN_LIMIT_NMAP', 3)),
+    'web': int(os.environ.get('SCAN_LIMIT_WEB', 2)),
+    'port_scan': int(os.environ.get('SCAN_LIMIT_PORT_SCAN', 2)),
+}
+
+# Persistent job queue, created on every new connection of the connection manager
+QUEUE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scan_queue (
+    scan_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (kind, scan_id)
+);
+'''
+
+# Job priorities (lower value runs first)
+PRIORITIES = {
+    'high': 0,
+    'normal': 1,
+    'low': 2,
+}
+
+
+class ScanExecutor:
+    """Bounded worker pool that runs scan jobs from a persistent priority queue
+
+    Running jobs are tracked by scan_control, which enforces the per-kind
+    deadlines and lets jobs be cancelled.
+    """
+
+    def __init__(self, workers=SCAN_WORKERS, limits=None, database=db):
+        self.workers = max(1, workers)
+        self.limits = dict(SCAN_TYPE_LIMITS if limits is None else limits)
+        self.db = database
+        self.db.on_connect(lambda conn: conn.executescript(QUEUE_SCHEMA))
+        self._handlers = {}
+        self._queue = []  # heap of (priority, seq, kind, scan_id, payload)
+        self._running = {}  # kind -> number of running jobs
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._started = False
+
+    def register(self, kind, handler, on_status=None):
+        """Register a handler for a scan kind
+
+        handler(scan_id, payload) performs the scan, on_status(scan_id, status)
+        is notified when the pool moves the job between states.
+        """
+        self._handlers[kind] = (handler, on_status)
+
+    def submit(self, scan_id, kind, payload, priority='normal'):
+        """Put a scan job into the queue and persist it"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for scan kind '{kind}'")
+
+        priority = PRIORITIES.get(priority, PRIORITIES['normal'])
+        self._persist(scan_id, kind, payload, priority)
+        self._notify(kind, scan_id, 'queued')
+        self._push(scan_id, kind, payload, priority)
+
+    def cancel(self, kind, scan_id):
+        """Remove a job that is still waiting in the queue; returns False if it is not queued"""
+        with self._cond:
+            for i, item in enumerate(self._queue):
+                if item[2] == kind and item[3] == scan_id:
+                    self._queue.pop(i)
+                    heapq.heapify(self._queue)
+                    break
+            else:
+                return False
+
+        self._remove(scan_id, kind)
+        return True
+
+    def queue_size(self):
+        with self._cond:
+            return len(self._queue)
+
+    def running_count(self, kind=None):
+        with self._cond:
+            if kind is None:
+                return sum(self._running.values())
+            return self._running.get(kind, 0)
+
+    def start(self):
+        """Start worker threads and resume jobs left over from a previous run"""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+
+        for scan_id, kind, payload, priority in self._load_pending():
+            if kind in self._handlers:
+                self._notify(kind, scan_id, 'queued')
+                self._push(scan_id, kind, payload, priority)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"scan-worker-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _push(self, scan_id, kind, payload, priority):
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._counter), kind, scan_id, payload))
+            self._cond.notify()
+
+    def _take(self):
+        """Pop the highest priority job whose kind has free capacity (caller holds the lock)"""
+        skipped = []
+        job = None
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            kind = item[2]
+            limit = self.limits.get(kind)
+            if limit is None or self._running.get(kind, 0) < limit:
+                job = item
+                break
+            skipped.append(item)
+
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._take()
+                while job is None:
+                    self._cond.wait()
+                    job = self._take()
+                _, _, kind, scan_id, payload = job
+                self._running[kind] = self._running.get(kind, 0) + 1
+                # Tracked before the lock is released, so a cancel request cannot miss the job
+                scan_control.begin(kind, scan_id)
+
+            handler, _ = self._handlers[kind]
+            try:
+                self._mark_running(scan_id, kind)
+                self._notify(kind, scan_id, 'running')
+                handler(scan_id, payload)
+            except Exception as e:
+                print(f"Error executing {kind} job {scan_id}: {e}")
+                self._notify(kind, scan_id, 'failed')
+            finally:
+                scan_control.end(kind, scan_id)
+                self._remove(scan_id, kind)
+                with self._cond:
+                    self._running[kind] -= 1
+                    # A slot for this kind became free, wake up every waiting worker
+                    self._cond.notify_all()
+
+    def _notify(self, kind, scan_id, status):
+        _, on_status = self._handlers.get(kind, (None, None))
+        if on_status:
+            try:
+                on_status(scan_id, status)
+            except Exception as e:
+                print(f"Error updating status of {kind} job {scan_id}: {e}")
+
+    # Persistence
+
+    def _persist(self, scan_id, kind, payload, priority):
+        try:
+            with self.db.transaction() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO scan_queue (scan_id, kind, payload, priority) VALUES (?, ?, ?, ?)',
+                    (scan_id, kind, json.dumps(payload), priority)
+                )
+        except sqlite3.Error as e:
+            print(f"Error persisting {kind} job {scan_id}: {e}")
+
+    def _mark_running(self, scan_id, kind):
+        try:
+            with self.db.transaction() as conn:
+                conn.execute(
+                    "UPDATE scan_queue SET state = 'running' WHERE scan_id = ? AND kind = ?",
+                    (scan_id, kind)
+                )
+        except sqlite3.Error as e:
+            print(f"Error updating {kind} job {scan_id}: {e}")
+
+    def _remove(self, scan_id, kind):
+        try:
+            with self.db.transaction() as conn:
+                conn.execute('DELETE FROM scan_queue WHERE scan_id = ? AND kind = ?', (scan_id, kind))
+        except sqlite3.Error as e:
+            print(f"Error removing {kind} job {scan_id}: {e}")
+
+    def _load_pending(self):
+        """Jobs that were queued or interrupted while running are executed again"""
+        try:
+            rows = self.db.connection().execute(
+                'SELECT scan_id, kind, payload, priority FROM scan_queue ORDER BY priority, created_at'
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error loading scan queue: {e}")
+            return []
+
+        return [(scan_id, kind, json.loads(payload), priority) for scan_id, kind, payload, priority in rows]
+
+
+# Shared executor used by the API and the scanner service
+scan_executor = ScanExecutor()
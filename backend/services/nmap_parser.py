@@ -0,0 +1,124 @@
+import xml.etree.ElementTree as ET
+
+
+def _parse_port(port):
+    """Build a port record in a single pass over the <port> children"""
+    port_info = {
+        "protocol": port.get("protocol", ""),
+        "portid": port.get("portid", ""),
+        "state": "",
+        "service": {}
+    }
+    scripts = []
+
+    for child in port:
+        if child.tag == "state":
+            port_info["state"] = child.get("state", "")
+        elif child.tag == "service":
+            port_info["service"] = {
+                "name": child.get("name", ""),
+                "product": child.get("product", ""),
+                "version": child.get("version", ""),
+                "extrainfo": child.get("extrainfo", "")
+            }
+        elif child.tag == "script":
+            scripts.append({
+                "id": child.get("id", ""),
+                "output": child.get("output", "")
+            })
+
+    if scripts:
+        port_info["scripts"] = scripts
+    return port_info
+
+
+def _parse_host(host):
+    """Build a host record from a completely parsed <host> element"""
+    host_info = {
+        "state": "",
+        "addresses": [],
+        "hostnames": [],
+        "ports": [],
+        "os": []
+    }
+
+    for child in host:
+        tag = child.tag
+        if tag == "status":
+            host_info["state"] = child.get("state", "")
+        elif tag == "address":
+            host_info["addresses"].append({
+                "addr": child.get("addr", ""),
+                "addrtype": child.get("addrtype", "")
+            })
+        elif tag == "hostnames":
+            for hostname in child:
+                if hostname.tag == "hostname":
+                    host_info["hostnames"].append({
+                        "name": hostname.get("name", ""),
+                        "type": hostname.get("type", "")
+                    })
+        elif tag == "ports":
+            for port in child:
+                if port.tag == "port":
+                    host_info["ports"].append(_parse_port(port))
+        elif tag == "os":
+            for os_match in child:
+                if os_match.tag == "osmatch":
+                    host_info["os"].append({
+                        "name": os_match.get("name", ""),
+                        "accuracy": os_match.get("accuracy", "")
+                    })
+        elif tag == "hostscript":
+            host_info["hostscripts"] = [
+                {"id": script.get("id", ""), "output": script.get("output", "")}
+                for script in child if script.tag == "script"
+            ]
+
+    return host_info
+
+
+def iter_hosts(source, scan_info=None):
+    """Incrementally parse nmap XML and yield one host record at a time
+
+    source is a file name or a binary file object (e.g. a process pipe).
+    Every <host> element is dropped from the tree once it has been yielded,
+    so memory stays flat regardless of the number of hosts. When scan_info
+    is given it is filled with the run attributes and the runstats summary
+    as they are encountered.
+    """
+    root = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+                if scan_info is not None:
+                    scan_info["start_time"] = elem.get("start", "")
+                    scan_info["args"] = elem.get("args", "")
+            continue
+
+        if elem.tag == "host":
+            yield _parse_host(elem)
+            root.clear()
+        elif elem.tag == "finished" and scan_info is not None:
+            scan_info["summary"] = {
+                "time": elem.get("time"),
+                "timestr": elem.get("timestr"),
+                "elapsed": elem.get("elapsed"),
+                "exit": elem.get("exit")
+            }
+
+
+def parse_nmap_xml(source):
+    """Parse nmap XML into a dictionary with the run information and all hosts
+
+    Prefer iter_hosts for large outputs: this helper materializes the host list.
+    """
+    scan_info = {"start_time": "", "args": "", "hosts": []}
+    try:
+        for host in iter_hosts(source, scan_info):
+            scan_info["hosts"].append(host)
+        return scan_info
+    except Exception as e:
+        print(f"Error parsing nmap XML: {e}")
+        return {"error": str(e)}
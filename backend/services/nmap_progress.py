@@ -0,0 +1,42 @@
+import re
+
+# Interval of the periodic statistics nmap prints while scanning
+NMAP_STATS_INTERVAL = "5s"
+
+# Stats: 0:00:10 elapsed; 0 hosts completed (1 up), 1 undergoing SYN Stealth Scan
+STATS_RE = re.compile(
+    r'^Stats: (?P<elapsed>[\d:]+) elapsed; (?P<completed>\d+) hosts? completed '
+    r'\((?P<up>\d+) up\), (?P<undergoing>\d+) undergoing (?P<phase>.+?)\s*$'
+)
+
+# SYN Stealth Scan Timing: About 12.34% done; ETC: 12:00 (0:00:20 remaining)
+TIMING_RE = re.compile(
+    r'^(?P<phase>.+?) Timing: About (?P<percent>[\d.]+)% done'
+    r'(?:; ETC: (?P<etc>[\d:]+) \((?P<remaining>[\d:]+) remaining\))?'
+)
+
+
+def parse_progress_line(line, progress):
+    """Update the progress dictionary from one line of nmap output
+
+    Returns True when the line contained progress information.
+    """
+    match = TIMING_RE.match(line)
+    if match:
+        progress["phase"] = match.group("phase")
+        progress["percent"] = float(match.group("percent"))
+        if match.group("etc"):
+            progress["eta"] = match.group("etc")
+            progress["remaining"] = match.group("remaining")
+        return True
+
+    match = STATS_RE.match(line)
+    if match:
+        progress["elapsed"] = match.group("elapsed")
+        progress["hostsCompleted"] = int(match.group("completed"))
+        progress["hostsUp"] = int(match.group("up"))
+        progress["hostsUndergoing"] = int(match.group("undergoing"))
+        progress["phase"] = match.group("phase")
+        return True
+
+    return False
@@ -0,0 +1,140 @@
+import os
+import queue
+import asyncio
+import threading
+
+# Maximum number of connection attempts in flight for one batch
+PORTCHECK_CONCURRENCY = int(os.environ.get('PORTCHECK_CONCURRENCY', 200))
+
+# Default and maximum time to wait for one connection (seconds)
+PORTCHECK_TIMEOUT = float(os.environ.get('PORTCHECK_TIMEOUT', 3))
+PORTCHECK_MAX_TIMEOUT = float(os.environ.get('PORTCHECK_MAX_TIMEOUT', 10))
+
+# Maximum number of host/port pairs accepted in one batch
+PORTCHECK_MAX_PROBES = int(os.environ.get('PORTCHECK_MAX_PROBES', 10000))
+
+
+def _port(value):
+    port = int(value)
+    if not 1 <= port <= 65535:
+        raise ValueError(f"Invalid port: {port}")
+    return port
+
+
+def _parse_ports(ports):
+    """(start, end) ranges of ports given as numbers or 'start-end' strings
+
+    Bounds are checked before anything is expanded, so a huge range costs nothing.
+    """
+    ranges = []
+    for port in ports:
+        if isinstance(port, str) and '-' in port:
+            start, end = (_port(value) for value in port.split('-', 1))
+            if start > end:
+                raise ValueError(f"Invalid port range: {port}")
+            ranges.append((start, end))
+        else:
+            port = _port(port)
+            ranges.append((port, port))
+    return ranges
+
+
+def expand_probes(data):
+    """List of (host, port) pairs from explicit pairs and/or hosts crossed with ports
+
+    Accepts {"targets": [{"host": ..., "port": ...}, ...]} and
+    {"hosts": [...], "ports": [22, "8000-8010", ...]}. The number of pairs
+    is computed from the ranges and checked before any list is built.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be an object")
+    for key in ('targets', 'hosts', 'ports'):
+        if not isinstance(data.get(key) or [], list):
+            raise ValueError(f"{key} must be a list")
+
+    try:
+        targets = data.get('targets') or []
+        hosts = data.get('hosts') or []
+        ports = _parse_ports(data.get('ports') or [])
+        count = len(targets) + len(hosts) * sum(end - start + 1 for start, end in ports)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid targets: {e}")
+
+    if count > PORTCHECK_MAX_PROBES:
+        raise ValueError(f"Too many probes, at most {PORTCHECK_MAX_PROBES} are allowed")
+
+    try:
+        probes = [(str(target['host']), _port(target['port'])) for target in targets]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid targets: {e}")
+
+    probes.extend((str(host), port) for host in hosts for start, end in ports for port in range(start, end + 1))
+    if not probes:
+        raise ValueError("No host/port pairs given")
+    return probes
+
+
+async def probe_port(host, port, timeout):
+    """Try a TCP connection and report whether the port is open"""
+    result = {"host": host, "port": port, "open": False}
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        result["open"] = True
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    except asyncio.TimeoutError:
+        result["error"] = "timeout"
+    except OSError as e:
+        # A refused connection is the normal answer of a closed port
+        if not isinstance(e, ConnectionRefusedError):
+            result["error"] = str(e)
+    except ValueError as e:
+        # An invalid host name (UnicodeError from the idna codec) fails only this probe
+        result["error"] = str(e)
+    return result
+
+
+async def _probe_all(probes, concurrency, timeout, emit, stop):
+    pending = iter(probes)
+
+    async def worker():
+        # Workers pull from a shared iterator, so at most `concurrency` probes exist at once
+        for host, port in pending:
+            if stop.is_set():
+                return
+            emit(await probe_port(host, port, timeout))
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(probes)))))
+
+
+def iter_port_checks(probes, concurrency=PORTCHECK_CONCURRENCY, timeout=PORTCHECK_TIMEOUT):
+    """Probe all pairs concurrently and yield results in completion order
+
+    The event loop runs in a background thread. Closing the generator
+    (e.g. when the HTTP client disconnects) stops probing.
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def run():
+        try:
+            asyncio.run(_probe_all(probes, max(1, concurrency), timeout, results.put, stop))
+        finally:
+            results.put(done)
+
+    thread = threading.Thread(target=run, name="port-check")
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            result = results.get()
+            if result is done:
+                return
+            yield result
+    finally:
+        stop.set()
@@ -0,0 +1,59 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Number of worker processes parsing and classifying tool output
+POSTPROCESS_WORKERS = int(os.environ.get('POSTPROCESS_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Maximum number of jobs waiting for a free worker process
+POSTPROCESS_QUEUE_SIZE = int(os.environ.get('POSTPROCESS_QUEUE_SIZE', 16))
+
+
+class PostProcessPool:
+    """Process pool with a bounded queue for CPU-heavy result post-processing
+
+    Parsing, risk classification and JSON serialization of large outputs run
+    outside the API process, so they do not hold its GIL. Jobs are expected
+    to write their full results to disk and return only a small summary.
+    Callers block while the queue is full.
+    """
+
+    def __init__(self, workers=POSTPROCESS_WORKERS, queue_size=POSTPROCESS_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, queue_size))
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def run(self, func, *args):
+        """Run func(*args) in a worker process and return its result"""
+        with self._slots:
+            executor = self._get_executor()
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                # A crashed worker breaks the whole pool: start a new one for later jobs
+                self._reset(executor)
+                raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Shared pool used by scan post-processing
+postprocess_pool = PostProcessPool()
@@ -0,0 +1,85 @@
+import os
+import math
+import ipaddress
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+# Preferred size of a single shard (a /24 network per nmap process)
+RANGE_SHARD_PREFIX = int(os.environ.get('RANGE_SHARD_PREFIX', 24))
+
+# Upper bound for the number of shards a single range is split into
+RANGE_MAX_SHARDS = int(os.environ.get('RANGE_MAX_SHARDS', 256))
+
+# Number of shards of one range scanned in parallel
+RANGE_SHARD_WORKERS = int(os.environ.get('RANGE_SHARD_WORKERS', 4))
+
+
+def split_network(target, shard_prefix=RANGE_SHARD_PREFIX, max_shards=RANGE_MAX_SHARDS):
+    """Split a CIDR range into subnet shards
+
+    Shards get larger than shard_prefix when needed so that no more than
+    max_shards are produced. A range that fits into one shard is returned as is.
+    """
+    network = ipaddress.ip_network(target, strict=False)
+    max_split = int(math.log2(max(1, max_shards)))
+    new_prefix = min(shard_prefix, network.prefixlen + max_split, network.max_prefixlen)
+
+    if new_prefix <= network.prefixlen:
+        return [str(network)]
+    return [str(subnet) for subnet in network.subnets(new_prefix=new_prefix)]
+
+
+def shard_command(cmd, shard, xml_output):
+    """Build the nmap command of a shard from the command of the whole range"""
+    shard_cmd = list(cmd)
+    shard_cmd[shard_cmd.index("-oX") + 1] = xml_output
+    shard_cmd[-1] = shard
+    return shard_cmd
+
+
+def merge_nmap_xml(shard_files, output_file):
+    """Merge per-shard nmap XML files into a single nmaprun document
+
+    Hosts are streamed one by one, so memory does not depend on range size.
+    Missing or truncated shard files contribute the hosts parsed so far.
+    """
+    run_attrs = None
+    hosts_up = 0
+    hosts_down = 0
+
+    with open(output_file, "w") as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        for shard_file in shard_files:
+            if not os.path.exists(shard_file):
+                continue
+            root = None
+            try:
+                for event, elem in ET.iterparse(shard_file, events=("start", "end")):
+                    if event == "start" and elem.tag == "nmaprun":
+                        root = elem
+                        if run_attrs is None:
+                            run_attrs = dict(elem.attrib)
+                            attrs = "".join(f" {k}={quoteattr(v)}" for k, v in run_attrs.items())
+                            out.write(f"<nmaprun{attrs}>\n")
+                    elif event == "end" and elem.tag == "host":
+                        status = elem.find("status")
+                        if status is not None and status.get("state") == "up":
+                            hosts_up += 1
+                        else:
+                            hosts_down += 1
+                        out.write(ET.tostring(elem, encoding="unicode"))
+                        # Drop processed hosts from the tree to keep memory flat
+                        if root is not None:
+                            root.clear()
+            except ET.ParseError as e:
+                print(f"Error parsing shard results {shard_file}: {e}")
+
+        if run_attrs is None:
+            out.write("<nmaprun>\n")
+        out.write(
+            f'<runstats><hosts up="{hosts_up}" down="{hosts_down}" '
+            f'total="{hosts_up + hosts_down}"/></runstats>\n'
+        )
+        out.write("</nmaprun>\n")
+
+    return hosts_up + hosts_down
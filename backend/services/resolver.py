@@ -0,0 +1,126 @@
+import os
+import time
+import socket
+import ipaddress
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Maximum number of names kept in the cache
+DNS_CACHE_SIZE = int(os.environ.get('DNS_CACHE_SIZE', 4096))
+
+# How long successful and failed lookups are remembered (seconds)
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 300))
+DNS_NEGATIVE_TTL = int(os.environ.get('DNS_NEGATIVE_TTL', 60))
+
+# Number of threads resolving names of a batch concurrently
+DNS_RESOLVE_WORKERS = int(os.environ.get('DNS_RESOLVE_WORKERS', 16))
+
+
+def normalize_name(name):
+    return name.strip().lower().rstrip('.')
+
+
+def _lookup(name):
+    """Blocking lookup in the dns-info response format"""
+    try:
+        hostname, aliases, ip_addresses = socket.gethostbyname_ex(name)
+        return {
+            "domain": name,
+            "hostname": hostname,
+            "aliases": aliases,
+            "ip_addresses": ip_addresses,
+            "status": "success"
+        }
+    except (OSError, UnicodeError, ValueError, TypeError) as e:
+        # ValueError/TypeError: names the resolver cannot take at all, e.g. with a NUL byte
+        return {
+            "domain": name,
+            "error": str(e),
+            "status": "error"
+        }
+
+
+class CachingResolver:
+    """Host name resolver with an LRU cache, negative caching and batch lookups
+
+    The system resolver does not expose record TTLs, so answers are kept for
+    ttl seconds and failures for negative_ttl seconds. Concurrent lookups of
+    the same name share a single query.
+    """
+
+    def __init__(self, max_entries=DNS_CACHE_SIZE, ttl=DNS_CACHE_TTL,
+                 negative_ttl=DNS_NEGATIVE_TTL, workers=DNS_RESOLVE_WORKERS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.workers = max(1, workers)
+        self._entries = OrderedDict()  # name -> (expires_at, result)
+        self._pending = {}  # name -> Future of an in-flight lookup
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def resolve(self, name):
+        """Resolve one name, returning a copy of the cached answer when it is fresh"""
+        name = normalize_name(name)
+        try:
+            ip = str(ipaddress.ip_address(name))
+            return {"domain": name, "hostname": ip, "aliases": [], "ip_addresses": [ip], "status": "success"}
+        except ValueError:
+            pass
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(name)
+                    return dict(entry[1], cached=True)
+                del self._entries[name]
+
+            future = self._pending.get(name)
+            owner = future is None
+            if owner:
+                future = self._pending[name] = Future()
+
+        if not owner:
+            return dict(future.result(), cached=True)
+
+        # Waiters are always released, even when the lookup itself fails
+        try:
+            result = _lookup(name)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[name]
+            future.set_exception(e)
+            raise
+
+        ttl = self.ttl if result["status"] == "success" else self.negative_ttl
+        with self._lock:
+            del self._pending[name]
+            if ttl > 0:
+                self._entries[name] = (time.monotonic() + ttl, result)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(result)
+        return dict(result, cached=False)
+
+    def resolve_many(self, names):
+        """Resolve names concurrently, results are in the order of names"""
+        if len(names) <= 1:
+            return [self.resolve(name) for name in names]
+        return list(self._get_executor().map(self.resolve, names))
+
+    def first_ip(self, name):
+        """First address of the name or an empty string when it does not resolve"""
+        result = self.resolve(name)
+        return result["ip_addresses"][0] if result.get("ip_addresses") else ""
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dns")
+            return self._executor
+
+
+# Shared resolver for API lookups and scan targets
+resolver = CachingResolver()
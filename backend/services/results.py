@@ -0,0 +1,611 @@
+import os
+import json
+import datetime
+import xml.etree.ElementTree as ET
+from models.scan import Scan
+from services.artifacts import pack_artifacts
+from services.nmap_parser import iter_hosts
+from services.risk_rules import classify, match_rule
+
+
+def summarize_result(scan_result):
+    """Краткая сводка результата, которую обработчик возвращает процессу API"""
+    return {
+        "id": scan_result["id"],
+        "status": scan_result["status"],
+        "target": scan_result["target"],
+        "findings": scan_result["findings"]
+    }
+
+
+def pack_scan_artifacts(result_dir, summary):
+    """Упаковывает сырой вывод инструментов, когда результат уже сохранен в БД"""
+    try:
+        pack_artifacts(result_dir, summary)
+    except OSError as e:
+        print(f"Error packing artifacts of scan {summary['id']}: {e}")
+
+
+def apply_scan_request(scan_result):
+    """
+    Дополняет результат параметрами запроса, сохраненными в записи сканирования
+    
+    Целью сканирования диапазона остается сам диапазон, а пустой hostInfo.ip
+    заполняется адресом, полученным при создании сканирования
+    """
+    scan = Scan.find_by_id(scan_result["id"])
+    if scan is None:
+        return
+    
+    if scan.target_type == "range":
+        scan_result["target"] = scan.target or scan_result["target"]
+    if not scan_result["hostInfo"].get("ip"):
+        scan_result["hostInfo"]["ip"] = scan.ip or ""
+
+
+def parse_host_result(scan_id, host_data, vuln_id=1):
+    """
+    Преобразует данные одного хоста nmap: сведения о хосте, открытые порты и уязвимости
+    
+    vuln_id - номер первой уязвимости хоста, чтобы ID были уникальны в пределах сканирования
+    """
+    # Получаем IP и hostname
+    ip = next((addr["addr"] for addr in host_data.get("addresses", []) 
+               if addr["addrtype"] == "ipv4"), "")
+    hostname = next((h["name"] for h in host_data.get("hostnames", [])
+                    if h["name"]), "")
+    
+    # Определяем ОС
+    operating_system = "Unknown"
+    if host_data.get("os"):
+        os_matches = sorted(host_data["os"], key=lambda x: int(x.get("accuracy", 0)), reverse=True)
+        if os_matches:
+            operating_system = os_matches[0].get("name", "Unknown")
+    
+    # Получаем информацию об открытых портах
+    open_ports = []
+    vulnerabilities = []
+    host = ip or next((addr["addr"] for addr in host_data.get("addresses", [])), "") or hostname
+    
+    counts = {"high": 0, "medium": 0, "low": 0}
+    
+    for port in host_data.get("ports", []):
+        if port.get("state") == "open":
+            service = port.get("service", {})
+            port_info = {
+                "host": host,
+                "port": int(port.get("portid", 0)),
+                "service": service.get("name", "unknown"),
+                "version": f"{service.get('product', '')} {service.get('version', '')}".strip()
+            }
+            open_ports.append(port_info)
+            
+            # Проверяем на уязвимости с помощью скриптов
+            if "scripts" in port:
+                for script in port["scripts"]:
+                    script_id = script.get("id", "")
+                    
+                    # Серьезность, категория и рекомендации определяются правилами по имени скрипта
+                    risk = classify("nmap", script_id)
+                    counts[risk["severity"]] = counts.get(risk["severity"], 0) + 1
+                    
+                    # Формируем описание уязвимости
+                    output = script.get("output", "").strip()
+                    
+                    # Краткое описание
+                    description = output.split('\n')[0] if output else script_id
+                    
+                    vulnerability = {
+                        "id": f"vuln-{scan_id}-{vuln_id}",
+                        "host": host,
+                        "port": port_info["port"],
+                        "name": script_id.replace("-", " ").title(),
+                        "description": description,
+                        "severity": risk["severity"],
+                        "details": output,
+                        "category": risk["category"],
+                        "remediation": risk["remediation"],
+                        "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                        "status": "open"
+                    }
+                    
+                    vulnerabilities.append(vulnerability)
+                    vuln_id += 1
+    
+    return {
+        "host": host,
+        "hostInfo": {
+            "ip": ip,
+            "hostname": hostname,
+            "state": host_data.get("state", ""),
+            "operatingSystem": operating_system,
+            "uptime": "Unknown",  # nmap не всегда может определить uptime
+            "lastBoot": "Unknown"  # также не всегда можно определить
+        },
+        "findings": {
+            "high": counts["high"],
+            "medium": counts["medium"],
+            "low": counts["low"],
+            "total": len(vulnerabilities),
+            "resolved": 0
+        },
+        "openPorts": open_ports,
+        "vulnerabilities": vulnerabilities
+    }
+
+
+def parse_nmap_result(scan_id, xml_file):
+    """
+    Преобразует XML-результаты nmap в результат сканирования для фронтенда
+    
+    Обрабатываются все хосты: openPorts и vulnerabilities содержат данные
+    всех хостов (с полем host), hosts - сводку по каждому хосту, hostInfo -
+    сведения о первом доступном хосте
+    """
+    hosts = []
+    open_ports = []
+    vulnerabilities = []
+    findings = {"high": 0, "medium": 0, "low": 0, "total": 0, "resolved": 0}
+    first_down = None
+    
+    # Потоково парсим XML результаты nmap; обрезанный файл дает уже разобранные хосты
+    try:
+        for host_data in iter_hosts(xml_file):
+            host_result = parse_host_result(scan_id, host_data, len(vulnerabilities) + 1)
+            host = dict(host_result["hostInfo"], host=host_result["host"],
+                        findings=host_result["findings"], openPorts=len(host_result["openPorts"]))
+            
+            # Недоступные хосты без открытых портов не интересны
+            if host_data.get("state") == "down" and not host_result["openPorts"]:
+                first_down = first_down or host
+                continue
+            
+            hosts.append(host)
+            open_ports.extend(host_result["openPorts"])
+            vulnerabilities.extend(host_result["vulnerabilities"])
+            for key in findings:
+                findings[key] += host_result["findings"][key]
+    except ET.ParseError as e:
+        print(f"Error parsing nmap XML: {e}")
+    
+    # Единственная цель недоступна: сохраняем хотя бы сведения о ней
+    if not hosts and first_down:
+        hosts.append(first_down)
+    
+    primary = hosts[0] if hosts else {}
+    host_info = {
+        key: primary.get(key, default) for key, default in (
+            ("ip", ""), ("hostname", ""), ("operatingSystem", "Unknown"),
+            ("uptime", "Unknown"), ("lastBoot", "Unknown")
+        )
+    }
+    
+    # Форматируем результаты для фронтенда
+    scan_result = {
+        "id": scan_id,
+        "target": host_info["hostname"] or host_info["ip"],
+        "date": datetime.datetime.now().isoformat() + "Z",
+        "status": "completed",
+        "duration": 120,  # примерная длительность
+        "findings": findings,
+        "vulnerabilities": vulnerabilities,
+        "openPorts": open_ports,
+        "hostInfo": host_info,
+        "hosts": hosts
+    }
+    
+    return scan_result
+
+
+def process_nmap_results(scan_id, result_dir, status="completed"):
+    """
+    Обрабатывает результаты nmap, сохраняет их в БД и возвращает сводку
+    
+    status "cancelled" записывается для частичных результатов прерванного сканирования
+    """
+    xml_file = os.path.join(result_dir, "scan.xml")
+    
+    if not os.path.exists(xml_file):
+        return {
+            "id": scan_id,
+            "status": "failed",
+            "error": "Scan results not found"
+        }
+    
+    try:
+        scan_result = parse_nmap_result(scan_id, xml_file)
+        scan_result["status"] = status
+        apply_scan_request(scan_result)
+        
+        # Сохраняем результат, хосты, порты и уязвимости в БД
+        Scan.store_result(scan_result)
+        
+        # В процесс API возвращаем только краткую сводку, она же - заголовок архива
+        summary = summarize_result(scan_result)
+        pack_scan_artifacts(result_dir, summary)
+        return summary
+    
+    except Exception as e:
+        print(f"Error processing nmap results: {e}")
+        return {
+            "id": scan_id,
+            "status": "failed",
+            "error": str(e)
+        }
+
+
+def find_changed_ports(discovery_xml, previous_scan_id):
+    """
+    Сравнивает открытые порты легкого прохода с предыдущим результатом
+    
+    Возвращает (новые или изменившиеся порты, неизменные порты)
+    """
+    previous = Scan.get_details(previous_scan_id) or {}
+    previous_ports = {p["port"]: p for p in previous.get("openPorts", [])}
+    
+    # Без привязки уязвимостей к портам перенести их нельзя - пересканируем все порты
+    can_carry = all("port" in v for v in previous.get("vulnerabilities", []))
+    
+    host_data = next(iter_hosts(discovery_xml), {})
+    changed, unchanged = [], []
+    for port in host_data.get("ports", []):
+        if port.get("state") != "open":
+            continue
+        
+        number = int(port.get("portid", 0))
+        service = port.get("service", {})
+        version = f"{service.get('product', '')} {service.get('version', '')}".strip()
+        old = previous_ports.get(number)
+        
+        # Легкий проход определяет версию не полностью, поэтому сравниваем по префиксу
+        same_service = old is not None and old.get("service") == service.get("name", "unknown")
+        same_version = old is not None and (
+            not version or not old.get("version") or
+            old["version"].startswith(version) or version.startswith(old["version"])
+        )
+        
+        if can_carry and same_service and same_version:
+            unchanged.append(number)
+        else:
+            changed.append(number)
+    
+    return changed, unchanged
+
+
+def process_incremental_results(scan_id, result_dir, previous_scan_id, discovery_xml, unchanged):
+    """
+    Собирает результат дифференциального сканирования и возвращает сводку
+    
+    Данные неизменных портов и их уязвимости переносятся из предыдущего
+    результата (вместе со статусом), новые и изменившиеся порты берутся из
+    целевого прохода (scan.xml), если он выполнялся
+    """
+    try:
+        previous = Scan.get_details(previous_scan_id) or {}
+        unchanged = set(unchanged)
+        
+        discovery = parse_nmap_result(scan_id, discovery_xml)
+        targeted_xml = os.path.join(result_dir, "scan.xml")
+        targeted = parse_nmap_result(scan_id, targeted_xml) if os.path.exists(targeted_xml) else None
+        
+        # Открытые порты определяет легкий проход
+        previous_ports = {p["port"]: p for p in previous.get("openPorts", [])}
+        targeted_ports = {p["port"]: p for p in targeted["openPorts"]} if targeted else {}
+        open_ports = []
+        for port in discovery["openPorts"]:
+            if port["port"] in unchanged:
+                open_ports.append(previous_ports[port["port"]])
+            else:
+                open_ports.append(targeted_ports.get(port["port"], port))
+        
+        # Переносим уязвимости неизменных портов и добавляем найденные заново
+        vulnerabilities = [v for v in previous.get("vulnerabilities", []) if v.get("port") in unchanged]
+        if targeted:
+            vulnerabilities += targeted["vulnerabilities"]
+        vulnerabilities = [
+            dict(v, id=f"vuln-{scan_id}-{i}") for i, v in enumerate(vulnerabilities, 1)
+        ]
+        
+        high_count = sum(1 for v in vulnerabilities if v["severity"] == "high")
+        medium_count = sum(1 for v in vulnerabilities if v["severity"] == "medium")
+        low_count = sum(1 for v in vulnerabilities if v["severity"] == "low")
+        
+        # Сведения о хосте берем из целевого прохода, ОС - из предыдущего результата, если она не определена
+        host_info = dict((targeted or discovery)["hostInfo"])
+        if host_info.get("operatingSystem", "Unknown") == "Unknown":
+            host_info["operatingSystem"] = previous.get("hostInfo", {}).get("operatingSystem", "Unknown")
+        
+        scan_result = dict(
+            targeted or discovery,
+            findings={
+                "high": high_count,
+                "medium": medium_count,
+                "low": low_count,
+                "total": high_count + medium_count + low_count,
+                "resolved": sum(1 for v in vulnerabilities if v.get("status") == "resolved")
+            },
+            vulnerabilities=vulnerabilities,
+            openPorts=open_ports,
+            hostInfo=host_info,
+            incremental={
+                "previousScanId": previous_scan_id,
+                "rescannedPorts": sorted(p["port"] for p in open_ports if p["port"] not in unchanged),
+                "carriedPorts": sorted(unchanged)
+            }
+        )
+        apply_scan_request(scan_result)
+        Scan.store_result(scan_result)
+        
+        summary = summarize_result(scan_result)
+        pack_scan_artifacts(result_dir, summary)
+        return summary
+    
+    except Exception as e:
+        print(f"Error processing incremental results: {e}")
+        return {
+            "id": scan_id,
+            "status": "failed",
+            "error": str(e)
+        }
+
+
+def parse_nikto_results(nikto_output):
+    """Преобразует JSON-отчет nikto в список уязвимостей"""
+    vulnerabilities = []
+    
+    with open(nikto_output, "r") as f:
+        nikto_results = json.load(f)
+    
+    for item in nikto_results.get("vulnerabilities", []):
+        # Определяем серьезность уязвимости по заголовку
+        severity = match_rule("nikto", "severity", item.get("title", ""))
+        
+        vulnerabilities.append({
+            "name": item.get("title", "Unknown"),
+            "description": item.get("message", ""),
+            "severity": severity,
+            "details": f"{item.get('message', '')} (OSVDB: {item.get('osvdbid', 'N/A')})",
+            "category": "web",
+            "remediation": "Please refer to the OSVDB entry for remediation information.",
+            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+            "status": "open"
+        })
+    
+    return vulnerabilities
+
+
+def parse_directory_results(dirb_output):
+    """Ищет чувствительные директории в выводе dirb/gobuster"""
+    vulnerabilities = []
+    
+    with open(dirb_output, "r") as f:
+        content = f.read()
+    
+    # Ищем интересные пути
+    interesting_paths = []
+    for line in content.splitlines():
+        if match_rule("dirb", "sensitive", line):
+            interesting_paths.append(line)
+    
+    # Если найдены интересные пути, создаем уязвимость
+    if interesting_paths:
+        vulnerabilities.append({
+            "name": "Sensitive Directories Exposed",
+            "description": "Potentially sensitive directories were discovered on the web server.",
+            "severity": "medium",
+            "details": "The following sensitive directories were found: " + 
+                       ", ".join(interesting_paths[:5]) + 
+                       (f" and {len(interesting_paths) - 5} more." if len(interesting_paths) > 5 else ""),
+            "category": "web",
+            "remediation": "Restrict access to sensitive directories or remove them if not needed.",
+            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+            "status": "open"
+        })
+    
+    return vulnerabilities
+
+
+def parse_sslscan_results(sslscan_output, domain):
+    """Проверяет протоколы, шифры и сертификат в XML-отчете sslscan"""
+    vulnerabilities = []
+    
+    tree = ET.parse(sslscan_output)
+    root = tree.getroot()
+    
+    # Проверяем поддержку устаревших протоколов
+    ssl_protocols = root.findall(".//protocol")
+    for protocol in ssl_protocols:
+        if protocol.get("enabled") == "1" and match_rule("sslscan", "protocol", protocol.get("type", "")) == "deprecated":
+            vulnerabilities.append({
+                "name": f"Deprecated SSL/TLS Protocol: {protocol.get('type')}",
+                "description": f"The server supports deprecated SSL/TLS protocol: {protocol.get('type')}",
+                "severity": "medium",
+                "details": f"The server at {domain} supports {protocol.get('type').upper()}, " +
+                           "which is considered insecure and has known vulnerabilities.",
+                "category": "encryption",
+                "remediation": "Disable older SSL/TLS protocols and only enable TLS 1.2 and TLS 1.3.",
+                "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                "status": "open"
+            })
+    
+    # Проверяем слабые шифры
+    weak_ciphers = []
+    ciphers = root.findall(".//cipher")
+    for cipher in ciphers:
+        if match_rule("sslscan", "cipher", cipher.get("cipher", "")) == "weak":
+            weak_ciphers.append(cipher.get("cipher", ""))
+    
+    if weak_ciphers:
+        vulnerabilities.append({
+            "name": "Weak SSL/TLS Cipher Suites",
+            "description": "The server supports weak cipher suites",
+            "severity": "medium",
+            "details": f"The server at {domain} supports the following weak cipher suites: " +
+                       ", ".join(weak_ciphers),
+            "category": "encryption",
+            "remediation": "Disable weak cipher suites and only enable strong ciphers with forward secrecy.",
+            "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+            "status": "open"
+        })
+    
+    # Проверяем срок действия сертификата
+    certificate = root.find(".//certificate")
+    if certificate:
+        expires = certificate.find(".//expires")
+        if expires is not None:
+            expires_text = expires.text
+            expires_date = datetime.datetime.strptime(expires_text, "%b %d %H:%M:%S %Y GMT")
+            now = datetime.datetime.now()
+            days_left = (expires_date - now).days
+            
+            if days_left < 30:
+                vulnerabilities.append({
+                    "name": "SSL Certificate Expiring Soon",
+                    "description": f"The SSL certificate will expire in {days_left} days",
+                    "severity": "medium" if days_left < 15 else "low",
+                    "details": f"The SSL certificate for {domain} will expire on {expires_text}.",
+                    "category": "encryption",
+                    "remediation": "Renew the SSL certificate before it expires.",
+                    "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                    "status": "open"
+                })
+    
+    return vulnerabilities
+
+
+def parse_wpscan_results(wpscan_output):
+    """Собирает уязвимости ядра, плагинов и тем из JSON-отчета wpscan"""
+    vulnerabilities = []
+    
+    with open(wpscan_output, "r") as f:
+        wpscan_data = json.load(f)
+    
+    # Обрабатываем найденные плагины
+    if "plugins" in wpscan_data:
+        for plugin_name, plugin_data in wpscan_data["plugins"].items():
+            if "vulnerabilities" in plugin_data and plugin_data["vulnerabilities"]:
+                for vuln in plugin_data["vulnerabilities"]:
+                    vulnerabilities.append({
+                        "name": f"WordPress Plugin Vulnerability: {plugin_name}",
+                        "description": vuln.get("title", ""),
+                        "severity": match_rule("wpscan", "severity", vuln.get("title", "")),
+                        "details": f"The WordPress plugin {plugin_name} " +
+                                   f"(version {plugin_data.get('version', {}).get('number', 'unknown')}) " +
+                                   f"has a vulnerability: {vuln.get('title', '')}\n\n" +
+                                   f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
+                        "category": "web",
+                        "remediation": "Update the plugin to the latest version or replace it with a secure alternative.",
+                        "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                        "status": "open"
+                    })
+    
+    # Обрабатываем найденные темы
+    if "themes" in wpscan_data:
+        for theme_name, theme_data in wpscan_data["themes"].items():
+            if "vulnerabilities" in theme_data and theme_data["vulnerabilities"]:
+                for vuln in theme_data["vulnerabilities"]:
+                    vulnerabilities.append({
+                        "name": f"WordPress Theme Vulnerability: {theme_name}",
+                        "description": vuln.get("title", ""),
+                        "severity": match_rule("wpscan", "severity", vuln.get("title", "")),
+                        "details": f"The WordPress theme {theme_name} " +
+                                   f"(version {theme_data.get('version', {}).get('number', 'unknown')}) " +
+                                   f"has a vulnerability: {vuln.get('title', '')}\n\n" +
+                                   f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
+                        "category": "web",
+                        "remediation": "Update the theme to the latest version or replace it with a secure alternative.",
+                        "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                        "status": "open"
+                    })
+    
+    # Обрабатываем версию WordPress
+    if "wordpress" in wpscan_data and "version" in wpscan_data["wordpress"]:
+        wp_version = wpscan_data["wordpress"]["version"]
+        if "vulnerabilities" in wp_version and wp_version["vulnerabilities"]:
+            for vuln in wp_version["vulnerabilities"]:
+                vulnerabilities.append({
+                    "name": f"WordPress Core Vulnerability",
+                    "description": vuln.get("title", ""),
+                    "severity": match_rule("wpscan", "severity", vuln.get("title", "")),
+                    "details": f"The WordPress installation (version {wp_version.get('number', 'unknown')}) " +
+                               f"has a vulnerability: {vuln.get('title', '')}\n\n" +
+                               f"References: {', '.join(vuln.get('references', {}).get('url', []))}",
+                    "category": "web",
+                    "remediation": "Update WordPress to the latest version.",
+                    "dateDiscovered": datetime.datetime.now().isoformat() + "Z",
+                    "status": "open"
+                })
+    
+    return vulnerabilities
+
+
+# Разборщики вывода веб-инструментов по имени инструмента
+WEB_TOOL_PARSERS = {
+    "nikto": parse_nikto_results,
+    "dirb": parse_directory_results,
+    "gobuster": parse_directory_results,
+    "sslscan": parse_sslscan_results,
+    "wpscan": parse_wpscan_results,
+}
+
+
+def process_web_tool_output(tool, output_file, vulnerabilities_file, *args):
+    """Разбирает вывод инструмента и сохраняет его список уязвимостей, возвращает их число"""
+    vulnerabilities = WEB_TOOL_PARSERS[tool](output_file, *args)
+    
+    with open(vulnerabilities_file, "w") as f:
+        json.dump(vulnerabilities, f)
+    
+    return len(vulnerabilities)
+
+
+def build_web_scan_result(scan_id, target, tools, start_time, stage_names, result_dir, ip="", status="completed"):
+    """Объединяет списки уязвимостей этапов, нумерует их и сохраняет итоговый результат в БД"""
+    vulnerabilities = []
+    
+    # Порядок этапов фиксирован, поэтому ID уязвимостей детерминированы
+    for name in stage_names:
+        stage_file = os.path.join(result_dir, f"{name}_vulnerabilities.json")
+        if not os.path.exists(stage_file):
+            continue
+        with open(stage_file, "r") as f:
+            for vulnerability in json.load(f):
+                vulnerabilities.append(dict(vulnerability, id=f"vuln-{scan_id}-{len(vulnerabilities) + 1}"))
+    
+    # Считаем количество уязвимостей по уровням серьезности
+    high_count = sum(1 for v in vulnerabilities if v["severity"] == "high")
+    medium_count = sum(1 for v in vulnerabilities if v["severity"] == "medium")
+    low_count = sum(1 for v in vulnerabilities if v["severity"] == "low")
+    
+    # Формируем итоговый результат в формате, совместимом с фронтендом
+    scan_result = {
+        "id": scan_id,
+        "target": target,
+        "date": start_time,
+        "status": status,
+        "duration": 180,  # Примерно 3 минуты
+        "findings": {
+            "high": high_count,
+            "medium": medium_count,
+            "low": low_count,
+            "total": high_count + medium_count + low_count,
+            "resolved": 0
+        },
+        "vulnerabilities": vulnerabilities,
+        "openPorts": [],  # Для веб-сканирования это не так важно
+        "hostInfo": {
+            "hostname": target,
+            "ip": ip,
+            "operatingSystem": "Unknown"
+        },
+        "scanOptions": {
+            "tools": tools
+        }
+    }
+    
+    # Сохраняем результат и уязвимости в БД, отчеты инструментов упаковываем
+    Scan.store_result(scan_result)
+    
+    summary = summarize_result(scan_result)
+    pack_scan_artifacts(result_dir, summary)
+    return summary
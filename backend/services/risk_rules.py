@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+
+# Data file with the classification rules
+RISK_RULES_PATH = os.environ.get(
+    'RISK_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_rules.json')
+)
+
+# Number of classified texts remembered (NSE script ids and tool titles repeat a lot)
+RISK_CACHE_SIZE = int(os.environ.get('RISK_CACHE_SIZE', 8192))
+
+
+def _compile_function(name, lines, namespace):
+    """Define a function from source lines; namespace holds the names it refers to"""
+    exec(compile("\n".join(lines), f"<risk rules: {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class FieldMatcher:
+    """Rules of one field compiled into a chain of Python conditions
+
+    Each rule becomes one condition: substring tests for its literal
+    patterns and a single precompiled alternation for its regex patterns.
+    Conditions are tested in the order of the data file, so the first rule
+    that matches anywhere wins and the default is used when none does.
+    This is the same work the former inline loops did, without a call per
+    rule.
+    """
+
+    def __init__(self, default, rules):
+        self.default = default
+        self.rules = []  # (literal patterns, regex search or None, value)
+        for rule in rules:
+            literals = tuple(rule.get("match", []))
+            regexes = rule.get("regex", [])
+            search = re.compile("|".join(f"(?:{pattern})" for pattern in regexes)).search if regexes else None
+            if literals or search:
+                self.rules.append((literals, search, rule["value"]))
+
+        namespace = {}
+        self.match = _compile_function("match", [
+            "def match(text):",
+            *self.source("result", "", namespace),
+            "    return result",
+        ], namespace)
+
+    def source(self, target, prefix, namespace):
+        """Lines of an if/elif/else chain that assigns the value of the field to target
+
+        Values and regexes are added to namespace under names starting with prefix.
+        """
+        lines = []
+        for index, (literals, search, value) in enumerate(self.rules):
+            conditions = [f"{pattern!r} in text" for pattern in literals]
+            if search is not None:
+                namespace[f"{prefix}search{index}"] = search
+                conditions.append(f"{prefix}search{index}(text)")
+            namespace[f"{prefix}value{index}"] = value
+            lines.append(f"    {'elif' if lines else 'if'} {' or '.join(conditions)}:")
+            lines.append(f"        {target} = {prefix}value{index}")
+        namespace[f"{prefix}default"] = self.default
+        if lines:
+            lines.append("    else:")
+            lines.append(f"        {target} = {prefix}default")
+        else:
+            lines.append(f"    {target} = {prefix}default")
+        return lines
+
+
+class RiskEngine:
+    """Table-driven classification of tool findings
+
+    Rules are grouped by source (nmap, nikto, dirb, sslscan, wpscan) and by
+    field (severity, category, ...). Each field has a compiled FieldMatcher;
+    classify() of a source runs the conditions of all its fields in one
+    compiled function.
+    """
+
+    def __init__(self, rules):
+        self.matchers = {
+            source: {field: FieldMatcher(spec.get("default"), spec.get("rules", []))
+                     for field, spec in fields.items()}
+            for source, fields in rules.items()
+        }
+        self._classifiers = {source: self._compile_classify(matchers) for source, matchers in self.matchers.items()}
+
+    @staticmethod
+    def _compile_classify(matchers):
+        namespace = {}
+        lines = ["def classify(text):"]
+        for index, matcher in enumerate(matchers.values()):
+            lines += matcher.source(f"field{index}", f"f{index}_", namespace)
+        fields = ", ".join(f"{field!r}: field{index}" for index, field in enumerate(matchers))
+        lines.append(f"    return {{{fields}}}")
+        return _compile_function("classify", lines, namespace)
+
+    @classmethod
+    def load(cls, path=RISK_RULES_PATH):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def match(self, source, field, text):
+        return self.matchers[source][field].match(text)
+
+    def classify(self, source, text):
+        """Values of all fields of the source for one text"""
+        return self._classifiers[source](text)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Engine compiled from RISK_RULES_PATH, loaded once per process"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RiskEngine.load()
+    return _engine
+
+
+def reload_rules():
+    """Recompile the rules after the data file was changed"""
+    global _engine
+    with _engine_lock:
+        _engine = RiskEngine.load()
+    match_rule.cache_clear()
+    _classify.cache_clear()
+
+
+@lru_cache(maxsize=RISK_CACHE_SIZE)
+def match_rule(source, field, text):
+    return get_engine().match(source, field, text)
+
+
+@lru_cache(maxsize=RISK_CACHE_SIZE)
+def _classify(source, text):
+    return get_engine().classify(source, text)
+
+
+def classify(source, text):
+    """Classify text with the rules of the source; returns a new dict every call"""
+    return dict(_classify(source, text))
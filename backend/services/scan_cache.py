@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import hashlib
+import ipaddress
+import threading
+from collections import OrderedDict
+
+# How long a completed scan can be reused for an identical request (seconds)
+SCAN_CACHE_TTL = int(os.environ.get('SCAN_CACHE_TTL', 600))
+
+# Maximum number of fingerprints remembered
+SCAN_CACHE_MAX_ENTRIES = int(os.environ.get('SCAN_CACHE_MAX_ENTRIES', 1000))
+
+# Options whose value is a per-scan output path and does not change what is scanned
+OUTPUT_OPTIONS = {"-oX", "-oN", "-oG", "-oA", "-o", "--output"}
+
+
+def normalize_target(target):
+    """Canonical form of a host, IP, CIDR range or URL"""
+    target = target.strip().lower()
+    if "://" in target:
+        return target.rstrip("/")
+
+    target = target.rstrip(".")
+    try:
+        if "/" in target:
+            return str(ipaddress.ip_network(target, strict=False))
+        return str(ipaddress.ip_address(target))
+    except ValueError:
+        return target
+
+
+def normalize_args(cmd, target):
+    """Options without output paths and the target itself, in a stable order
+
+    Each option is kept together with its values ("--top-ports 100" as one
+    argument or as two gives the same option), and only whole options are
+    sorted, so a value never moves to another option.
+    """
+    options = []
+    skip_next = False
+    for arg in cmd[1:]:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in OUTPUT_OPTIONS:
+            skip_next = True
+            continue
+        if arg == target:
+            continue
+        if arg.startswith("-") or not options:
+            options.append(arg.split())
+        else:
+            options[-1].extend(arg.split())
+    return sorted(" ".join(option) for option in options)
+
+
+def scan_fingerprint(kind, target, cmd=(), tools=()):
+    """Fingerprint identifying scans that would produce the same result"""
+    key = {
+        "kind": kind,
+        "target": normalize_target(target),
+        "args": normalize_args(list(cmd), target) if cmd else [],
+        "tools": sorted(set(tools))
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class ScanCache:
+    """Single-flight registry and result reuse cache keyed by scan fingerprint
+
+    While a scan is running, requests with the same fingerprint join it.
+    After it completes, its result is reused until the entry is older than
+    the TTL. Entries are evicted by age and, beyond max_entries, oldest first.
+    """
+
+    def __init__(self, ttl=SCAN_CACHE_TTL, max_entries=SCAN_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # fingerprint -> entry
+        self._by_scan = {}  # scan_id -> fingerprint
+        self._lock = threading.Lock()
+
+    def claim(self, fingerprint, scan_id, reuse=True):
+        """Return (scan_id, reused): an in-flight or fresh completed scan, or register scan_id
+
+        With reuse=False no existing scan is returned, but scan_id is still
+        registered, so later identical requests can join it.
+        """
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if reuse and entry is not None and not self._expired(entry):
+                return entry["scan_id"], True
+
+            self._discard(fingerprint)
+            self._entries[fingerprint] = {
+                "scan_id": scan_id,
+                "in_flight": True,
+                "completed_at": None
+            }
+            self._by_scan[scan_id] = fingerprint
+            self._evict()
+            return scan_id, False
+
+    def finish(self, scan_id, success):
+        """Mark the scan as completed (reusable) or forget it when it failed"""
+        with self._lock:
+            fingerprint = self._by_scan.get(scan_id)
+            if fingerprint is None:
+                return
+            if not success:
+                self._discard(fingerprint)
+                return
+
+            entry = self._entries[fingerprint]
+            entry["in_flight"] = False
+            entry["completed_at"] = time.time()
+            self._entries.move_to_end(fingerprint)
+
+    def invalidate(self, scan_id):
+        with self._lock:
+            fingerprint = self._by_scan.get(scan_id)
+            if fingerprint is not None:
+                self._discard(fingerprint)
+
+    def _expired(self, entry):
+        return not entry["in_flight"] and time.time() - entry["completed_at"] > self.ttl
+
+    def _discard(self, fingerprint):
+        entry = self._entries.pop(fingerprint, None)
+        if entry is not None:
+            self._by_scan.pop(entry["scan_id"], None)
+
+    def _evict(self):
+        for fingerprint in [fp for fp, entry in self._entries.items() if self._expired(entry)]:
+            self._discard(fingerprint)
+
+        # Only completed entries are evicted by size: in-flight scans must stay joinable
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            for fingerprint in [fp for fp, entry in self._entries.items() if not entry["in_flight"]][:excess]:
+                self._discard(fingerprint)
+
+
+# Shared cache of scans started through the API
+scan_cache = ScanCache()
@@ -0,0 +1,137 @@
+import os
+import time
+import signal
+import threading
+import subprocess
+
+# Wall-clock limit of a running job per scan kind (seconds, 0 disables the limit)
+SCAN_TYPE_DEADLINES = {
+    'nmap': int(os.environ.get('SCAN_DEADLINE_NMAP', 4 * 3600)),
+    'web': int(os.environ.get('SCAN_DEADLINE_WEB', 2 * 3600)),
+    'port_scan': int(os.environ.get('SCAN_DEADLINE_PORT_SCAN', 3600)),
+}
+
+# Time a tool gets to exit after SIGTERM before the process group is killed (seconds)
+SCAN_KILL_GRACE = int(os.environ.get('SCAN_KILL_GRACE', 10))
+
+# How often running jobs are checked against their deadline (seconds)
+SCAN_DEADLINE_CHECK_INTERVAL = 5
+
+
+class ScanCancelled(Exception):
+    """Raised in a scan job once it has been cancelled or ran past its deadline"""
+
+    def __init__(self, reason):
+        super().__init__(f"Scan {reason}")
+        self.reason = reason
+
+
+class ScanController:
+    """Tracks the processes of running scan jobs so they can be stopped
+
+    Tools are started in their own session, so cancelling a job terminates
+    the whole process tree, not just the direct child. Jobs running longer
+    than the deadline of their kind are cancelled with reason 'deadline'.
+    """
+
+    def __init__(self, deadlines=None, kill_grace=SCAN_KILL_GRACE):
+        self.deadlines = dict(SCAN_TYPE_DEADLINES if deadlines is None else deadlines)
+        self.kill_grace = kill_grace
+        self._jobs = {}  # (kind, scan_id) -> {"deadline", "processes", "reason"}
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+    def begin(self, kind, scan_id):
+        limit = self.deadlines.get(kind)
+        with self._lock:
+            self._jobs[(kind, scan_id)] = {
+                "deadline": time.monotonic() + limit if limit else None,
+                "processes": set(),
+                "reason": None
+            }
+            if self._watchdog is None:
+                self._watchdog = threading.Thread(target=self._watch, name="scan-deadlines")
+                self._watchdog.daemon = True
+                self._watchdog.start()
+
+    def end(self, kind, scan_id):
+        with self._lock:
+            self._jobs.pop((kind, scan_id), None)
+
+    def spawn(self, kind, scan_id, cmd, **kwargs):
+        """Start a tool process of the job in a new process group"""
+        with self._lock:
+            job = self._jobs.get((kind, scan_id))
+            if job is not None and job["reason"]:
+                raise ScanCancelled(job["reason"])
+            process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+            if job is not None:
+                job["processes"].add(process)
+        return process
+
+    def release(self, kind, scan_id, process):
+        with self._lock:
+            job = self._jobs.get((kind, scan_id))
+            if job is not None:
+                job["processes"].discard(process)
+
+    def cancelled(self, kind, scan_id):
+        """Reason the job was stopped ('cancelled' or 'deadline') or None"""
+        with self._lock:
+            job = self._jobs.get((kind, scan_id))
+            return job["reason"] if job is not None else None
+
+    def check(self, kind, scan_id):
+        reason = self.cancelled(kind, scan_id)
+        if reason:
+            raise ScanCancelled(reason)
+
+    def cancel(self, kind, scan_id, reason='cancelled'):
+        """Stop a running job; returns False when the job is not running"""
+        with self._lock:
+            job = self._jobs.get((kind, scan_id))
+            if job is None:
+                return False
+            if not job["reason"]:
+                job["reason"] = reason
+            processes = list(job["processes"])
+
+        for process in processes:
+            self._terminate(process)
+        return True
+
+    def _terminate(self, process):
+        if process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        def kill():
+            if process.poll() is None:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        timer = threading.Timer(self.kill_grace, kill)
+        timer.daemon = True
+        timer.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(SCAN_DEADLINE_CHECK_INTERVAL)
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    key for key, job in self._jobs.items()
+                    if job["deadline"] is not None and job["deadline"] <= now and not job["reason"]
+                ]
+            for kind, scan_id in expired:
+                print(f"{kind} job {scan_id} exceeded its deadline, stopping it")
+                self.cancel(kind, scan_id, reason='deadline')
+
+
+# Shared controller of running scan jobs
+scan_control = ScanController()
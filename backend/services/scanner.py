@@ -1,60 +1,37 @@
 import subprocess
-import xml.etree.ElementTree as ET
+import tempfile
 import json
 import time
-import threading
 from models.scan import Scan
+from services.executor import scan_executor
+from services.scan_control import scan_control
+from services.nmap_parser import iter_hosts
 
-def parse_nmap_xml(xml_data):
-    """Parse Nmap XML output into a structured dictionary"""
+def parse_nmap_xml(source):
+    """Parse Nmap XML output (file name or binary stream) into a structured dictionary"""
     try:
-        root = ET.fromstring(xml_data)
+        scan_info = {}
         result = {
             'hosts': [],
             'summary': {}
         }
         
-        # Get hosts info
-        for host in root.findall('./host'):
-            host_info = {'addresses': [], 'ports': []}
-            
-            # Get addresses
-            for addr in host.findall('./address'):
-                host_info['addresses'].append({
-                    'addr': addr.get('addr'),
-                    'addrtype': addr.get('addrtype')
-                })
-            
-            # Get host names
-            hostnames = []
-            for hostname in host.findall('./hostnames/hostname'):
-                hostnames.append(hostname.get('name'))
-            host_info['hostnames'] = hostnames
-            
-            # Get ports
-            for port in host.findall('./ports/port'):
-                port_info = {
-                    'port': port.get('portid'),
-                    'protocol': port.get('protocol'),
-                    'state': port.find('./state').get('state') if port.find('./state') is not None else '',
-                    'service': port.find('./service').get('name') if port.find('./service') is not None else '',
-                    'product': port.find('./service').get('product') if port.find('./service') is not None else '',
-                    'version': port.find('./service').get('version') if port.find('./service') is not None else ''
-                }
-                host_info['ports'].append(port_info)
-            
-            result['hosts'].append(host_info)
-        
-        # Get summary
-        run_stats = root.find('./runstats/finished')
-        if run_stats is not None:
-            result['summary'] = {
-                'time': run_stats.get('time'),
-                'timestr': run_stats.get('timestr'),
-                'elapsed': run_stats.get('elapsed'),
-                'exit': run_stats.get('exit')
-            }
+        # Hosts are parsed incrementally by the shared streaming parser
+        for host in iter_hosts(source, scan_info):
+            result['hosts'].append({
+                'addresses': host['addresses'],
+                'hostnames': [h['name'] for h in host['hostnames']],
+                'ports': [{
+                    'port': port['portid'],
+                    'protocol': port['protocol'],
+                    'state': port['state'],
+                    'service': port['service'].get('name', ''),
+                    'product': port['service'].get('product', ''),
+                    'version': port['service'].get('version', '')
+                } for port in host['ports']]
+            })
         
+        result['summary'] = scan_info.get('summary', {})
         return result
     except Exception as e:
         return {'error': str(e)}
@@ -65,27 +42,35 @@ def run_port_scan(scan_id, target, options="-sV"):
     if not scan:
         return
     
-    scan.update_status("running")
-    
     try:
-        # Run Nmap with XML output
+        # Run Nmap with XML output and parse it straight from the pipe
         cmd = ["nmap", options, target, "-oX", "-"]
-        process = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if process.returncode != 0:
-            scan.update_status("failed")
-            scan.save_result({"error": process.stderr})
-            return
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            process = scan_control.spawn("port_scan", scan_id, cmd, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                result = parse_nmap_xml(process.stdout)
+                process.stdout.close()
+                returncode = process.wait()
+            finally:
+                scan_control.release("port_scan", scan_id, process)
+            
+            # Stopped by the deadline: keep the hosts parsed so far
+            reason = scan_control.cancelled("port_scan", scan_id)
+            if reason:
+                scan.finish("cancelled", dict(result, cancelled=reason))
+                return
+            
+            if returncode != 0:
+                stderr.seek(0)
+                scan.finish("failed", {"error": stderr.read()})
+                return
         
-        # Parse and save the results
-        result = parse_nmap_xml(process.stdout)
-        scan.save_result(result)
-        scan.update_status("completed")
+        # Save the results and the status in one transaction
+        scan.finish("completed", result)
     except Exception as e:
-        scan.update_status("failed")
-        scan.save_result({"error": str(e)})
+        scan.finish("failed", {"error": str(e)})
 
-def start_port_scan(user_id, target, scan_type="basic"):
+def start_port_scan(user_id, target, scan_type="basic", priority="normal"):
     """Initialize a port scan and run it in the background"""
     scan_options = {
         "basic": "-sV",  # Service detection
@@ -101,9 +86,20 @@ def start_port_scan(user_id, target, scan_type="basic"):
     if not scan.save():
         return None
     
-    # Start scan in background
-    thread = threading.Thread(target=run_port_scan, args=(scan.id, target, options))
-    thread.daemon = True
-    thread.start()
+    # Queue the scan, the shared executor moves it to "running"
+    scan_executor.submit(scan.id, "port_scan", {"target": target, "options": options},
+                         priority=priority)
     
     return scan.id
+
+def run_port_scan_job(scan_id, payload):
+    """Executor handler for queued port scans"""
+    run_port_scan(scan_id, payload["target"], payload["options"])
+
+def update_port_scan_status(scan_id, status):
+    """Mirror executor state transitions into the scans table"""
+    scan = Scan.find_by_id(scan_id)
+    if scan:
+        scan.update_status(status)
+
+scan_executor.register("port_scan", run_port_scan_job, on_status=update_port_scan_status)
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import datetime
+import threading
+from models.db import db
+
+# How often the scheduler looks for due schedules (seconds)
+SCHEDULER_INTERVAL = int(os.environ.get('SCHEDULER_INTERVAL', 30))
+
+# Maximum number of scheduled scans started in one check
+SCHEDULER_MAX_STARTS = int(os.environ.get('SCHEDULER_MAX_STARTS', 5))
+
+# Default random delay added to every run, so schedules sharing a time do not fire together (seconds)
+SCHEDULER_JITTER = int(os.environ.get('SCHEDULER_JITTER', 300))
+
+# Persistent schedules, created on every new connection of the connection manager
+SCHEDULE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scheduled_scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    request TEXT NOT NULL,
+    cron TEXT,
+    jitter INTEGER NOT NULL DEFAULT 0,
+    next_run REAL NOT NULL,
+    fire_at REAL NOT NULL,
+    scan_id INTEGER,
+    last_run REAL,
+    last_scan_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_scheduled_scans_fire_at ON scheduled_scans (fire_at);
+'''
+
+# Shortcuts for common cron expressions
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+# (min, max) of the cron fields: minute, hour, day of month, month, day of week
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+# Upper bound of search steps for the next matching time (about five years of day steps)
+CRON_MAX_STEPS = 5 * 366 * 26
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError(f"Invalid step in cron field '{field}'")
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field '{field}' is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression: minute, hour, day of month, month, day of week
+
+    Supports '*', lists, ranges, steps and the @daily-style aliases. Like
+    cron, when both day fields are restricted a day matching either of them
+    matches. Times are naive local datetimes.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+
+        try:
+            parsed = [_parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}")
+
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Day of week 7 is Sunday as well
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, dt):
+        in_days = dt.day in self.days
+        # Python weekday(): Monday is 0, cron: Sunday is 0
+        in_weekdays = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, dt):
+        """First matching minute strictly after dt"""
+        dt = dt.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        for _ in range(CRON_MAX_STEPS):
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += datetime.timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class ScanScheduler:
+    """Persistent scheduler that hands due scans to a launcher
+
+    Schedules are one-shot (run_at) or recurring (cron) and are stored in
+    SQLite, so they survive restarts. Every run is delayed by a random jitter
+    to spread schedules that share a time, and at most max_starts scans are
+    started per interval; the rest start on the following checks. Runs missed
+    while the server was down are caught up once after a restart, then a
+    recurring schedule continues from its next occurrence.
+    """
+
+    def __init__(self, interval=SCHEDULER_INTERVAL, max_starts=SCHEDULER_MAX_STARTS,
+                 jitter=SCHEDULER_JITTER, database=db):
+        self.interval = max(1, interval)
+        self.max_starts = max(1, max_starts)
+        self.jitter = max(0, jitter)
+        self.db = database
+        self.db.on_connect(lambda conn: conn.executescript(SCHEDULE_SCHEMA))
+        self._launchers = {}
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, kind, launcher, on_scheduled=None):
+        """Register how scheduled scans of a kind are started
+
+        launcher(scan_id, request) starts a scan and returns its id; scan_id
+        is the id reserved when the schedule was created, or None for later
+        runs. on_scheduled(scan_id) restores reserved ids after a restart.
+        """
+        self._launchers[kind] = (launcher, on_scheduled)
+
+    def add(self, kind, request, run_at=None, cron=None, scan_id=None, jitter=None):
+        """Persist a schedule and return its description
+
+        run_at is a naive local datetime of the first run; for recurring
+        schedules it defaults to the next cron occurrence.
+        """
+        if kind not in self._launchers:
+            raise ValueError(f"No launcher registered for scan kind '{kind}'")
+        if cron is None and run_at is None:
+            raise ValueError("Either run_at or cron is required")
+
+        if cron is not None:
+            cron = CronSchedule(cron).expression
+            if run_at is None:
+                run_at = CronSchedule(cron).next_after(datetime.datetime.now())
+
+        jitter = self.jitter if jitter is None else max(0, int(jitter))
+        next_run = run_at.timestamp()
+        fire_at = self._fire_at(next_run, jitter)
+
+        with self.db.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO scheduled_scans (kind, request, cron, jitter, next_run, fire_at, scan_id)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, json.dumps(request), cron, jitter, next_run, fire_at, scan_id)
+            )
+            schedule_id = cursor.lastrowid
+
+        self._wakeup.set()
+        return {
+            "id": schedule_id,
+            "kind": kind,
+            "cron": cron,
+            "nextRun": self._format(next_run),
+            "fireAt": self._format(fire_at),
+            "scanId": scan_id
+        }
+
+    def remove(self, schedule_id):
+        with self.db.transaction() as conn:
+            removed = conn.execute('DELETE FROM scheduled_scans WHERE id = ?', (schedule_id,)).rowcount
+        return removed > 0
+
+    def count(self):
+        """Number of stored schedules; a recurring one counts until it is removed"""
+        return self.db.connection().execute('SELECT COUNT(*) FROM scheduled_scans').fetchone()[0]
+
+    def list(self):
+        rows = self.db.connection().execute(
+            'SELECT id, kind, request, cron, next_run, fire_at, scan_id, last_run, last_scan_id'
+            ' FROM scheduled_scans ORDER BY fire_at'
+        ).fetchall()
+
+        return [{
+            "id": schedule_id,
+            "kind": kind,
+            "request": json.loads(request),
+            "cron": cron,
+            "nextRun": self._format(next_run),
+            "fireAt": self._format(fire_at),
+            "scanId": scan_id,
+            "lastRun": self._format(last_run),
+            "lastScanId": last_scan_id
+        } for schedule_id, kind, request, cron, next_run, fire_at, scan_id, last_run, last_scan_id in rows]
+
+    def start(self):
+        """Restore reserved scans and start the scheduling thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="scan-scheduler")
+            self._thread.daemon = True
+
+        try:
+            rows = self.db.connection().execute('SELECT kind, scan_id FROM scheduled_scans WHERE scan_id IS NOT NULL').fetchall()
+        except sqlite3.Error as e:
+            print(f"Error loading scheduled scans: {e}")
+            rows = []
+
+        for kind, scan_id in rows:
+            _, on_scheduled = self._launchers.get(kind, (None, None))
+            if on_scheduled:
+                on_scheduled(scan_id)
+
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            started = 0
+            try:
+                started = self.run_due()
+            except Exception as e:
+                print(f"Error running scheduled scans: {e}")
+
+            if started >= self.max_starts:
+                # A full batch: the rest waits a whole interval, so max_starts limits the start rate
+                time.sleep(self.interval)
+                self._wakeup.clear()
+                continue
+
+            self._wakeup.wait(self._seconds_to_next())
+            self._wakeup.clear()
+
+    def _seconds_to_next(self):
+        """Sleep until the next jittered start, but at most one interval"""
+        try:
+            row = self.db.connection().execute('SELECT MIN(fire_at) FROM scheduled_scans').fetchone()
+        except sqlite3.Error:
+            return self.interval
+
+        if row[0] is None:
+            return self.interval
+        return min(self.interval, max(0.0, row[0] - time.time()))
+
+    def run_due(self):
+        """Start up to max_starts due scans, oldest first; return the number started"""
+        now = time.time()
+        rows = self.db.connection().execute(
+            'SELECT id, kind, request, cron, jitter, next_run, scan_id FROM scheduled_scans'
+            ' WHERE fire_at <= ? ORDER BY fire_at LIMIT ?',
+            (now, self.max_starts)
+        ).fetchall()
+
+        started = 0
+        for schedule_id, kind, request, cron, jitter, next_run, scan_id in rows:
+            # Advance the schedule before launching: a crash must not start the same run twice
+            with self.db.transaction() as conn:
+                if cron:
+                    # Missed occurrences are coalesced into this single run
+                    following = CronSchedule(cron).next_after(datetime.datetime.fromtimestamp(max(next_run, now)))
+                    following = following.timestamp()
+                    conn.execute(
+                        'UPDATE scheduled_scans SET next_run = ?, fire_at = ?, scan_id = NULL, last_run = ?'
+                        ' WHERE id = ?',
+                        (following, self._fire_at(following, jitter), now, schedule_id)
+                    )
+                else:
+                    conn.execute('DELETE FROM scheduled_scans WHERE id = ?', (schedule_id,))
+
+            launcher, _ = self._launchers.get(kind, (None, None))
+            if launcher is None:
+                print(f"No launcher for scheduled {kind} scan {schedule_id}")
+                continue
+
+            try:
+                launched_id = launcher(scan_id, json.loads(request))
+                started += 1
+            except Exception as e:
+                print(f"Error starting scheduled {kind} scan {schedule_id}: {e}")
+                continue
+
+            if cron:
+                with self.db.transaction() as conn:
+                    conn.execute('UPDATE scheduled_scans SET last_scan_id = ? WHERE id = ?', (launched_id, schedule_id))
+
+        return started
+
+    def _fire_at(self, next_run, jitter):
+        return next_run + random.uniform(0, jitter)
+
+    def _format(self, timestamp):
+        if timestamp is None:
+            return None
+        return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+# Shared scheduler for scans scheduled through the API
+scan_scheduler = ScanScheduler()
@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Memory budget of the cached scan documents (bytes of serialized JSON)
+SUMMARY_CACHE_MAX_BYTES = int(os.environ.get('SUMMARY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Documents larger than this share of the budget are not cached
+SUMMARY_CACHE_MAX_ENTRY_SHARE = 8
+
+
+class SummaryCache:
+    """LRU of serialized scan documents keyed by scan ID and view
+
+    Every entry remembers the scan version it was built from; a lookup with
+    a different version is a miss, so writes from other processes are
+    noticed without explicit invalidation. Writers in this process also
+    drop the entries of a scan right away. The total size of the cached
+    documents is kept under max_bytes by evicting the least recently used.
+    """
+
+    def __init__(self, max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.max_bytes = max(0, max_bytes)
+        self.size = 0
+        self._entries = OrderedDict()  # (scan_id, view) -> (version, body)
+        self._lock = threading.Lock()
+
+    def get(self, scan_id, view, version):
+        key = (scan_id, view)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, scan_id, view, version, body):
+        if len(body) > self.max_bytes // SUMMARY_CACHE_MAX_ENTRY_SHARE:
+            return
+        key = (scan_id, view)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (version, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, scan_id):
+        """Drop all views of the scan"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scan_id]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+# Shared cache of scan details, vulnerability and host lists
+summary_cache = SummaryCache()
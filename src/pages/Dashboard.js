@@ -108,16 +108,38 @@ const Dashboard = () => {
 
   // Загрузка данных при монтировании компонента
   useEffect(() => {
-    loadDashboardData();
-    
-    // Устанавливаем интервал обновления данных каждые 5 минут
-    const refreshInterval = setInterval(() => {
-      loadDashboardData(true);
-    }, 5 * 60 * 1000);
+    // Обновляем данные только когда бэкенд сообщает об изменениях (long-poll)
+    let cancelled = false;
+    const waitForChanges = async () => {
+      // Номер последнего события запоминаем до загрузки данных, иначе первый
+      // запрос сразу вернул бы уже учтенные события вместо ожидания новых
+      let since = 0;
+      try {
+        ({ lastEventId: since } = await scanService.waitForScanEvents(0, 0));
+      } catch (err) {
+        console.error('Error reading the last scan event:', err);
+      }
+      await loadDashboardData();
+      
+      while (!cancelled) {
+        try {
+          const { events, lastEventId } = await scanService.waitForScanEvents(since);
+          since = lastEventId;
+          if (events.length > 0 && !cancelled) {
+            setDashboardData(await scanService.getDashboardData());
+          }
+        } catch (err) {
+          console.error('Error waiting for scan events:', err);
+          // Пауза перед повторным подключением
+          await new Promise((resolve) => setTimeout(resolve, 5000));
+        }
+      }
+    };
+    waitForChanges();
     
-    // Очищаем интервал при размонтировании компонента
+    // Прекращаем ожидание при размонтировании компонента
     return () => {
-      clearInterval(refreshInterval);
+      cancelled = true;
     };
   }, [loadDashboardData]);
 
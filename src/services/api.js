@@ -58,9 +58,11 @@ export const authService = {
 };
 
 export const scanService = {
-  getScans: async () => {
+  // Страница списка: { status, type, target, from, to, sort, order, limit, cursor }
+  getScans: async (params = {}) => {
     const token = localStorage.getItem('token');
-    const response = await fetch(`${API_BASE_URL}/scan/all`, {
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`${API_BASE_URL}/scan/all${query ? `?${query}` : ''}`, {
       headers: {
         'Authorization': `Bearer ${token}`
       }
@@ -73,6 +75,22 @@ export const scanService = {
     return await response.json();
   },
   
+  searchFindings: async (params = {}) => {
+    const token = localStorage.getItem('token');
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`${API_BASE_URL}/scan/search?${query}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error('Failed to search findings');
+    }
+    
+    return await response.json();
+  },
+  
   getScanById: async (scanId) => {
     const token = localStorage.getItem('token');
     const response = await fetch(`${API_BASE_URL}/scan/${scanId}`, {
@@ -121,6 +139,22 @@ export const scanService = {
     return await response.json();
   },
   
+  cancelScan: async (scanId) => {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_BASE_URL}/scan/cancel/${scanId}`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error('Failed to cancel scan');
+    }
+    
+    return await response.json();
+  },
+  
   getDashboardData: async () => {
     const token = localStorage.getItem('token');
     const response = await fetch(`${API_BASE_URL}/scan/dashboard`, {
@@ -136,6 +170,38 @@ export const scanService = {
     return await response.json();
   },
   
+  // Long-poll: ждет изменений статусов/результатов сканирований после события since
+  waitForScanEvents: async (since = 0, timeout = 25) => {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_BASE_URL}/scan/events/poll?since=${since}&timeout=${timeout}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error('Failed to wait for scan events');
+    }
+    
+    return await response.json();
+  },
+  
+  getVulnerabilities: async (scanId, params = {}) => {
+    const token = localStorage.getItem('token');
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`${API_BASE_URL}/scan/vulnerabilities/${scanId}${query ? `?${query}` : ''}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error('Failed to fetch vulnerabilities');
+    }
+    
+    return await response.json();
+  },
+  
   updateVulnerabilityStatus: async (scanId, vulnId, status) => {
     const token = localStorage.getItem('token');
     const response = await fetch(`${API_BASE_URL}/scan/vulnerability/${scanId}/${vulnId}/status`, {
@@ -154,6 +220,24 @@ export const scanService = {
     return await response.json();
   },
   
+  updateVulnerabilitiesStatus: async (scanId, vulnIds, status) => {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_BASE_URL}/scan/vulnerability/${scanId}/status`, {
+      method: 'PUT',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      },
+      body: JSON.stringify({ ids: vulnIds, status })
+    });
+    
+    if (!response.ok) {
+      throw new Error('Failed to update vulnerabilities status');
+    }
+    
+    return await response.json();
+  },
+  
   // Метод для веб-сканирования
   createWebScan: async (scanData) => {
     const token = localStorage.getItem('token');